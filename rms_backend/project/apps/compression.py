@@ -0,0 +1,91 @@
+"""
+Compression of large API responses.
+
+Only bodies worth it are compressed: JSON (or text) responses of at least
+``COMPRESS_MIN_SIZE`` bytes, such as reports, stock and purchase histories
+and product lists. Small responses skip the CPU cost. Brotli is used when the
+client prefers it and the ``brotli`` package is installed, gzip otherwise.
+
+As with Django's GZipMiddleware, compressed responses get ``Vary:
+Accept-Encoding`` and their strong ETags become weak; ``If-None-Match`` is
+compared weakly (apps.response_cache), so they still revalidate to 304.
+"""
+
+import re
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/javascript', 'image/svg+xml')
+_QUALITY_RE = re.compile(r'q=([0-9.]+)')
+
+
+def _accepted(header):
+    """``{coding: q}`` of an Accept-Encoding header."""
+    codings = {}
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        match = _QUALITY_RE.search(params)
+        try:
+            quality = float(match.group(1)) if match else 1.0
+        except ValueError:
+            quality = 0.0
+        if coding.strip():
+            codings[coding.strip().lower()] = quality
+    return codings
+
+
+def choose_encoding(header):
+    """'br', 'gzip' or None for an Accept-Encoding header."""
+    codings = _accepted(header or '')
+
+    def quality(coding):
+        return codings.get(coding, codings.get('*', 0.0))
+
+    if brotli is not None and quality('br') > 0 and quality('br') >= quality('gzip'):
+        return 'br'
+    if quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def _compressible(response):
+    if response.streaming or response.status_code != 200 or response.has_header('Content-Encoding'):
+        return False
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    if not (content_type.startswith('text/') or content_type in COMPRESSIBLE_TYPES):
+        return False
+    return len(response.content) >= getattr(settings, 'COMPRESS_MIN_SIZE', 4096)
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not _compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if encoding is None:
+            return response
+
+        if encoding == 'br':
+            body = brotli.compress(response.content, quality=getattr(settings, 'COMPRESS_BROTLI_QUALITY', 5))
+        else:
+            body = compress_string(response.content)
+        if len(body) >= len(response.content):
+            return response
+        response.content = body
+        response['Content-Length'] = str(len(body))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = f'W/{etag}'
+        return response
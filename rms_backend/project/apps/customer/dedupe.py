@@ -0,0 +1,57 @@
+"""
+Merging customers that share a phone number written in different formats.
+
+The oldest customer of each ``phone_e164`` is kept. Rows pointing at the
+others (sales and anything else with a foreign key to Customer) are moved to
+it, blank details are filled from the duplicates, and the duplicates are
+deleted.
+"""
+
+from django.db import transaction
+from django.db.models import Count
+from apps.response_cache import bump_versions_on_commit
+from .models import Customer
+
+# Details a keeper with blanks takes over from its duplicates
+MERGED_FIELDS = ['first_name', 'last_name', 'email', 'address', 'gender', 'date_of_birth']
+
+
+def duplicate_groups():
+    """Lists of customers sharing a normalized phone, oldest first."""
+    phones = (
+        Customer.objects.exclude(phone_e164__isnull=True)
+        .values('phone_e164').annotate(count=Count('id')).filter(count__gt=1)
+        .values_list('phone_e164', flat=True)
+    )
+    groups = {}
+    for customer in Customer.objects.filter(phone_e164__in=list(phones)).order_by('created_at', 'id'):
+        groups.setdefault(customer.phone_e164, []).append(customer)
+    return list(groups.values())
+
+
+def merge_customers(keeper, duplicates):
+    """Fold ``duplicates`` into ``keeper``; returns how many related rows were moved."""
+    duplicate_ids = [customer.pk for customer in duplicates]
+    moved = 0
+    with transaction.atomic():
+        for relation in Customer._meta.related_objects:
+            if relation.one_to_many or relation.one_to_one:
+                moved += relation.related_model._base_manager.filter(
+                    **{f'{relation.field.name}__in': duplicate_ids}
+                ).update(**{relation.field.name: keeper})
+                bump_versions_on_commit(relation.related_model)
+
+        for field in MERGED_FIELDS:
+            if not getattr(keeper, field):
+                value = next((getattr(customer, field) for customer in duplicates if getattr(customer, field)), None)
+                if value:
+                    setattr(keeper, field, value)
+        types = {keeper.customer_type, *(customer.customer_type for customer in duplicates)}
+        if len(types) > 1:
+            keeper.customer_type = 'both'
+        keeper.is_active = keeper.is_active or any(customer.is_active for customer in duplicates)
+
+        # Duplicates go first: the keeper may take over one of their unique emails
+        Customer.objects.filter(pk__in=duplicate_ids).delete()
+        keeper.save()
+    return moved
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from apps.customer.dedupe import duplicate_groups, merge_customers
+
+
+class Command(BaseCommand):
+    help = (
+        'Merge customers whose phone numbers are the same number in different formats '
+        '(+880..., 880..., 01...): sales move to the oldest customer and the others are deleted'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the duplicates without merging them',
+        )
+
+    def handle(self, *args, **options):
+        groups = duplicate_groups()
+        merged = moved = 0
+        for keeper, *duplicates in groups:
+            self.stdout.write(
+                f'{keeper.phone_e164}: keeping #{keeper.pk} ({keeper.phone}), merging '
+                + ', '.join(f'#{customer.pk} ({customer.phone})' for customer in duplicates)
+            )
+            if not options['dry_run']:
+                moved += merge_customers(keeper, duplicates)
+                merged += len(duplicates)
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'DRY RUN: {len(groups)} phone numbers have duplicates'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'COMPLETE: {merged} duplicate customers merged into {len(groups)}, {moved} related rows moved'
+        ))
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.11 on 2026-10-19 19:54
+
+from django.db import migrations, models
+from apps.customer.phones import normalize_phone
+
+
+BATCH_SIZE = 1000
+
+
+def fill_phone_e164(apps, schema_editor):
+    Customer = apps.get_model('customer', 'Customer')
+    batch = []
+    for customer in Customer.objects.only('id', 'phone').iterator(chunk_size=BATCH_SIZE):
+        customer.phone_e164 = normalize_phone(customer.phone)
+        batch.append(customer)
+        if len(batch) == BATCH_SIZE:
+            Customer.objects.bulk_update(batch, ['phone_e164'])
+            batch = []
+    Customer.objects.bulk_update(batch, ['phone_e164'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0003_customer_customer_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='phone_e164',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=16, null=True),
+        ),
+        migrations.RunPython(fill_phone_e164, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,27 @@
 from django.db import models
 from django.utils import timezone
 from django.core.validators import RegexValidator
+from .phones import normalize_phone
+
+
+class CustomerManager(models.Manager):
+    def get_by_phone(self, phone):
+        """
+        The customer with ``phone`` in any format (oldest first if duplicates
+        are still around); raises ``Customer.DoesNotExist`` like ``get()``.
+        Rows written without ``save()`` (bulk_create, update()) may have no
+        ``phone_e164`` yet; they are found by the raw phone.
+        """
+        normalized = normalize_phone(phone)
+        customer = None
+        if normalized:
+            customer = self.filter(phone_e164=normalized).order_by('created_at', 'id').first()
+        if customer is None:
+            customer = self.filter(phone=phone).order_by('created_at', 'id').first()
+        if customer is None:
+            raise self.model.DoesNotExist(f'No customer with phone {phone}')
+        return customer
+
 
 class Customer(models.Model):
     GENDER_CHOICES = [
@@ -22,6 +43,8 @@ class Customer(models.Model):
             )
         ]
     )
+    # E.164 form of phone (see phones.normalize_phone), for lookups and prefix search
+    phone_e164 = models.CharField(max_length=16, null=True, blank=True, editable=False, db_index=True)
     address = models.TextField(blank=True, default='')
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES, blank=True, default='')
     date_of_birth = models.DateField(null=True, blank=True)
@@ -37,6 +60,15 @@ class Customer(models.Model):
     ]
     customer_type = models.CharField(max_length=10, choices=CUSTOMER_TYPE_CHOICES, default='shop')
 
+    objects = CustomerManager()
+
+    def save(self, *args, **kwargs):
+        self.phone_e164 = normalize_phone(self.phone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'phone_e164'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         name = f"{self.first_name} {self.last_name}" if self.first_name and self.last_name else "Unknown"
         return f"{name} ({self.phone})"
@@ -0,0 +1,54 @@
+"""
+Phone number normalization.
+
+Customers type the same number as "01712-345678", "+8801712345678" or
+"8801712345678"; ``normalize_phone`` turns them all into E.164
+("+8801712345678") so lookups hit ``Customer.phone_e164`` and don't create
+duplicates. Numbers without a country code are taken as national numbers of
+``PHONE_COUNTRY_CODE`` (default 880, Bangladesh; leading trunk 0 dropped).
+"""
+
+import re
+from django.conf import settings
+
+_SEPARATORS_RE = re.compile(r'[\s\-().]')
+
+
+def _country_code():
+    return str(getattr(settings, 'PHONE_COUNTRY_CODE', '880'))
+
+
+def _international_digits(raw):
+    """Digits with the country code, or None when ``raw`` isn't a phone number (prefix)."""
+    text = _SEPARATORS_RE.sub('', str(raw or ''))
+    if text.startswith('+'):
+        digits = text[1:]
+    elif text.startswith('00'):
+        digits = text[2:]
+    else:
+        digits = text
+        country_code = _country_code()
+        if not digits.startswith(country_code):
+            digits = country_code + (digits[1:] if digits.startswith('0') else digits)
+    return digits if digits.isdigit() else None
+
+
+def normalize_phone(raw):
+    """E.164 form of ``raw`` ("+8801712345678"), or None when it isn't a valid number."""
+    digits = _international_digits(raw)
+    if digits is None or not 8 <= len(digits) <= 15:
+        return None
+    return f'+{digits}'
+
+
+def normalize_phone_prefix(raw):
+    """E.164 prefix for a partially typed number ("0171" -> "+880171"), or None."""
+    text = _SEPARATORS_RE.sub('', str(raw or ''))
+    country_code = _country_code()
+    # "88" could be the start of the country code rather than a national number
+    if text.isdigit() and country_code.startswith(text):
+        return f'+{text}'
+    digits = _international_digits(text)
+    if not digits or len(digits) > 15:
+        return None
+    return f'+{digits}'
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Customer
+from .phones import normalize_phone
 from apps.sales.models import Sale, SaleItem
 from django.db.models import Sum, Count, Max, Q
 
@@ -39,6 +40,16 @@ class CustomerSerializer(serializers.ModelSerializer):
             'date_of_birth': {'required': False}
         }
 
+    def validate_phone(self, value):
+        # The same number in another format is the same customer
+        normalized = normalize_phone(value)
+        duplicates = Customer.objects.filter(phone_e164=normalized) if normalized else Customer.objects.none()
+        if self.instance is not None:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError("A customer with this phone number already exists.")
+        return value
+
     def get_total_sales(self, obj):
         total = Sale.objects.filter(
             customer=obj,
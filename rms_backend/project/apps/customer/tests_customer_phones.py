@@ -0,0 +1,70 @@
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.customer.models import Customer
+from apps.customer.phones import normalize_phone, normalize_phone_prefix
+from apps.sales.models import Sale
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class CustomerPhoneTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(username='cashier', password='x'))
+        self.rina = Customer.objects.create(first_name="Rina", phone="01712345678")
+
+    def test_formats_normalize_to_e164(self):
+        for raw in ["01712345678", "+8801712345678", "8801712345678", "01712-345678", "008801712345678"]:
+            self.assertEqual(normalize_phone(raw), "+8801712345678", raw)
+        self.assertIsNone(normalize_phone("call me"))
+        self.assertEqual(normalize_phone_prefix("0171"), "+880171")
+        self.assertEqual(normalize_phone_prefix("88"), "+88")
+        self.assertEqual(self.rina.phone_e164, "+8801712345678")
+
+    def test_lookups_match_any_format(self):
+        self.assertEqual(Sale.find_or_create_customer("+8801712345678", "Rina B"), self.rina)
+        data = self.client.get('/api/sales/sales/customer_lookup/', {'phone': '880 1712 345678'}).json()
+        self.assertEqual(data['customer']['id'], self.rina.id)
+
+        response = self.client.post('/api/customer/customers/', {'phone': '+8801712345678'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_rows_without_e164_are_found_by_raw_phone(self):
+        # Written without save(), e.g. by bulk_create()
+        Customer.objects.filter(pk=self.rina.pk).update(phone_e164=None)
+        self.assertEqual(Customer.objects.get_by_phone("01712345678"), self.rina)
+        self.assertEqual(Sale.find_or_create_customer("01712345678", "Rina B"), self.rina)
+        self.assertEqual(Customer.objects.count(), 1)
+
+    def test_phone_prefix_search(self):
+        Customer.objects.create(first_name="Karim", phone="+8801812345678")
+        results = self.client.get('/api/customer/customers/phone_search/', {'q': '0171'}).json()
+        self.assertEqual([row['id'] for row in results], [self.rina.id])
+        self.assertEqual(self.client.get('/api/customer/customers/phone_search/', {'q': '01'}).json(), [])
+
+        data = self.client.get('/api/customer/customers/', {'search': '+880171'}).json()
+        self.assertEqual([row['id'] for row in data['results']], [self.rina.id])
+
+    def test_merge_duplicates(self):
+        # Saved before normalization existed, in another format
+        duplicate = Customer.objects.create(first_name="", last_name="Begum", phone="+8801712345678",
+                                            email="rina@example.com", customer_type='online')
+        sale = Sale.objects.create(customer=duplicate, customer_phone=duplicate.phone,
+                                   subtotal=Decimal("10.00"), tax=Decimal("0.00"), total=Decimal("10.00"))
+
+        call_command('merge_duplicate_customers', '--dry-run', stdout=StringIO())
+        self.assertEqual(Customer.objects.count(), 2)
+
+        call_command('merge_duplicate_customers', stdout=StringIO())
+        self.rina.refresh_from_db()
+        sale.refresh_from_db()
+        self.assertEqual(Customer.objects.count(), 1)
+        self.assertEqual(sale.customer, self.rina)
+        self.assertEqual((self.rina.last_name, self.rina.email, self.rina.customer_type),
+                         ("Begum", "rina@example.com", 'both'))
@@ -1,12 +1,22 @@
+import re
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Sum, Count, Q
+from apps.response_cache import conditional_response
+from apps.sales.models import Sale, SaleItem
+from apps.inventory.models import Product
 from .models import Customer
+from .phones import normalize_phone_prefix
 from .serializers import CustomerSerializer, TopCustomerSerializer
 
+# A search made of digits (and +, spaces, dashes) is a phone number
+PHONE_QUERY_RE = re.compile(r'^\+?[\d\s\-()]{3,}$')
+# "+880" plus at least two digits, so a few keystrokes don't list every customer
+PHONE_SEARCH_MIN_LENGTH = 6
+
 class CustomerPagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
@@ -20,9 +30,9 @@ class CustomerViewSet(viewsets.ModelViewSet):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
     pagination_class = CustomerPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # ?search= is handled by get_queryset (phone numbers through the E.164 index)
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['gender', 'is_active', 'customer_type']
-    search_fields = ['first_name', 'last_name', 'email', 'phone']
     ordering_fields = ['created_at', 'first_name', 'last_name', 'ranking', 'total_sales', 'sales_count', 'last_sale_date']
     ordering = ['-created_at']
 
@@ -48,12 +58,15 @@ class CustomerViewSet(viewsets.ModelViewSet):
         # Apply search filter first (if search parameter is provided)
         search_query = self.request.query_params.get('search', None)
         if search_query:
-            queryset = queryset.filter(
-                Q(first_name__icontains=search_query) |
-                Q(last_name__icontains=search_query) |
-                Q(email__icontains=search_query) |
-                Q(phone__icontains=search_query)
-            )
+            phone_prefix = normalize_phone_prefix(search_query) if PHONE_QUERY_RE.match(search_query) else None
+            if phone_prefix:
+                queryset = queryset.filter(phone_e164__startswith=phone_prefix)
+            else:
+                queryset = queryset.filter(
+                    Q(first_name__icontains=search_query) |
+                    Q(last_name__icontains=search_query) |
+                    Q(email__icontains=search_query)
+                )
         
         # Apply additional filtering based on query parameters
         ranking_filter = self.request.query_params.get('ranking_filter', None)
@@ -91,10 +104,43 @@ class CustomerViewSet(viewsets.ModelViewSet):
         
         return queryset
 
+    # Rows carry sales totals, rankings and the full purchase history
+    @conditional_response(Customer, Sale, SaleItem, Product)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_response(Customer, Sale, SaleItem, Product)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         """Override to add any additional logic during customer creation"""
         serializer.save()
 
+    @action(detail=False, methods=['get'])
+    def phone_search(self, request):
+        """Type-ahead for the POS: customers whose number starts with ?q= (any format)"""
+        prefix = normalize_phone_prefix(request.query_params.get('q', ''))
+        if not prefix or len(prefix) < PHONE_SEARCH_MIN_LENGTH:
+            return Response([])
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            limit = 10
+        customers = Customer.objects.filter(phone_e164__startswith=prefix, is_active=True).order_by(
+            'phone_e164', 'created_at'
+        ).values('id', 'first_name', 'last_name', 'phone', 'phone_e164', 'customer_type')[:limit]
+        return Response([
+            {
+                'id': customer['id'],
+                'name': f"{customer['first_name']} {customer['last_name']}".strip(),
+                'phone': customer['phone'],
+                'phone_e164': customer['phone_e164'],
+                'customer_type': customer['customer_type'],
+            }
+            for customer in customers
+        ])
+
     @action(detail=False, methods=['get'])
     def active_customers(self, request):
         """Custom action to get only active customers"""
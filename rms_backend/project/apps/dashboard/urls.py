@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import DashboardStatsView
+from .views import DashboardStatsView, RequestMetricsView
 
 urlpatterns = [
     path('stats/', DashboardStatsView.as_view(), name='dashboard-stats'),
+    path('metrics/', RequestMetricsView.as_view(), name='request-metrics'),
 ] 
\ No newline at end of file
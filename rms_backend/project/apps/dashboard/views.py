@@ -1,8 +1,9 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from apps.json_codec import ORJSONRenderer
 from django.db.models import Sum, Count, F, Q, Max
-from django.utils import timezone
 from datetime import timedelta
 from .models import DashboardMetrics
 from apps.sales.models import Sale, SaleItem
@@ -10,40 +11,41 @@ from apps.expenses.models import Expense, ExpenseCategory
 from apps.customer.models import Customer
 from apps.inventory.models import Product
 from apps.supplier.models import Supplier
+from apps.reports.queries import ReportQuery
+from apps.utils import business_today
+from apps.db_routing import ReplicaReadMixin
+from apps.instrumentation import PrometheusRenderer, metrics_store, render_prometheus
 
-class DashboardStatsView(APIView):
+class DashboardStatsView(ReplicaReadMixin, APIView):
     def get(self, request):
-        today = timezone.now().date()
+        today = business_today()
         start_of_month = today.replace(day=1)
         
-        # Get today's metrics using Sale model for accurate profit calculation
-        today_sales = Sale.objects.filter(
-            date__date=today,
-            status='completed'
-        ).aggregate(
-            total=Sum('total'),
-            total_profit=Sum('total_profit'),
-            total_loss=Sum('total_loss')
+        # Today's and monthly metrics from one scan of this month's sales,
+        # using the Sale model for accurate profit calculation
+        sales_metrics = (
+            ReportQuery(Sale.objects.filter(
+                business_date__gte=start_of_month,
+                business_date__lte=today,
+                status='completed'
+            ))
+            .sum('today_total', 'total', default=0, business_date=today)
+            .sum('today_profit', 'total_profit', default=0, business_date=today)
+            .sum('monthly_total', 'total', default=0)
+            .sum('monthly_profit', 'total_profit', default=0)
+            .run()
         )
         
-        today_expenses = Expense.objects.filter(date=today).aggregate(total=Sum('amount'))['total'] or 0
-        
-        # Get monthly metrics using Sale model for accurate profit calculation (current month)
-        monthly_sales = Sale.objects.filter(
-            date__date__gte=start_of_month,
-            date__date__lte=today,
-            status='completed'
-        ).aggregate(
-            total=Sum('total'),
-            total_profit=Sum('total_profit'),
-            total_loss=Sum('total_loss')
+        expense_metrics = (
+            ReportQuery(Expense.objects.filter(
+                date__gte=start_of_month,
+                date__lte=today
+            ))
+            .sum('today', 'amount', default=0, date=today)
+            .sum('monthly', 'amount', default=0)
+            .run()
         )
         
-        monthly_expenses = Expense.objects.filter(
-            date__gte=start_of_month,
-            date__lte=today
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
         # Get counts
         total_customers = Customer.objects.count()
         total_products = Product.objects.count()
@@ -51,16 +53,16 @@ class DashboardStatsView(APIView):
         
         # Get sales trend using Sale model for accurate profit calculation (current month)
         sales_trend = Sale.objects.filter(
-            date__date__gte=start_of_month,
-            date__date__lte=today,
+            business_date__gte=start_of_month,
+            business_date__lte=today,
             status='completed'
-        ).values('date__date')\
+        ).values('business_date')\
             .annotate(
                 total=Sum('total'),
                 profit=Sum('total_profit'),
                 loss=Sum('total_loss')
             )\
-            .order_by('date__date')
+            .order_by('business_date')
             
         # Get expense trend (current month)
         expense_trend = Expense.objects.filter(
@@ -96,21 +98,25 @@ class DashboardStatsView(APIView):
         
         return Response({
             'today': {
-                'sales': today_sales['total'] or 0,
-                'expenses': today_expenses,
-                'profit': today_sales['total_profit'] or 0,
+                'sales': sales_metrics['today_total'],
+                'expenses': expense_metrics['today'],
+                'profit': sales_metrics['today_profit'],
             },
             'monthly': {
-                'sales': monthly_sales['total'] or 0,
-                'expenses': monthly_expenses,
-                'profit': monthly_sales['total_profit'] or 0,
+                'sales': sales_metrics['monthly_total'],
+                'expenses': expense_metrics['monthly'],
+                'profit': sales_metrics['monthly_profit'],
             },
             'counts': {
                 'customers': total_customers,
                 'products': total_products,
                 'suppliers': total_suppliers,
             },
-            'sales_trend': list(sales_trend),
+            # Keyed 'date__date' as when the trend was grouped by TruncDate('date')
+            'sales_trend': [
+                {'date__date': row['business_date'], 'total': row['total'], 'profit': row['profit'], 'loss': row['loss']}
+                for row in sales_trend
+            ],
             'expense_trend': list(expense_trend),
             'top_products': [
                 {
@@ -130,4 +136,19 @@ class DashboardStatsView(APIView):
                     'address': supplier.address
                 } for supplier in recent_suppliers
             ]
-        }) 
\ No newline at end of file
+        }) 
+
+
+class RequestMetricsView(APIView):
+    """
+    Staff-only per-endpoint request metrics collected by RequestMetricsMiddleware.
+    JSON by default; ``?format=prometheus`` (or Accept: text/plain) for Prometheus.
+    """
+    permission_classes = [IsAdminUser]
+    renderer_classes = [ORJSONRenderer, PrometheusRenderer]
+
+    def get(self, request):
+        summary = metrics_store.summary()
+        if request.accepted_renderer.format == 'prometheus':
+            return Response(render_prometheus(summary))
+        return Response({'endpoints': summary})
@@ -0,0 +1,125 @@
+"""
+Read replica routing for analytics.
+
+Reports and dashboards scan months of sales; on the primary they compete with
+POS checkout for the same connection pool and buffer pool. Views that opt in
+with ``ReplicaReadMixin`` (optionally limited to some viewset actions) send
+the reads of their GET requests to the ``REPLICA_DATABASE`` alias through
+``ReplicaRouter``; every other read, and every write, stays on the primary.
+
+Replicas lag a little, so a user who just wrote something is pinned to the
+primary for ``REPLICA_PIN_SECONDS``: ``ReplicaPinMiddleware`` records the pin
+in the shared cache after any successful unsafe request, and the mixin skips
+the replica while it lasts. Reads inside a transaction on the primary never
+go to the replica either.
+
+With no replica configured (``REPLICA_DATABASE`` empty) all of this is a
+no-op. ``use_replica()`` routes a block of code outside a request, e.g. in a
+management command.
+"""
+
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+_local = threading.local()
+
+
+def replica_alias():
+    """The configured replica alias, or None."""
+    return getattr(settings, 'REPLICA_DATABASE', None) or None
+
+
+@contextmanager
+def use_replica():
+    """Route the reads made inside the block to the replica (if there is one)."""
+    previous = getattr(_local, 'alias', None)
+    _local.alias = replica_alias()
+    try:
+        yield
+    finally:
+        _local.alias = previous
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = getattr(_local, 'alias', None)
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same rows
+        aliases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # The replica gets its schema through replication
+        if db == replica_alias():
+            return False
+        return None
+
+
+# Read-your-writes
+
+def _pin_key(user):
+    return f'rms:db-pin:{user.pk}'
+
+
+def pin_to_primary(user):
+    """Keep ``user``'s analytics reads on the primary for ``REPLICA_PIN_SECONDS``."""
+    if replica_alias() and user is not None and user.is_authenticated:
+        cache.set(_pin_key(user), True, getattr(settings, 'REPLICA_PIN_SECONDS', 10))
+
+
+def is_pinned(user):
+    return bool(user is not None and user.is_authenticated and cache.get(_pin_key(user)))
+
+
+class ReplicaPinMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            # DRF hands the user it authenticated (JWT) back to the Django request
+            pin_to_primary(getattr(request, 'user', None))
+        return response
+
+
+class ReplicaReadMixin:
+    """
+    Opt-in for analytics views: their GET requests read from the replica.
+    ``replica_actions`` limits it to those viewset actions (None: all of them).
+    """
+    replica_actions = None
+
+    def _reads_from_replica(self, request):
+        if request.method not in SAFE_METHODS or not replica_alias():
+            return False
+        if self.replica_actions is not None and getattr(self, 'action', None) not in self.replica_actions:
+            return False
+        return not is_pinned(request.user)
+
+    def initial(self, request, *args, **kwargs):
+        # After authentication, so the pin of the requesting user is known
+        super().initial(request, *args, **kwargs)
+        if self._reads_from_replica(request):
+            _local.alias = replica_alias()
+
+    def dispatch(self, request, *args, **kwargs):
+        # Restored afterwards, so a view called inside use_replica() doesn't end the block
+        previous = getattr(_local, 'alias', None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _local.alias = previous
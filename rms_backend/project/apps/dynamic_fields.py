@@ -0,0 +1,62 @@
+"""
+Client-selected serializer fields.
+
+A serializer using ``DynamicFieldsMixin`` renders its default fields, minus
+the ones listed in ``Meta.expandable_fields`` (nested collections that cost
+extra queries). Clients opt in with ``?expand=items,sale_payments``, pick
+exactly what they need with ``?fields=id,total`` or drop fields from the
+default set with ``?omit=description,features``.
+
+``Meta.query_plan`` maps a field to the ``(select_related, prefetch_related)``
+lookups it needs, and views call ``optimize_queryset`` so only the data that
+is rendered gets loaded, with a fixed number of queries per page.
+"""
+
+
+def query_param_set(request, name):
+    """Comma-separated query parameter as a set of names."""
+    if request is None:
+        return set()
+    value = request.query_params.get(name, '')
+    return {part.strip() for part in value.split(',') if part.strip()}
+
+
+class DynamicFieldsMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        # Writes always validate against the full field set
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return
+        selected = set(self.selected_fields(request))
+        for name in list(self.fields):
+            if name not in selected:
+                self.fields.pop(name)
+
+    @classmethod
+    def selected_fields(cls, request):
+        """Names of ``Meta.fields`` rendered for ``request``."""
+        expandable = set(getattr(cls.Meta, 'expandable_fields', ()))
+        expand = query_param_set(request, 'expand')
+        requested = query_param_set(request, 'fields')
+        omit = query_param_set(request, 'omit')
+        if requested:
+            selected = [name for name in cls.Meta.fields if name in requested or name in expand]
+        else:
+            selected = [name for name in cls.Meta.fields if name not in expandable or name in expand]
+        return [name for name in selected if name not in omit]
+
+    @classmethod
+    def optimize_queryset(cls, queryset, request):
+        """Apply the ``Meta.query_plan`` lookups of the fields that will be rendered."""
+        plan = getattr(cls.Meta, 'query_plan', {})
+        select_related, prefetch_related = [], []
+        for name in cls.selected_fields(request):
+            select, prefetch = plan.get(name, ((), ()))
+            select_related += [lookup for lookup in select if lookup not in select_related]
+            prefetch_related += [lookup for lookup in prefetch if lookup not in prefetch_related]
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
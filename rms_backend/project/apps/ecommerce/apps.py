@@ -5,16 +5,11 @@ class EcommerceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.ecommerce'
 
-
-
-
-
-
-
-
-
-
-
-
-
-
+    def ready(self):
+        from apps.response_cache import track_versions
+        from .models import Brand, DeliverySettings, HeroSlide, HomePageSettings, PromotionalModal
+        from .product_detail import connect_product_detail_signals
+
+        # Public storefront config responses are cached per data version
+        track_versions(Brand, DeliverySettings, HeroSlide, HomePageSettings, PromotionalModal)
+        connect_product_detail_signals()
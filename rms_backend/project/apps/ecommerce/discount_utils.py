@@ -99,10 +99,13 @@ def calculate_discounted_price(product, original_price=None):
     if original_price is None:
         original_price = product.selling_price
     
+    return price_with_discount(original_price, get_applicable_discount(product))
+
+
+def price_with_discount(original_price, discount):
+    """Price info dict (see calculate_discounted_price) for an already resolved discount."""
     original_price = Decimal(str(original_price))
-    
-    discount = get_applicable_discount(product)
-    
+
     if discount:
         discount_value = Decimal(str(discount.value))
         discount_amount = (original_price * discount_value / Decimal('100')).quantize(Decimal('0.01'))
@@ -128,6 +131,94 @@ def calculate_discounted_price(product, original_price=None):
     }
 
 
+def get_applicable_discounts(products):
+    """
+    Batch version of get_applicable_discount for many products.
+
+    Resolves the same priority rules in a constant number of queries by
+    loading the currently active discounts and their targets once.
+
+    Args:
+        products: iterable of Product instances (prefetch ``online_categories``
+            to save a query)
+
+    Returns:
+        dict of product id -> Discount object or None
+    """
+    from .models import Discount
+
+    products = list(products)
+    if not products:
+        return {}
+
+    now = timezone.now()
+    discounts = {
+        discount.id: discount
+        for discount in Discount.objects.filter(is_active=True, start_date__lte=now, end_date__gte=now)
+    }
+    resolved = {product.id: None for product in products}
+    if not discounts:
+        return resolved
+
+    def best(candidates):
+        # Highest value wins, as with order_by('-value').first()
+        return max(candidates, key=lambda discount: discount.value, default=None)
+
+    product_ids = list(resolved)
+    by_product = {}
+    for discount_id, product_id in Discount.products.through.objects.filter(
+        discount_id__in=discounts, product_id__in=product_ids
+    ).values_list('discount_id', 'product_id'):
+        if discounts[discount_id].discount_type == 'PRODUCT':
+            by_product.setdefault(product_id, []).append(discounts[discount_id])
+
+    by_category = {}
+    for discount_id, category_id in Discount.categories.through.objects.filter(
+        discount_id__in=discounts
+    ).values_list('discount_id', 'category_id'):
+        by_category.setdefault(category_id, []).append(discounts[discount_id])
+
+    by_online_category = {}
+    for discount_id, category_id in Discount.online_categories.through.objects.filter(
+        discount_id__in=discounts
+    ).values_list('discount_id', 'onlinecategory_id'):
+        by_online_category.setdefault(category_id, []).append(discounts[discount_id])
+
+    # Global discounts must be truly global (no specific products or categories)
+    targeted = set()
+    for rows in (by_category.values(), by_online_category.values()):
+        targeted.update(discount.id for row in rows for discount in row)
+    targeted.update(
+        Discount.products.through.objects.filter(discount_id__in=discounts).values_list('discount_id', flat=True).distinct()
+    )
+    global_discount = best(
+        discount for discount in discounts.values()
+        if discount.discount_type == 'APP_WIDE' and discount.id not in targeted
+    )
+
+    for product in products:
+        discount = best(by_product.get(product.id, []))
+        if discount is None:
+            candidates = list(by_category.get(product.category_id, []))
+            for online_category in product.online_categories.all():
+                candidates += by_online_category.get(online_category.id, [])
+            discount = best(d for d in candidates if d.discount_type == 'CATEGORY')
+        resolved[product.id] = discount or global_discount
+    return resolved
+
+
+def calculate_discounted_prices(products):
+    """
+    Batch version of calculate_discounted_price.
+
+    Returns:
+        dict of product id -> price info dict (see calculate_discounted_price)
+    """
+    products = list(products)
+    discounts = get_applicable_discounts(products)
+    return {product.id: price_with_discount(product.selling_price, discounts[product.id]) for product in products}
+
+
 def get_discount_info_for_serializer(product):
     """
     Convenience function to get discount info formatted for API responses.
@@ -0,0 +1,173 @@
+"""
+Cached product detail documents for the storefront product page.
+
+One document per product holds everything PublicProductDetailByColorView
+needs for every color: product info, discount info, images and sizes. It is
+cached under the product's own data version, which is bumped when the product,
+its variations, galleries, images or online categories change. Discount and
+category edits bump their model-wide versions, which are part of every key.
+Stock is overlaid from one live query, so it is fresh even after writes that
+bypass signals (e.g. F() stock updates).
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils import timezone
+from django.utils.text import slugify
+from apps.inventory.models import Category, Gallery, Image, Product, ProductVariation
+from apps.response_cache import (
+    DEFAULT_TIMEOUT, bump_object_version, bump_version, data_version, object_version, track_versions,
+)
+from .discount_utils import calculate_discounted_price
+from .models import Discount
+
+
+def _document_key(product_id):
+    return (
+        f'rms:product-detail:{product_id}:{object_version(Product, product_id)}:'
+        f'{data_version(Discount, Category)}'
+    )
+
+
+def _discount_timeout():
+    """Seconds until the next discount starts or ends, capped at DEFAULT_TIMEOUT."""
+    now = timezone.now()
+    boundaries = [
+        start if start > now else end
+        for start, end in Discount.objects.filter(is_active=True, end_date__gte=now).values_list('start_date', 'end_date')
+    ]
+    return max(1, int(min([DEFAULT_TIMEOUT] + [(boundary - now).total_seconds() for boundary in boundaries])))
+
+
+def build_product_detail(product_id):
+    """Assemble the detail document of an active online product, or None."""
+    try:
+        product = Product.objects.select_related('category').get(
+            id=product_id, is_active=True, assign_to_online=True
+        )
+    except Product.DoesNotExist:
+        return None
+
+    galleries = {}
+    for gallery in Gallery.objects.filter(product=product).prefetch_related('images'):
+        galleries.setdefault(gallery.color.lower(), gallery)
+
+    colors = {}
+    for variation in ProductVariation.objects.filter(product=product, is_active=True).order_by('pk'):
+        color_name = variation.color.strip()
+        color_key = slugify(color_name)
+        color = colors.get(color_key)
+        if color is None:
+            gallery = galleries.get(color_name.lower())
+            if gallery:
+                images = [
+                    {'type': image.imageType, 'url': image.image.url}
+                    for image in sorted(gallery.images.all(), key=lambda image: image.imageType)
+                    if image.image
+                ]
+            else:
+                # Fallback to product default image
+                images = [{'type': 'PRIMARY', 'url': product.image.url}] if product.image else []
+            color = colors[color_key] = {
+                'color_name': color_name,
+                'color_slug': color_key,
+                'color_hex': variation.color_hax or None,
+                'images': images,
+                'sizes': [],
+            }
+        color['sizes'].append(variation.size)
+
+    for color in colors.values():
+        color['sizes'].sort()
+
+    discount_info = calculate_discounted_price(product)
+    return {
+        'product': {
+            'id': product.id,
+            'name': product.name,
+            'price': str(product.selling_price),
+            'category': product.category.name if product.category else None,
+        },
+        'discount_info': discount_info if discount_info['discount_type'] else None,
+        'colors': colors,
+    }
+
+
+def get_product_detail(product_id):
+    """The cached detail document of ``product_id`` (None if not sold online)."""
+    key = _document_key(product_id)
+    document = cache.get(key)
+    if document is None:
+        document = build_product_detail(product_id) or {}
+        cache.set(key, document, _discount_timeout())
+    return document or None
+
+
+def live_stock(product_id):
+    """Current stock per (color slug, size) for the product's active variations."""
+    stock = {}
+    for color, size, quantity in ProductVariation.objects.filter(
+        product_id=product_id, is_active=True
+    ).values_list('color', 'size', 'stock'):
+        key = (slugify(color.strip()), size)
+        stock[key] = stock.get(key, 0) + max(0, quantity)
+    return stock
+
+
+def _bump_product(product_id):
+    if product_id:
+        bump_object_version(Product, product_id)
+
+
+def _product_changed(sender, instance, **kwargs):
+    _bump_product(instance.pk)
+
+
+def _variation_or_gallery_changed(sender, instance, **kwargs):
+    _bump_product(instance.product_id)
+
+
+def _image_changed(sender, instance, **kwargs):
+    # During a gallery cascade the gallery may already be gone; its own signal covers that
+    for product_id in Gallery.objects.filter(pk=instance.gallery_id).values_list('product_id', flat=True):
+        _bump_product(product_id)
+
+
+def _product_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            _bump_product(instance.pk)
+    elif action == 'pre_clear':
+        # Cleared from the category side: bump every product still linked
+        for product_id in instance.products.values_list('pk', flat=True):
+            _bump_product(product_id)
+    elif action in ('post_add', 'post_remove'):
+        for product_id in pk_set:
+            _bump_product(product_id)
+
+
+def _discount_targets_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        transaction.on_commit(lambda: bump_version(Discount))
+
+
+def connect_product_detail_signals():
+    track_versions(Discount, Category)
+    for model, handler in [
+        (Product, _product_changed),
+        (ProductVariation, _variation_or_gallery_changed),
+        (Gallery, _variation_or_gallery_changed),
+        (Image, _image_changed),
+    ]:
+        post_save.connect(handler, sender=model, dispatch_uid=f'product-detail-save-{model._meta.label}')
+        post_delete.connect(handler, sender=model, dispatch_uid=f'product-detail-delete-{model._meta.label}')
+    m2m_changed.connect(
+        _product_categories_changed, sender=Product.online_categories.through,
+        dispatch_uid='product-detail-online-categories',
+    )
+    for field in ['products', 'categories', 'online_categories']:
+        m2m_changed.connect(
+            _discount_targets_changed, sender=getattr(Discount, field).through,
+            dispatch_uid=f'product-detail-discount-{field}',
+        )
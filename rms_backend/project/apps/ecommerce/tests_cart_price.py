@@ -0,0 +1,88 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.ecommerce.discount_utils import get_applicable_discount, get_applicable_discounts
+from apps.ecommerce.models import DeliverySettings, Discount
+from apps.inventory.models import Category, OnlineCategory, Product, ProductVariation
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class CartPriceTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        DeliverySettings.load()
+        self.category = Category.objects.create(name="Shirts", slug="shirts")
+        self.other_category = Category.objects.create(name="Pants", slug="pants")
+        self.online_category = OnlineCategory.objects.create(name="Summer", slug="summer")
+        self.products = []
+        for index in range(6):
+            product = Product.objects.create(
+                name=f"Product {index}",
+                category=self.category if index < 3 else self.other_category,
+                cost_price=Decimal("10.00"),
+                selling_price=Decimal("100.00"),
+                assign_to_online=True,
+            )
+            for size in ['M', 'L']:
+                ProductVariation.objects.create(product=product, size=size, color='Black', stock=3)
+            self.products.append(product)
+        self.products[4].online_categories.add(self.online_category)
+
+        now = timezone.now()
+        window = {'start_date': now - timedelta(days=1), 'end_date': now + timedelta(days=1)}
+        Discount.objects.create(name="Sitewide", discount_type='APP_WIDE', value=Decimal("5"), **window)
+        Discount.objects.create(name="Shirts", discount_type='CATEGORY', value=Decimal("10"), **window) \
+            .categories.add(self.category)
+        Discount.objects.create(name="Summer", discount_type='CATEGORY', value=Decimal("15"), **window) \
+            .online_categories.add(self.online_category)
+        Discount.objects.create(name="Hero", discount_type='PRODUCT', value=Decimal("20"), **window) \
+            .products.add(self.products[0])
+        Discount.objects.create(
+            name="Expired", discount_type='PRODUCT', value=Decimal("50"),
+            start_date=now - timedelta(days=5), end_date=now - timedelta(days=2),
+        ).products.add(self.products[1])
+
+    def test_batch_resolver_matches_single_product_rules(self):
+        """Product > category (incl. online category) > global, as per product"""
+        products = Product.objects.prefetch_related('online_categories').filter(pk__in=[p.pk for p in self.products])
+        resolved = get_applicable_discounts(products)
+        for product in self.products:
+            self.assertEqual(resolved[product.id], get_applicable_discount(product), product.name)
+        self.assertEqual(resolved[self.products[0].id].name, "Hero")
+        self.assertEqual(resolved[self.products[4].id].name, "Summer")
+        self.assertEqual(resolved[self.products[5].id].name, "Sitewide")
+
+    def cart(self, products, **extra):
+        items = [
+            {'productId': p.id, 'quantity': 2, 'variations': {'color': 'black', 'size': 'm'}}
+            for p in products
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/ecommerce/public/cart/price/', {'items': items, **extra}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(ctx.captured_queries)
+
+    def test_query_count_is_constant_in_cart_size(self):
+        """Full and lean responses cost the same queries for 1 or 6 lines"""
+        _, one = self.cart(self.products[:1])
+        data, six = self.cart(self.products)
+        self.assertEqual(one, six)
+        self.assertEqual(len(data['products']), 6)
+
+        _, lean_one = self.cart(self.products[:1], lean=True)
+        data, lean_six = self.cart(self.products, lean=True)
+        self.assertEqual(lean_one, lean_six)
+        self.assertLess(lean_six, six)
+        self.assertNotIn('products', data)
+
+    def test_stock_and_prices_from_prefetched_variations(self):
+        """Line stock matches the variant case-insensitively and prices apply discounts"""
+        data, _ = self.cart(self.products[:1], lean=True)
+        line = data['items'][0]
+        self.assertEqual(line['max_stock'], 3)
+        self.assertEqual(line['unit_price'], 80.0)
+        self.assertEqual(data['subtotal'], 160.0)
@@ -0,0 +1,53 @@
+import gzip
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.compression import choose_encoding
+from apps.inventory.models import Category, Product, ProductVariation, StockMovement
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'compression-tests'}},
+    COMPRESS_MIN_SIZE=1024,
+)
+class CompressionTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(username='manager', password='x'))
+        with self.captureOnCommitCallbacks(execute=True):
+            category = Category.objects.create(name="Shirts", slug="shirts")
+            self.product = Product.objects.create(name="Polo", category=category, cost_price=Decimal("10.00"),
+                                                  selling_price=Decimal("20.00"))
+            variation = ProductVariation.objects.create(product=self.product, size="M", color="Navy", stock=3)
+            for index in range(30):
+                StockMovement.objects.create(product=self.product, variation=variation, movement_type='IN',
+                                             quantity=1, reference_number=f"GR-{index}", notes="Restock")
+        self.url = f'/api/inventory/products/{self.product.id}/stock_history/'
+
+    def test_negotiation(self):
+        self.assertEqual(choose_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(choose_encoding('gzip;q=0, identity'), None)
+        self.assertEqual(choose_encoding(''), None)
+
+    def test_large_json_is_compressed(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content).count(b'GR-'), 30)
+
+        # Small bodies are sent as they are
+        response = self.client.get('/api/inventory/categories/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_unchanged_data_revalidates_to_304(self):
+        etag = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StockMovement.objects.create(product=self.product, movement_type='ADJ', quantity=-1)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
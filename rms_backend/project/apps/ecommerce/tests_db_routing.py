@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import tempfile
+from unittest import mock, skipUnless
+from django.contrib.auth import get_user_model
+from django.db import connection, connections, transaction
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from apps.customer.models import Customer
+from apps.db_routing import ReplicaRouter, is_pinned, use_replica
+from apps.sales.models import Sale
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'routing-tests'}},
+    REPLICA_DATABASE='replica',
+)
+class ReplicaRoutingTest(TransactionTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(username='manager', password='x')
+        self.client.force_authenticate(self.user)
+
+    def test_router(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Sale))
+        with use_replica():
+            self.assertEqual(router.db_for_read(Sale), 'replica')
+            self.assertEqual(router.db_for_write(Sale), 'default')
+            with transaction.atomic():
+                self.assertIsNone(router.db_for_read(Sale))
+        self.assertIsNone(router.db_for_read(Sale))
+
+    def routed_reads(self, url):
+        """Aliases the router picks for the reads of a GET ('replica' isn't configured, so they run on the primary)."""
+        aliases = []
+        db_for_read = ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            aliases.append(db_for_read(router, model, **hints))
+            return None
+
+        with mock.patch.object(ReplicaRouter, 'db_for_read', record):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return set(aliases)
+
+    def test_analytics_reads_go_to_the_replica(self):
+        self.assertEqual(self.routed_reads('/api/dashboard/stats/'), {'replica'})
+        self.assertEqual(self.routed_reads('/api/sales/sales/dashboard_stats/'), {'replica'})
+        # Other reads stay on the primary
+        self.assertEqual(self.routed_reads('/api/sales/sales/'), {None})
+
+    def test_writes_pin_the_user_to_the_primary(self):
+        response = self.client.post('/api/customer/customers/', {'first_name': 'Rina', 'phone': '01712345678'},
+                                    format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(is_pinned(self.user))
+        self.assertEqual(self.routed_reads('/api/dashboard/stats/'), {None})
+
+
+@skipUnless(connection.vendor == 'sqlite', 'copies the SQLite test database')
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'replica-tests'}},
+    REPLICA_DATABASE='replica',
+)
+class SecondDatabaseTest(TransactionTestCase):
+    """A replica that is a real second SQLite file (DB_REPLICA_NAME), a copy of the primary."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(username='manager', password='x'))
+        Customer.objects.create(first_name='Rina', phone='01712345678')
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connection.ensure_connection()
+        copy = sqlite3.connect(self.path)
+        connection.connection.backup(copy)
+        copy.close()
+        connections.settings['replica'] = {**connection.settings_dict, 'NAME': self.path}
+        # Written after the copy: only the primary has it
+        Customer.objects.create(first_name='Karim', phone='01812345678')
+
+    def tearDown(self):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        os.remove(self.path)
+
+    def test_reads_come_from_the_second_database(self):
+        self.assertEqual(Customer.objects.count(), 2)
+        with use_replica():
+            self.assertEqual(Customer.objects.count(), 1)
+            self.assertEqual(self.client.get('/api/dashboard/stats/').json()['counts']['customers'], 1)
+            # The view doesn't end the enclosing block
+            self.assertEqual(Customer.objects.count(), 1)
+        self.assertEqual(self.client.get('/api/dashboard/stats/').json()['counts']['customers'], 1)
+        self.assertEqual(Customer.objects.count(), 2)
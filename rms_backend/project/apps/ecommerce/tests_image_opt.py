@@ -1,4 +1,6 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from django.test import TestCase, override_settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from PIL import Image
 from io import BytesIO
@@ -6,7 +8,17 @@ from apps.inventory.models import Product, Category
 from apps.ecommerce.models import HeroSlide
 from decimal import Decimal
 
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+# Uploads go to a scratch directory, not the project's media/
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class ImageOptimizationTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
     def setUp(self):
         # Create a category required for product
         self.category = Category.objects.create(name="Test Category", slug="test-category")
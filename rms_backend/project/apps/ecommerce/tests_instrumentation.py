@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.instrumentation import metrics_store
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class RequestMetricsTest(TestCase):
+    def setUp(self):
+        metrics_store.reset()
+        self.client = APIClient()
+        self.staff = get_user_model().objects.create_user(username='staff', password='x', is_staff=True)
+
+    def test_server_timing_header(self):
+        """Every response reports total, DB and serializer time"""
+        response = self.client.get('/api/ecommerce/public/brands/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('total;dur=', response['Server-Timing'])
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('serializer;dur=', response['Server-Timing'])
+
+    def test_metrics_endpoint_is_staff_only(self):
+        """Anonymous and non-staff users cannot read the metrics"""
+        self.assertEqual(self.client.get('/api/dashboard/metrics/').status_code, 401)
+        user = get_user_model().objects.create_user(username='clerk', password='x')
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.get('/api/dashboard/metrics/').status_code, 403)
+
+    def test_metrics_endpoint_aggregates_per_view(self):
+        """Requests are aggregated per view and exposed as JSON and Prometheus text"""
+        for _ in range(3):
+            self.client.get('/api/ecommerce/public/brands/')
+        self.client.force_authenticate(self.staff)
+
+        response = self.client.get('/api/dashboard/metrics/')
+        self.assertEqual(response.status_code, 200)
+        brands = next(e for e in response.json()['endpoints'] if e['view'] == 'public-brands')
+        self.assertEqual(brands['count'], 3)
+        self.assertIn('0.95', brands['quantiles_ms'])
+
+        response = self.client.get('/api/dashboard/metrics/?format=prometheus')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('rms_request_duration_seconds_count{view="public-brands",method="GET"} 3', body)
+        self.assertIn('# TYPE rms_db_queries_total counter', body)
@@ -0,0 +1,41 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.inventory.models import Category, Product
+from apps.json_codec import dumps
+from apps.sales.models import Sale
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class JSONCodecTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(username='manager', password='x'))
+        self.category = Category.objects.create(name="Shirts", slug="shirts")
+
+    def test_dumps(self):
+        Product.objects.create(name="Polo", category=self.category, cost_price=Decimal("10.00"),
+                               selling_price=Decimal("19.99"))
+        rows = Product.objects.values('name', 'selling_price')
+        self.assertEqual(dumps({'rows': rows, 1: {'x'}}), b'{"rows":[{"name":"Polo","selling_price":19.99}],"1":["x"]}')
+
+    def test_decimals_are_numbers_both_ways(self):
+        response = self.client.post('/api/inventory/products/', {
+            'name': 'Oxford', 'category': self.category.id, 'cost_price': 12.5, 'selling_price': '24.90',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual((response.json()['cost_price'], response.json()['selling_price']), (12.5, 24.9))
+        self.assertEqual(Product.objects.get(name='Oxford').cost_price, Decimal('12.50'))
+
+        response = self.client.post('/api/inventory/products/', b'{"name":', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_dashboard_numbers(self):
+        Sale.objects.create(subtotal=Decimal("20.00"), tax=Decimal("0.00"), total=Decimal("20.00"), status='completed')
+        data = self.client.get('/api/sales/sales/dashboard_stats/').json()
+        self.assertEqual(data['today']['total_sales'], 20.0)
+        self.assertEqual(data['payment_method_distribution'][0]['total'], 20.0)
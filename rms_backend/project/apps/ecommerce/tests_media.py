@@ -0,0 +1,46 @@
+import shutil
+import tempfile
+from decimal import Decimal
+from io import BytesIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from apps.inventory.models import Category, Product
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], MEDIA_ROOT=MEDIA_ROOT)
+class MediaDeliveryTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        file = BytesIO()
+        Image.new('RGB', (40, 40), 'red').save(file, 'JPEG')
+        self.product = Product.objects.create(
+            name="Polo", category=Category.objects.create(name="Shirts", slug="shirts"),
+            cost_price=Decimal("10.00"), selling_price=Decimal("20.00"),
+            image=SimpleUploadedFile("polo.jpg", file.getvalue(), content_type="image/jpeg"),
+        )
+        self.url = self.product.image.url
+
+    def test_hashed_images_are_immutable(self):
+        self.assertRegex(self.product.image.name, r'^products/polo\.[0-9a-f]{12}\.webp$')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(b''.join(response.streaming_content)[:4], b'RIFF')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get('/media/../rms/settings.py').status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE='nginx', MEDIA_ACCEL_PREFIX='/protected-media/')
+    def test_web_server_sends_the_bytes(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.product.image.name}')
+        self.assertEqual(response.content, b'')
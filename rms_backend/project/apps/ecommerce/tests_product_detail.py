@@ -0,0 +1,63 @@
+from decimal import Decimal
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.inventory.models import Category, Product, ProductVariation
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'product-detail-tests'}},
+)
+class ProductDetailCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        category = Category.objects.create(name="Test Category", slug="test-category")
+        self.product = Product.objects.create(
+            name="Test Product",
+            category=category,
+            cost_price=Decimal("10.00"),
+            selling_price=Decimal("20.00"),
+            assign_to_online=True,
+        )
+        for size in ['M', 'L']:
+            ProductVariation.objects.create(product=self.product, size=size, color='Navy Blue', stock=5)
+        ProductVariation.objects.create(product=self.product, size='M', color='Black', stock=0)
+        self.url = f'/api/ecommerce/public/product-details/{self.product.id}/navy-blue/'
+
+    def test_cached_document_serves_colors_with_one_query(self):
+        """After the first request only the live stock query hits the database"""
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        data = response.json()
+        self.assertEqual(data['color']['name'], 'Navy Blue')
+        self.assertEqual([s['size'] for s in data['sizes']], ['L', 'M'])
+        self.assertEqual(data['total_stock_for_color'], 10)
+        self.assertEqual({c['color_slug']: c['total_stock'] for c in data['available_colors']},
+                         {'navy-blue': 10, 'black': 0})
+
+    def test_stock_is_live_without_invalidation(self):
+        """Stock written with queryset.update() (no signals) is still reflected"""
+        self.client.get(self.url)
+        ProductVariation.objects.filter(product=self.product, color='Navy Blue', size='M').update(stock=0)
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['total_stock_for_color'], 5)
+        self.assertFalse(next(s for s in data['sizes'] if s['size'] == 'M')['in_stock'])
+
+    def test_price_edit_invalidates_document(self):
+        """Saving the product rebuilds its document"""
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.selling_price = Decimal("25.00")
+            self.product.save()
+        self.assertEqual(self.client.get(self.url).json()['product']['price'], '25.00')
+
+    def test_unknown_color_and_offline_product(self):
+        """Missing colors and products not sold online return 404"""
+        self.assertEqual(self.client.get(f'/api/ecommerce/public/product-details/{self.product.id}/red/').status_code, 404)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.assign_to_online = False
+            self.product.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
@@ -0,0 +1,49 @@
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.ecommerce.models import Brand, PromotionalModal
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'response-cache-tests'}}
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], CACHES=LOCMEM_CACHE)
+class VersionedResponseCacheTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = APIClient()
+        Brand.objects.create(name="Raw Stitch", display_order=1)
+
+    def test_etag_revalidation_skips_database(self):
+        """A matching If-None-Match is answered with 304 from the cache alone"""
+        response = self.client.get('/api/ecommerce/public/brands/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['name'], "Raw Stitch")
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/ecommerce/public/brands/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_save_bumps_version(self):
+        """Saving a brand makes the next request rebuild the response"""
+        etag = self.client.get('/api/ecommerce/public/brands/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Brand.objects.create(name="Second Brand", display_order=2)
+
+        response = self.client.get('/api/ecommerce/public/brands/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual([brand['name'] for brand in response.json()], ["Raw Stitch", "Second Brand"])
+
+    def test_upcoming_promotional_modal_is_not_served(self):
+        """Modals that have not started yet are excluded from the cached list"""
+        now = timezone.now()
+        PromotionalModal.objects.create(
+            title="Eid Sale", start_date=now + timedelta(days=1), end_date=now + timedelta(days=5)
+        )
+        response = self.client.get('/api/ecommerce/public/promotional-modals/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
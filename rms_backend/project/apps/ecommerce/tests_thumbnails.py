@@ -0,0 +1,75 @@
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.inventory.models import Category, Gallery, Image, Product, ProductVariation
+from apps.online_preorder.models import OnlinePreorder
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'thumbnail-tests'}},
+)
+class OrderItemThumbnailTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        category = Category.objects.create(name="Shirts", slug="shirts")
+        self.shirt = self.create_product("Shirt", category)
+        self.cap = self.create_product("Cap", category)
+        ProductVariation.objects.create(product=self.shirt, size="M", color="Blue", stock=5)
+        ProductVariation.objects.create(product=self.shirt, size="M", color="Red", stock=5)
+        gallery = Gallery.objects.create(product=self.shirt, color="Blue")
+        # bulk_create: no upload to optimize, just a stored file name
+        Image.objects.bulk_create([Image(gallery=gallery, imageType='PRIMARY', image='gallery/1/blue/primary.webp')])
+        for _ in range(2):
+            self.create_order()
+
+    def create_product(self, name, category):
+        return Product.objects.create(
+            name=name, category=category, cost_price=Decimal("10.00"), selling_price=Decimal("20.00"),
+        )
+
+    def create_order(self):
+        return OnlinePreorder.objects.create(
+            customer_name="Rina",
+            customer_phone="01700000001",
+            items=[
+                {'product_id': self.shirt.id, 'quantity': 1},
+                {'product_id': str(self.cap.id), 'quantity': 2},
+                {'product_id': 999999, 'quantity': 1},
+            ],
+        )
+
+    def get_orders(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/online-preorder/orders/')
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+
+    def test_items_are_enriched_per_page(self):
+        orders, cold = self.get_orders()
+        items = orders[0]['items']
+        self.assertEqual(items[0]['product_name'], "Shirt")
+        self.assertEqual(items[0]['product_image'], 'http://testserver/media/gallery/1/blue/primary.webp')
+        self.assertEqual(items[1]['product_name'], "Cap")
+        self.assertNotIn('product_image', items[1])
+        self.assertNotIn('product_name', items[2])
+
+        # More orders on the page don't add queries, and cached thumbnails skip the lookups
+        for _ in range(3):
+            self.create_order()
+        cache.clear()
+        _, cold_more = self.get_orders()
+        _, warm = self.get_orders()
+        self.assertEqual(cold, cold_more)
+        self.assertEqual(warm, cold - 5)
+
+    def test_gallery_change_refreshes_thumbnail(self):
+        self.get_orders()
+        with self.captureOnCommitCallbacks(execute=True):
+            Image.objects.get().delete()
+        orders, _ = self.get_orders()
+        self.assertNotIn('product_image', orders[0]['items'][0])
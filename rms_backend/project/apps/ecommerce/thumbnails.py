@@ -0,0 +1,109 @@
+"""
+Product thumbnails: the primary photo of a product's first variation, falling
+back to the product image.
+
+Looking one up costs three queries (first variation, its color's gallery,
+the gallery's primary image), so lists resolve all their products at once
+and keep the result per product in the cache. Entries are keyed by the
+product's data version, which product_detail's signals bump whenever the
+product, its variations, galleries or images change.
+"""
+
+from django.core.cache import cache
+from django.db.models import Min
+from rest_framework.serializers import ListSerializer
+from apps.inventory.models import Gallery, Image, Product, ProductVariation
+from apps.response_cache import DEFAULT_TIMEOUT, object_versions
+
+
+def _key(product_id, version):
+    return f'rms:product-thumbnail:{product_id}:{version}'
+
+
+def _load(product_ids):
+    """{product_id: thumbnail} from the database, in five queries."""
+    products = {
+        row['id']: {'name': row['name'], 'image': None, 'from_gallery': False, 'fallback': row['image']}
+        for row in Product.objects.filter(id__in=product_ids).values('id', 'name', 'image')
+    }
+    first_ids = ProductVariation.objects.filter(product_id__in=products).values('product_id').annotate(
+        first_id=Min('id')
+    ).order_by().values_list('first_id', flat=True)
+    colors = dict(ProductVariation.objects.filter(id__in=list(first_ids)).values_list('product_id', 'color'))
+
+    # Gallery of the first variation's color; an exact match wins over a case-insensitive one
+    # (MySQL compares colors case-insensitively, other backends don't)
+    galleries = {}
+    for gallery_id, product_id, color in Gallery.objects.filter(product_id__in=colors).values_list(
+        'id', 'product_id', 'color'
+    ):
+        if color == colors[product_id] or (
+            product_id not in galleries and color.lower() == colors[product_id].lower()
+        ):
+            galleries[product_id] = gallery_id
+    gallery_products = {gallery_id: product_id for product_id, gallery_id in galleries.items()}
+    for gallery_id, image in Image.objects.filter(
+        gallery_id__in=gallery_products, imageType='PRIMARY'
+    ).values_list('gallery_id', 'image'):
+        if image:
+            product = products[gallery_products[gallery_id]]
+            product['image'] = Image.image.field.storage.url(image)
+            product['from_gallery'] = True
+
+    for product in products.values():
+        fallback = product.pop('fallback')
+        if not product['image'] and fallback:
+            product['image'] = Product.image.field.storage.url(fallback)
+    return products
+
+
+def product_thumbnails(product_ids):
+    """
+    ``{product_id: {'name', 'image', 'from_gallery'}}`` for existing products.
+
+    ``image`` is the storage URL (usually relative; see ``absolute_url``) or
+    None; ``from_gallery`` is False when it is the product image fallback.
+    """
+    product_ids = {product_id for product_id in product_ids if product_id}
+    if not product_ids:
+        return {}
+    keys = {_key(product_id, version): product_id for product_id, version in object_versions(Product, product_ids).items()}
+    found = cache.get_many(keys)
+    thumbnails = {keys[key]: value for key, value in found.items()}
+
+    missing = product_ids - set(thumbnails)
+    if missing:
+        loaded = _load(missing)
+        # Unknown ids are cached too, so they don't cost queries on every page
+        fresh = {product_id: loaded.get(product_id) for product_id in missing}
+        cache.set_many(
+            {key: fresh[product_id] for key, product_id in keys.items() if product_id in fresh},
+            DEFAULT_TIMEOUT,
+        )
+        thumbnails.update(fresh)
+    return {product_id: thumbnail for product_id, thumbnail in thumbnails.items() if thumbnail}
+
+
+def absolute_url(request, url):
+    if url and request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def page_thumbnails(serializer, instance, product_ids_of):
+    """
+    Thumbnails for ``instance`` as rendered by ``serializer``.
+
+    When the serializer renders a list, the products of the whole page
+    (``product_ids_of(obj)`` for every object) are resolved on first use and
+    kept in the serializer context for the other rows.
+    """
+    memo = serializer.context.setdefault('product_thumbnails', {})
+    wanted = set(product_ids_of(instance)) - memo.keys()
+    if wanted:
+        parent = serializer.parent
+        page = parent.instance if isinstance(parent, ListSerializer) and parent.instance is not None else []
+        ids = ({product_id for obj in page for product_id in product_ids_of(obj)} | wanted) - memo.keys()
+        thumbnails = product_thumbnails(ids)
+        memo.update({product_id: thumbnails.get(product_id) for product_id in ids})
+    return memo
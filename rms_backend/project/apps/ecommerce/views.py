@@ -16,13 +16,16 @@ from .serializers import (
 )
 from django.utils.text import slugify
 from apps.inventory.models import Product, ProductVariation, Gallery, Image, OnlineCategory
+from apps.inventory.search import search_queryset
 from apps.inventory.serializers import EcommerceProductSerializer
 from apps.customer.models import Customer
 from apps.online_preorder.models import OnlinePreorder
 from apps.online_preorder.serializers import OnlinePreorderSerializer, OnlinePreorderCreateSerializer
 from django.db.models import Sum
 from decimal import Decimal
-from .discount_utils import calculate_discounted_price
+from .discount_utils import calculate_discounted_price, get_applicable_discounts, price_with_discount
+from apps.response_cache import cached_json_response
+from .product_detail import get_product_detail, live_stock
 
 
 class DiscountViewSet(viewsets.ModelViewSet):
@@ -228,13 +231,18 @@ class PublicHomePageSettingsView(APIView):
     
     def get(self, request):
         """Get home page settings for public access"""
+        return cached_json_response(
+            request, 'home-page-settings', [HomePageSettings], lambda: self.get_data(request)
+        )
+
+    def get_data(self, request):
         try:
             settings = HomePageSettings.load()
             serializer = HomePageSettingsSerializer(settings, context={'request': request})
-            return Response(serializer.data)
+            return serializer.data
         except HomePageSettings.DoesNotExist:
             # Return default values if settings don't exist
-            return Response({
+            return {
                 'logo_image_url': None,
                 'logo_text': None,
                 'footer_tagline': None,
@@ -258,7 +266,7 @@ class PublicHomePageSettingsView(APIView):
                 'stat_brands': '200+',
                 'stat_products': '2,000+',
                 'stat_customers': '30,000+',
-            })
+            }
 
 
 class PublicBrandsView(APIView):
@@ -267,9 +275,11 @@ class PublicBrandsView(APIView):
     
     def get(self, request):
         """Get active brands for public access"""
-        brands = Brand.objects.filter(is_active=True).order_by('display_order', 'name')
-        serializer = BrandSerializer(brands, many=True, context={'request': request})
-        return Response(serializer.data)
+        def build():
+            brands = Brand.objects.filter(is_active=True).order_by('display_order', 'name')
+            return BrandSerializer(brands, many=True, context={'request': request}).data
+
+        return cached_json_response(request, 'brands', [Brand], build)
 
 
 class PublicProductsByColorView(APIView):
@@ -323,23 +333,13 @@ class PublicProductsByColorView(APIView):
 
         # Only return products explicitly assigned to online and active
         products = Product.objects.filter(is_active=True, assign_to_online=True).prefetch_related('online_categories').select_related('category')
-        if search:
-            products = products.filter(name__icontains=search)
         if category_slug:
             products = products.filter(category__slug=category_slug)
         if online_category_slug:
-            # Handle parent/child category filtering
-            # If the category has children, include products from child categories
-            # If it's a child category, only show products in that category
+            # Products in the category or any of its descendants, at any depth
             try:
                 category = OnlineCategory.objects.get(slug=online_category_slug)
-                # Get all child category IDs (recursively if needed)
-                child_ids = [category.id]
-                # Get direct children
-                children = OnlineCategory.objects.filter(parent=category)
-                child_ids.extend([child.id for child in children])
-                # Filter products by category or any of its children
-                products = products.filter(online_categories__id__in=child_ids)
+                products = products.filter(online_categories__path__startswith=category.path)
             except OnlineCategory.DoesNotExist:
                 # If category doesn't exist, return empty result
                 products = products.none()
@@ -389,6 +389,9 @@ class PublicProductsByColorView(APIView):
                 pass
 
         products = products.distinct()
+        if search:
+            # Hits among the filtered products, most relevant first unless sorted below
+            products = search_queryset(products, search).order_by('search_rank', 'id')
 
         result = []
         # Prefetch variations to reduce queries
@@ -472,81 +475,50 @@ class PublicProductDetailByColorView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, product_id: int, color_slug: str):
-        try:
-            # Only return products explicitly assigned to online and active
-            product = Product.objects.prefetch_related('online_categories').select_related('category').get(id=product_id, is_active=True, assign_to_online=True)
-        except Product.DoesNotExist:
+        # Only products explicitly assigned to online and active have a document
+        document = get_product_detail(product_id)
+        if document is None:
             return Response({'detail': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        # Resolve actual color name by matching slug against variations
-        variations_qs = ProductVariation.objects.filter(
-            product=product,
-            is_active=True,
-        )
-        # Build available colors with stock + hex
-        color_meta = {}
-        for v in variations_qs:
-            color_name = v.color.strip()
-            color_key = slugify(color_name)
-            meta = color_meta.setdefault(color_key, {
-                'color_name': color_name,
-                'color_slug': color_key,
-                'total_stock': 0,
-                'color_hex': v.color_hax or None,
-            })
-            meta['total_stock'] += max(0, v.stock)
-
         # Find requested color
-        if color_slug not in color_meta:
+        current = document['colors'].get(color_slug)
+        if current is None:
             return Response({'detail': 'Color not found for this product'}, status=status.HTTP_404_NOT_FOUND)
-        current_color_name = color_meta[color_slug]['color_name']
-        current_color_hex = color_meta[color_slug].get('color_hex')
-
-        # Images for current color
-        images = []
-        try:
-            gallery = Gallery.objects.get(product=product, color__iexact=current_color_name)
-            images_qs = gallery.images.order_by('imageType')
-            for img in images_qs:
-                if img.image:
-                    images.append({
-                        'type': img.imageType,
-                        'url': request.build_absolute_uri(img.image.url)
-                    })
-        except Gallery.DoesNotExist:
-            # Fallback to product default image
-            if product.image:
-                images.append({'type': 'PRIMARY', 'url': request.build_absolute_uri(product.image.url)})
 
-        # Sizes and stock for current color
+        # Overlay live stock on the cached sizes
+        stock = live_stock(product_id)
+        available_colors = [
+            {
+                'color_name': color['color_name'],
+                'color_slug': color['color_slug'],
+                'total_stock': sum(stock.get((color['color_slug'], size), 0) for size in color['sizes']),
+                'color_hex': color['color_hex'],
+            }
+            for color in document['colors'].values()
+        ]
         size_entries = []
-        current_variations = variations_qs.filter(color__iexact=current_color_name)
-        for v in current_variations.order_by('size'):
+        for size in current['sizes']:
+            stock_qty = stock.get((color_slug, size), 0)
             size_entries.append({
-                'size': v.size,
-                'stock_qty': max(0, v.stock),
-                'in_stock': v.stock > 0,
+                'size': size,
+                'stock_qty': stock_qty,
+                'in_stock': stock_qty > 0,
             })
 
-        # Calculate priority-based discount
-        discount_info = calculate_discounted_price(product)
-        
         data = {
-            'product': {
-                'id': product.id,
-                'name': product.name,
-                'price': str(product.selling_price),
-                'category': product.category.name if product.category else None,
-            },
-            'discount_info': discount_info if discount_info['discount_type'] else None,
+            'product': document['product'],
+            'discount_info': document['discount_info'],
             'color': {
-                'name': current_color_name,
+                'name': current['color_name'],
                 'slug': color_slug,
-                'hex': current_color_hex,
+                'hex': current['color_hex'],
             },
-            'images': images,
+            'images': [
+                {'type': image['type'], 'url': request.build_absolute_uri(image['url'])}
+                for image in current['images']
+            ],
             'sizes': size_entries,
-            'available_colors': list(color_meta.values()),
+            'available_colors': available_colors,
             'total_stock_for_color': sum(e['stock_qty'] for e in size_entries),
         }
         return Response(data)
@@ -557,9 +529,10 @@ class PublicDeliverySettingsView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        settings = DeliverySettings.load()
-        serializer = DeliverySettingsSerializer(settings)
-        return Response(serializer.data)
+        return cached_json_response(
+            request, 'delivery-settings', [DeliverySettings],
+            lambda: DeliverySettingsSerializer(DeliverySettings.load()).data,
+        )
 
 
 class DeliverySettingsView(APIView):
@@ -602,9 +575,11 @@ class PublicHeroSlidesView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        slides = HeroSlide.objects.filter(is_active=True).order_by('display_order', 'created_at')
-        serializer = HeroSlideSerializer(slides, many=True, context={'request': request})
-        return Response(serializer.data)
+        def build():
+            slides = HeroSlide.objects.filter(is_active=True).order_by('display_order', 'created_at')
+            return HeroSlideSerializer(slides, many=True, context={'request': request}).data
+
+        return cached_json_response(request, 'hero-slides', [HeroSlide], build)
 
 
 class PromotionalModalViewSet(viewsets.ModelViewSet):
@@ -625,23 +600,31 @@ class PublicPromotionalModalView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
+        return cached_json_response(request, 'promotional-modals', [PromotionalModal], lambda: self.get_data(request))
+
+    def get_data(self, request):
         now = timezone.now()
-        active_modals = PromotionalModal.objects.filter(
-            is_active=True,
-            start_date__lte=now,
-            end_date__gte=now
-        ).order_by('-created_at')
-        
+        # Current and upcoming modals; the upcoming ones only decide how long the result may be cached
+        modals = list(PromotionalModal.objects.filter(is_active=True, end_date__gte=now).order_by('-created_at'))
+        active_modals = [modal for modal in modals if modal.start_date <= now]
+
+        # The response changes by itself when a modal starts or ends
+        boundaries = [modal.end_date for modal in active_modals]
+        boundaries += [modal.start_date for modal in modals if modal.start_date > now]
+        timeout = min([60 * 60] + [(boundary - now).total_seconds() for boundary in boundaries])
+
         # We might only want to return one or all depending on requirements.
         # Returning all allows frontend to decide priority or display rules.
         serializer = PromotionalModalSerializer(active_modals, many=True, context={'request': request})
-        return Response(serializer.data)
+        return serializer.data, timeout
 
 
 class PublicCartPriceView(APIView):
     """
     Public API: Accepts cart items and returns authoritative pricing.
-    Body: { items: [{ productId: string|number, quantity: number }] }
+    Body: { items: [{ productId: string|number, quantity: number }], lean?: bool }
+    With ``lean`` (body or ``?lean=true``) the full ``products`` payload is omitted.
+    Costs a constant number of queries whatever the cart size.
     """
     permission_classes = [AllowAny]
 
@@ -671,6 +654,8 @@ class PublicCartPriceView(APIView):
             except Exception:
                 continue
 
+        lean = str(request.data.get('lean', request.query_params.get('lean', ''))).lower() in ('1', 'true', 'yes')
+
         # Use select_related and prefetch_related for optimized queries
         products = Product.objects.filter(
             id__in=product_ids, 
@@ -684,8 +669,13 @@ class PublicCartPriceView(APIView):
             'galleries__images',
             'variations'
         )
+        if not lean:
+            products = products.prefetch_related('ecommerce_statuses')
         prod_map = {p.id: p for p in products}
 
+        # Apply priority-based discounts (Product > Category > Global) for all products at once
+        discounts = get_applicable_discounts(prod_map.values())
+
         result_items = []
         subtotal = 0
         for line in normalized:
@@ -693,24 +683,19 @@ class PublicCartPriceView(APIView):
             if not p:
                 continue
             
-            # Apply priority-based discount (Product > Category > Global)
-            discount_info = calculate_discounted_price(p)
+            discount_info = price_with_discount(p.selling_price, discounts[p.id])
             unit_price = discount_info['final_price']
             original_price = discount_info['original_price']
 
-            # Determine available stock based on requested variant
-            max_stock = 0
+            # Determine available stock for the requested variant from the prefetched variations
             variant_color = line.get('color') or None
             variant_size = line.get('size') or None
-            try:
-                q = ProductVariation.objects.filter(product=p, is_active=True)
-                if variant_color:
-                    q = q.filter(color__iexact=variant_color)
-                if variant_size:
-                    q = q.filter(size__iexact=variant_size)
-                max_stock = max(0, q.aggregate(total=Sum('stock'))['total'] or 0)
-            except Exception:
-                max_stock = max(0, getattr(p, 'stock_quantity', 0))
+            max_stock = max(0, sum(
+                v.stock for v in p.variations.all()
+                if v.is_active
+                and (not variant_color or v.color.lower() == variant_color.lower())
+                and (not variant_size or v.size.lower() == variant_size.lower())
+            ))
 
             # Cap effective quantity by stock for pricing summary
             effective_qty = min(line['quantity'], max_stock) if max_stock > 0 else line['quantity']
@@ -753,20 +738,20 @@ class PublicCartPriceView(APIView):
             })
 
         delivery = DeliverySettings.load()
-        
-        # Serialize products with full information
-        product_serializer = EcommerceProductSerializer(
-            list(prod_map.values()), 
-            many=True, 
-            context={'request': request}
-        )
-        
-        return Response({
+        data = {
             'items': result_items,
-            'products': product_serializer.data,  # Array of products with full info
             'subtotal': subtotal,
             'delivery': DeliverySettingsSerializer(delivery).data,
-        })
+        }
+        if not lean:
+            # Serialize products with full information
+            product_serializer = EcommerceProductSerializer(
+                list(prod_map.values()), 
+                many=True, 
+                context={'request': request, 'discounts': discounts}
+            )
+            data['products'] = product_serializer.data  # Array of products with full info
+        return Response(data)
 
 
 class CreateOnlinePreorderView(APIView):
@@ -844,7 +829,7 @@ class CreateOnlinePreorderView(APIView):
 
         # Create or get customer
         try:
-            customer = Customer.objects.get(phone=customer_phone)
+            customer = Customer.objects.get_by_phone(customer_phone)
             # Update customer info if provided
             if customer_name:
                 name_parts = customer_name.split(maxsplit=1)
@@ -903,7 +888,7 @@ class CreateOnlinePreorderView(APIView):
                 )
             except IntegrityError:
                 # Handle case where phone might have been created between check and create
-                customer = Customer.objects.get(phone=customer_phone)
+                customer = Customer.objects.get_by_phone(customer_phone)
 
         # Build shipping address JSON
         shipping_address_data = request.data.get('shipping_address', {})
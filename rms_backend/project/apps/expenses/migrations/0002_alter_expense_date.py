@@ -0,0 +1,19 @@
+# Generated by Django 4.2.11 on 2026-10-19 19:04
+
+import apps.utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='expense',
+            name='date',
+            field=models.DateField(default=apps.utils.business_today),
+        ),
+    ]
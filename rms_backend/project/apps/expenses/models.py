@@ -1,5 +1,5 @@
 from django.db import models
-from django.utils import timezone
+from apps.utils import business_today
 
 class ExpenseCategory(models.Model):
     name = models.CharField(max_length=100)
@@ -32,7 +32,8 @@ class Expense(models.Model):
 
     description = models.CharField(max_length=255)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
-    date = models.DateField(default=timezone.now)
+    # Already a business date; default to the current day in the shop's time zone
+    date = models.DateField(default=business_today)
     category = models.ForeignKey(ExpenseCategory, on_delete=models.PROTECT, related_name='expenses')
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
@@ -6,6 +6,7 @@ from django.utils import timezone
 from datetime import datetime, timedelta
 from .models import Expense, ExpenseCategory
 from .serializers import ExpenseSerializer, ExpenseCategorySerializer
+from apps.db_routing import ReplicaReadMixin
 
 class ExpenseCategoryViewSet(viewsets.ModelViewSet):
     queryset = ExpenseCategory.objects.all()
@@ -13,13 +14,14 @@ class ExpenseCategoryViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.SearchFilter]
     search_fields = ['name', 'description']
 
-class ExpenseViewSet(viewsets.ModelViewSet):
+class ExpenseViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Expense.objects.all()
     serializer_class = ExpenseSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['description', 'reference_number', 'notes']
     ordering_fields = ['date', 'amount', 'status', 'created_at']
     ordering = ['-date', '-created_at']
+    replica_actions = {'dashboard_stats'}
 
     def get_queryset(self):
         queryset = super().get_queryset()
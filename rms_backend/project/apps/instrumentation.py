@@ -0,0 +1,253 @@
+"""
+Per-request performance instrumentation.
+
+``RequestMetricsMiddleware`` times every request and records its database
+query count, database time, duplicate queries (the same SQL run more than
+once, whatever the parameters - usually an N+1) and serializer time. The
+numbers are sent back in a ``Server-Timing`` header, slow requests are logged
+with their SQL to the ``rms.slow_requests`` logger, and rolling per-endpoint
+samples are kept for the staff-only metrics endpoint.
+
+Samples live in process memory, so every worker reports its own numbers.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+from rest_framework.renderers import BaseRenderer
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger('rms.slow_requests')
+
+# Metrics of the request being handled in the current thread/task
+_current = ContextVar('request_metrics', default=None)
+
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+class RequestMetrics:
+    """Query and serializer timings collected while one request is handled."""
+
+    def __init__(self):
+        self.queries = []
+        self.serializer_ms = 0.0
+        self._serializer_depth = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, (time.perf_counter() - started) * 1000))
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    @property
+    def db_ms(self):
+        return sum(ms for _, ms in self.queries)
+
+    @property
+    def duplicate_count(self):
+        return sum(count - 1 for count in Counter(sql for sql, _ in self.queries).values())
+
+
+_serializer_data = BaseSerializer.data
+
+
+def _timed_serializer_data(self):
+    metrics = _current.get()
+    # Only the outermost .data is timed; nested serializers are part of it
+    if metrics is None or metrics._serializer_depth:
+        return _serializer_data.fget(self)
+    metrics._serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        return _serializer_data.fget(self)
+    finally:
+        metrics._serializer_depth -= 1
+        metrics.serializer_ms += (time.perf_counter() - started) * 1000
+
+
+def _install_serializer_timer():
+    if BaseSerializer.data is _serializer_data:
+        BaseSerializer.data = property(_timed_serializer_data)
+
+
+def _percentile(ordered, quantile):
+    return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+
+
+class MetricsStore:
+    """Rolling per-endpoint samples of recent requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, view, method, status_code, total_ms, metrics):
+        key = (view, method)
+        with self._lock:
+            stats = self._endpoints.get(key)
+            if stats is None:
+                stats = self._endpoints[key] = {
+                    'samples': deque(maxlen=getattr(settings, 'REQUEST_METRICS_SAMPLES', 1000)),
+                    'count': 0,
+                    'errors': 0,
+                    'total_ms': 0.0,
+                    'db_queries': 0,
+                    'db_ms': 0.0,
+                    'duplicate_queries': 0,
+                    'serializer_ms': 0.0,
+                }
+            stats['samples'].append(total_ms)
+            stats['count'] += 1
+            stats['errors'] += status_code >= 500
+            stats['total_ms'] += total_ms
+            stats['db_queries'] += metrics.query_count
+            stats['db_ms'] += metrics.db_ms
+            stats['duplicate_queries'] += metrics.duplicate_count
+            stats['serializer_ms'] += metrics.serializer_ms
+
+    def summary(self):
+        """Per-endpoint counters and latency percentiles over the retained samples."""
+        with self._lock:
+            endpoints = [(key, dict(stats, samples=sorted(stats['samples'])))
+                         for key, stats in self._endpoints.items()]
+        summary = []
+        for (view, method), stats in sorted(endpoints):
+            samples = stats.pop('samples')
+            count = stats['count']
+            summary.append({
+                'view': view,
+                'method': method,
+                **{key: round(value, 3) if isinstance(value, float) else value for key, value in stats.items()},
+                'avg_ms': round(stats['total_ms'] / count, 3),
+                'avg_db_queries': round(stats['db_queries'] / count, 2),
+                'quantiles_ms': {str(q): round(_percentile(samples, q), 3) for q in QUANTILES},
+            })
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+metrics_store = MetricsStore()
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(summary):
+    """Render ``MetricsStore.summary()`` in the Prometheus text exposition format."""
+    lines = [
+        '# HELP rms_request_duration_seconds Request latency per endpoint over recent requests.',
+        '# TYPE rms_request_duration_seconds summary',
+    ]
+    for entry in summary:
+        labels = f'view="{_label(entry["view"])}",method="{entry["method"]}"'
+        for quantile, value in entry['quantiles_ms'].items():
+            lines.append(f'rms_request_duration_seconds{{{labels},quantile="{quantile}"}} {value / 1000:.6f}')
+        lines.append(f'rms_request_duration_seconds_sum{{{labels}}} {entry["total_ms"] / 1000:.6f}')
+        lines.append(f'rms_request_duration_seconds_count{{{labels}}} {entry["count"]}')
+
+    counters = [
+        ('rms_request_errors_total', 'Requests that returned a 5xx status.', 'errors', 1),
+        ('rms_db_queries_total', 'Database queries run while handling requests.', 'db_queries', 1),
+        ('rms_db_duration_seconds_total', 'Time spent in the database.', 'db_ms', 1000),
+        ('rms_duplicate_queries_total', 'Queries repeating an earlier statement of the same request.',
+         'duplicate_queries', 1),
+        ('rms_serializer_duration_seconds_total', 'Time spent producing serializer data.', 'serializer_ms', 1000),
+    ]
+    for name, help_text, key, divisor in counters:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for entry in summary:
+            labels = f'view="{_label(entry["view"])}",method="{entry["method"]}"'
+            lines.append(f'{name}{{{labels}}} {entry[key] / divisor}')
+    return '\n'.join(lines) + '\n'
+
+
+class PrometheusRenderer(BaseRenderer):
+    """Passes pre-rendered Prometheus text through (``?format=prometheus``)."""
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Errors (e.g. a 403 for non-staff users) arrive as dicts
+        return (data if isinstance(data, str) else json.dumps(data)).encode(self.charset)
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    # Unresolved paths share one label so 404 probes cannot grow the store
+    return match.view_name if match else '<unresolved>'
+
+
+class RequestMetricsMiddleware:
+    """Collect per-request timings; see the module docstring."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _install_serializer_timer()
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(metrics.record_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={total_ms:.1f}',
+            f'db;dur={metrics.db_ms:.1f};desc="{metrics.query_count} queries, '
+            f'{metrics.duplicate_count} duplicate"',
+            f'serializer;dur={metrics.serializer_ms:.1f}',
+        ])
+
+        view = _view_name(request)
+        metrics_store.record(view, request.method, response.status_code, total_ms, metrics)
+        if total_ms >= getattr(settings, 'SLOW_REQUEST_MS', 500):
+            self._log_slow_request(request, view, response, total_ms, metrics)
+        return response
+
+    def _log_slow_request(self, request, view, response, total_ms, metrics):
+        repeats = Counter(sql for sql, _ in metrics.queries)
+        slowest = sorted(metrics.queries, key=lambda query: query[1], reverse=True)[:20]
+        lines = [
+            f'{request.method} {request.get_full_path()} ({view}) -> {response.status_code} '
+            f'in {total_ms:.1f} ms: {metrics.query_count} queries in {metrics.db_ms:.1f} ms, '
+            f'{metrics.duplicate_count} duplicate, serializer {metrics.serializer_ms:.1f} ms'
+        ]
+        lines += [f'  {ms:8.2f} ms  x{repeats[sql]:<3} {sql}' for sql, ms in slowest]
+        logger.warning('\n'.join(lines))
+
+
+class SlowRequestLogHandler(logging.handlers.RotatingFileHandler):
+    """Rotating log file whose directory is created when the first line is written."""
+
+    def __init__(self, filename, **kwargs):
+        kwargs.setdefault('delay', True)
+        super().__init__(filename, **kwargs)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
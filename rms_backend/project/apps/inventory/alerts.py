@@ -0,0 +1,148 @@
+"""
+Low/out-of-stock alert engine.
+
+Stock changes from any path (stock movements, sales, returns, admin edits)
+queue the affected product; at transaction commit every queued product is
+evaluated in one batch:
+
+* a product is OUT when ``stock_quantity <= 0`` and LOW when it is at or
+  under ``minimum_stock``;
+* an active variation is OUT at 0 and LOW at or under
+  ``VARIATION_LOW_STOCK_THRESHOLD`` (default 2).
+
+There is at most one active alert per (product, variation, type): existing
+alerts get their message refreshed, missing ones are created, and alerts
+whose condition cleared are resolved. Writes that bypass signals
+(``queryset.update()``, F() expressions) call ``queue_stock_check`` directly.
+"""
+
+import threading
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.utils import timezone
+from .models import InventoryAlert, Product, ProductVariation
+
+STOCK_ALERT_TYPES = ('LOW', 'OUT')
+BATCH_SIZE = 500
+
+_local = threading.local()
+
+
+def _pending():
+    if not hasattr(_local, 'product_ids'):
+        _local.product_ids = set()
+    return _local.product_ids
+
+
+def queue_stock_check(product_ids):
+    """Re-evaluate the stock alerts of ``product_ids`` when the current transaction commits."""
+    pending = _pending()
+    pending.update(product_id for product_id in product_ids if product_id)
+    # One callback per call; the first one to run drains the whole batch
+    transaction.on_commit(_flush)
+
+
+def _flush():
+    pending = _pending()
+    product_ids = list(pending)
+    pending.clear()
+    if product_ids:
+        evaluate_stock_alerts(product_ids)
+
+
+def _stock_level(quantity, threshold):
+    if quantity <= 0:
+        return 'OUT'
+    if quantity <= threshold:
+        return 'LOW'
+    return None
+
+
+def _wanted_alerts(product_ids):
+    """{(product_id, variation_id, type): message} for the alerts that should be active."""
+    variation_threshold = getattr(settings, 'VARIATION_LOW_STOCK_THRESHOLD', 2)
+    names = {}
+    wanted = {}
+    for product in Product.objects.filter(id__in=product_ids, is_active=True).values(
+        'id', 'name', 'stock_quantity', 'minimum_stock'
+    ):
+        names[product['id']] = product['name']
+        level = _stock_level(product['stock_quantity'], product['minimum_stock'])
+        if level == 'OUT':
+            wanted[(product['id'], None, level)] = f"Out of stock alert: {product['name']} has no units remaining"
+        elif level == 'LOW':
+            wanted[(product['id'], None, level)] = (
+                f"Low stock alert: {product['name']} has {product['stock_quantity']} units remaining"
+            )
+
+    for variation in ProductVariation.objects.filter(product_id__in=names, is_active=True).values(
+        'id', 'product_id', 'size', 'color', 'stock'
+    ):
+        level = _stock_level(variation['stock'], variation_threshold)
+        label = f"{names[variation['product_id']]} ({variation['size']} / {variation['color']})"
+        if level == 'OUT':
+            wanted[(variation['product_id'], variation['id'], level)] = (
+                f'Out of stock alert: {label} has no units remaining'
+            )
+        elif level == 'LOW':
+            wanted[(variation['product_id'], variation['id'], level)] = (
+                f"Low stock alert: {label} has {variation['stock']} units remaining"
+            )
+    return wanted
+
+
+def evaluate_stock_alerts(product_ids):
+    """
+    Bring the LOW/OUT alerts of ``product_ids`` in line with current stock.
+
+    Returns ``(created, updated, resolved)`` counts. Duplicate active alerts
+    (from older code, or two transactions racing) are collapsed onto the
+    newest one.
+    """
+    product_ids = sorted(set(product_ids))
+    created = updated = resolved = 0
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        chunk = product_ids[start:start + BATCH_SIZE]
+        with transaction.atomic():
+            wanted = _wanted_alerts(chunk)
+            to_update, to_resolve = [], []
+            for alert in InventoryAlert.objects.select_for_update().filter(
+                product_id__in=chunk, alert_type__in=STOCK_ALERT_TYPES, is_active=True
+            ).order_by('-created_at', '-id'):
+                key = (alert.product_id, alert.variation_id, alert.alert_type)
+                message = wanted.pop(key, None)
+                if message is None:
+                    to_resolve.append(alert.id)
+                elif alert.message != message:
+                    alert.message = message
+                    to_update.append(alert)
+
+            if to_resolve:
+                resolved += InventoryAlert.objects.filter(id__in=to_resolve).update(
+                    is_active=False, resolved_at=timezone.now()
+                )
+            if to_update:
+                InventoryAlert.objects.bulk_update(to_update, ['message'])
+                updated += len(to_update)
+            if wanted:
+                InventoryAlert.objects.bulk_create([
+                    InventoryAlert(product_id=product_id, variation_id=variation_id, alert_type=alert_type,
+                                   message=message)
+                    for (product_id, variation_id, alert_type), message in wanted.items()
+                ])
+                created += len(wanted)
+    return created, updated, resolved
+
+
+def _product_saved(sender, instance, **kwargs):
+    queue_stock_check([instance.pk])
+
+
+def _variation_saved(sender, instance, **kwargs):
+    queue_stock_check([instance.product_id])
+
+
+def connect_stock_alert_signals():
+    post_save.connect(_product_saved, sender=Product, dispatch_uid='stock-alerts-product')
+    post_save.connect(_variation_saved, sender=ProductVariation, dispatch_uid='stock-alerts-variation')
@@ -4,3 +4,21 @@ from django.apps import AppConfig
 class InventoryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.inventory'
+
+    def ready(self):
+        from .alerts import connect_stock_alert_signals
+        from .category_tree import connect_category_tree_signals
+        from apps.customer.models import Customer
+        from apps.response_cache import track_versions
+        from apps.sales.models import Sale, SaleItem
+        from .models import ProductVariation, StockMovement
+        from .search import connect_search_signals
+
+        # Low/out-of-stock alerts are re-evaluated whenever stock changes
+        connect_stock_alert_signals()
+        # Cached category trees and product counts follow categories and their products
+        connect_category_tree_signals()
+        # Product search documents are rebuilt when products, variations or categories change
+        connect_search_signals()
+        # Conditional GETs of reports, stock histories and customers (apps.response_cache)
+        track_versions(Customer, Sale, SaleItem, ProductVariation, StockMovement)
@@ -0,0 +1,103 @@
+"""
+Cached category trees with product counts.
+
+``category_tree(Category)`` (or ``OnlineCategory``) loads every node in one
+query and the category/product links in another, then keeps the result in
+the cache keyed by the data versions of the categories and their product
+links, so serializers render nested trees and counts without a query per
+node. Subtree membership itself is a path prefix (see ``TreeNode``).
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed
+from apps.response_cache import DEFAULT_TIMEOUT, bump_version, data_version, track_versions
+from .models import Category, OnlineCategory, Product
+
+NODE_FIELDS = {
+    Category: ['id', 'name', 'slug', 'description', 'parent_id', 'path', 'created_at', 'updated_at'],
+    OnlineCategory: ['id', 'name', 'slug', 'description', 'parent_id', 'path', 'order', 'gender',
+                     'created_at', 'updated_at'],
+}
+
+
+def _links(model):
+    """(category_id, product_id) pairs."""
+    if model is Category:
+        return Product.objects.filter(category__isnull=False).values_list('category_id', 'id')
+    return Product.online_categories.through.objects.values_list('onlinecategory_id', 'product_id')
+
+
+def _versioned_models(model):
+    if model is Category:
+        return [Category, Product]
+    return [OnlineCategory, Product, Product.online_categories.through]
+
+
+def _build(model):
+    nodes = {}
+    for row in model.objects.order_by(*model._meta.ordering).values(*NODE_FIELDS[model]):
+        row.update(children=[], descendant_ids=[], product_count=0, total_product_count=0)
+        nodes[row['id']] = row
+    products = {node_id: set() for node_id in nodes}
+    for node_id, product_id in _links(model):
+        if node_id in products:
+            products[node_id].add(product_id)
+            nodes[node_id]['product_count'] += 1
+
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node['parent_id'])
+        (parent['children'] if parent else roots).append(node['id'])
+
+    # Post-order walk, so every subtree is complete before its parent uses it
+    subtree_products = {}
+    stack = [(root_id, False) for root_id in reversed(roots)]
+    while stack:
+        node_id, children_done = stack.pop()
+        node = nodes[node_id]
+        if not children_done:
+            stack.append((node_id, True))
+            stack.extend((child_id, False) for child_id in reversed(node['children']))
+            continue
+        descendants, in_subtree = [], products[node_id]
+        for child_id in node['children']:
+            descendants += [child_id] + nodes[child_id]['descendant_ids']
+            in_subtree |= subtree_products.pop(child_id)
+        node['descendant_ids'] = descendants
+        node['total_product_count'] = len(in_subtree)
+        subtree_products[node_id] = in_subtree
+    return {'nodes': nodes, 'roots': roots}
+
+
+def category_tree(model=Category, fresh=False):
+    """
+    ``{'nodes': {id: node}, 'roots': [id, ...]}`` of ``model``'s tree.
+
+    A node holds its ``NODE_FIELDS`` plus ``children`` (ids, in the model's
+    ordering), ``descendant_ids``, ``product_count`` (products linked to the
+    node itself) and ``total_product_count`` (distinct products in the node
+    or any descendant). ``fresh`` skips the cache, for responses to writes
+    whose version bump only happens once the transaction commits.
+    """
+    if fresh:
+        return _build(model)
+    key = f'rms:category-tree:{model._meta.label_lower}:{data_version(*_versioned_models(model))}'
+    tree = cache.get(key)
+    if tree is None:
+        tree = _build(model)
+        cache.set(key, tree, DEFAULT_TIMEOUT)
+    return tree
+
+
+def _online_links_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        transaction.on_commit(lambda: bump_version(sender))
+
+
+def connect_category_tree_signals():
+    track_versions(Category, OnlineCategory, Product)
+    m2m_changed.connect(
+        _online_links_changed, sender=Product.online_categories.through,
+        dispatch_uid='category-tree-online-categories',
+    )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from apps.inventory.models import Product
+from apps.inventory.search import reindex_products
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the product search documents, e.g. after products were changed with '
+        'queryset.update() or imported with bulk_create()'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--product',
+            type=int,
+            action='append',
+            help='Only rebuild this product id (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        product_ids = options['product'] or list(Product.objects.values_list('id', flat=True))
+        written = reindex_products(product_ids)
+        self.stdout.write(self.style.SUCCESS(f'COMPLETE: {written} search documents rebuilt'))
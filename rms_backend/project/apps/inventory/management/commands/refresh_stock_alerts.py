@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from apps.inventory.alerts import evaluate_stock_alerts
+from apps.inventory.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-evaluate low/out-of-stock alerts for every product: resolves duplicate and stale alerts '
+        'and raises missing ones, e.g. after stock was changed with queryset.update()'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--product',
+            type=int,
+            action='append',
+            help='Only re-evaluate this product id (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        product_ids = options['product'] or list(Product.objects.values_list('id', flat=True))
+        created, updated, resolved = evaluate_stock_alerts(product_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'COMPLETE: {len(product_ids)} products checked, {created} alerts raised, '
+            f'{updated} refreshed, {resolved} resolved'
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-19 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0017_product_ecommerce_statuses'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockmovement',
+            name='business_date',
+            field=models.DateField(blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.11 on 2026-10-19 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0018_stockmovement_business_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productvariation',
+            index=models.Index(fields=['product', 'size', 'color', 'is_active'], name='inventory_p_product_561d4c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['reference_number', 'movement_type'], name='inventory_s_referen_005ba3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['movement_type', 'created_at'], name='inventory_s_movemen_ed5291_idx'),
+        ),
+    ]
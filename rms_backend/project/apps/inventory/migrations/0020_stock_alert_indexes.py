@@ -0,0 +1,21 @@
+# Generated by Django 4.2.11 on 2026-10-19 19:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0019_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventoryalert',
+            index=models.Index(fields=['product', 'is_active', 'alert_type'], name='inventory_i_product_1e8d2a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventoryalert',
+            index=models.Index(fields=['is_active', 'created_at'], name='inventory_i_is_acti_2d03b9_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.11 on 2026-10-19 19:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0021_stock_takes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.IntegerField()),
+                ('units_in', models.IntegerField(default=0)),
+                ('units_out', models.IntegerField(default=0)),
+                ('cost_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('selling_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_snapshots', to='inventory.product')),
+                ('variation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_snapshots', to='inventory.productvariation')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'date'], name='inventory_i_product_f69b87_idx')],
+                'unique_together': {('date', 'variation')},
+            },
+        ),
+    ]
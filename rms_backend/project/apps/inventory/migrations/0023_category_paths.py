@@ -0,0 +1,40 @@
+# Generated by Django 4.2.11 on 2026-10-19 19:47
+
+from django.db import migrations, models
+
+
+def fill_paths(apps, schema_editor):
+    for model_name in ['Category', 'OnlineCategory']:
+        model = apps.get_model('inventory', model_name)
+        parents = dict(model.objects.values_list('id', 'parent_id'))
+        paths = {}
+
+        def path_of(node_id):
+            if node_id not in paths:
+                parent_id = parents[node_id]
+                paths[node_id] = (path_of(parent_id) if parent_id else '') + f'{node_id}/'
+            return paths[node_id]
+
+        for node_id in parents:
+            model.objects.filter(pk=node_id).update(path=path_of(node_id))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0022_inventory_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='onlinecategory',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 4.2.11 on 2026-10-19 19:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+FULLTEXT_INDEX = 'inventory_productsearch_fulltext'
+
+
+def add_fulltext_index(apps, schema_editor):
+    # Only MySQL searches the documents with FULLTEXT (see apps.inventory.search)
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            f'CREATE FULLTEXT INDEX {FULLTEXT_INDEX} ON inventory_productsearchdocument (name, codes, attributes)'
+        )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(f'DROP INDEX {FULLTEXT_INDEX} ON inventory_productsearchdocument')
+
+
+def build_documents(apps, schema_editor):
+    Product = apps.get_model('inventory', 'Product')
+    ProductVariation = apps.get_model('inventory', 'ProductVariation')
+    ProductSearchDocument = apps.get_model('inventory', 'ProductSearchDocument')
+    attributes = {}
+    for product_id, category in Product.objects.values_list('id', 'category__name'):
+        attributes[product_id] = [category] if category else []
+    for product_id, color, size in ProductVariation.objects.filter(is_active=True).values_list(
+        'product_id', 'color', 'size'
+    ).distinct():
+        for value in (color, size):
+            if value and value not in attributes[product_id]:
+                attributes[product_id].append(value)
+    now = timezone.now()
+    ProductSearchDocument.objects.bulk_create(
+        [
+            ProductSearchDocument(
+                product_id=product_id,
+                name=name,
+                codes=' '.join(code for code in [sku, barcode] if code)[:255],
+                attributes=' '.join(attributes[product_id]),
+                updated_at=now,
+            )
+            for product_id, name, sku, barcode in Product.objects.values_list('id', 'name', 'sku', 'barcode')
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0023_category_paths'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchDocument',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='inventory.product')),
+                ('name', models.CharField(max_length=200)),
+                ('codes', models.CharField(blank=True, max_length=255)),
+                ('attributes', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+        ),
+        migrations.RunPython(add_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(build_documents, migrations.RunPython.noop),
+    ]
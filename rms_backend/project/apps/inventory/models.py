@@ -1,5 +1,6 @@
 from random import choices
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from django.utils.text import slugify
 import uuid
@@ -8,17 +9,60 @@ from django.utils import timezone
 from decimal import Decimal
 from django.conf import settings
 from apps.supplier.models import Supplier  # Import Supplier from supplier app
-from django.db.models import Sum
+from django.db.models import Sum, Value
+from django.db.models.functions import Concat, Substr
 from django.db.models.signals import post_delete
 from django.dispatch import receiver
-from apps.utils import optimize_image
+from apps.utils import optimize_image, business_localtime
+from apps.purge import delete_media_later
 GENDER_CHOICES = [
     ('MALE', 'Male'),
     ('FEMALE', 'Female'),
     ('UNISEX', 'Unisex'),
 ]
 
-class Category(models.Model):
+class TreeNode(models.Model):
+    """
+    Category tree node with a materialized path of ancestor ids ("1/5/9/").
+
+    The subtree of a node (itself included) is the indexed prefix lookup
+    ``path__startswith=node.path``, so "products in this category or any
+    descendant" is a single query at any depth. The path is kept up to date
+    on save, including moves, which rewrite the descendants' paths in one
+    UPDATE; deleting a node cascades to its subtree. Moving a node with a
+    bare ``queryset.update(parent=...)`` bypasses this.
+    """
+    path = models.CharField(max_length=255, blank=True, default='', editable=False, db_index=True)
+
+    class Meta:
+        abstract = True
+
+    def is_in_subtree_of(self, node):
+        """Whether ``node`` is this node or one of its ancestors."""
+        return bool(node.path) and self.path.startswith(node.path)
+
+    def save(self, *args, **kwargs):
+        model = type(self)
+        with transaction.atomic():
+            old_path = model.objects.filter(pk=self.pk).values_list('path', flat=True).first() if self.pk else None
+            parent_path = ''
+            if self.parent_id:
+                parent_path = model.objects.filter(pk=self.parent_id).values_list('path', flat=True).first() or ''
+                if old_path and parent_path.startswith(old_path):
+                    raise ValidationError("A category cannot be moved under itself or one of its descendants.")
+            super().save(*args, **kwargs)
+
+            path = f'{parent_path}{self.pk}/'
+            if path != old_path:
+                model.objects.filter(pk=self.pk).update(path=path)
+                if old_path:
+                    model.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                        path=Concat(Value(path), Substr('path', len(old_path) + 1))
+                    )
+            self.path = path
+
+
+class Category(TreeNode):
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(max_length=100, unique=True, blank=True)
     description = models.TextField(blank=True)
@@ -39,7 +83,7 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
-class OnlineCategory(models.Model):
+class OnlineCategory(TreeNode):
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(max_length=100, unique=True, blank=True)
     description = models.TextField(blank=True)
@@ -116,27 +160,12 @@ class Product(models.Model):
     
     def delete(self, *args, **kwargs):
         """Override delete to also delete the main product image and gallery folder from filesystem"""
-        from django.conf import settings
-        import shutil
-        
-        # Delete main product image
-        if self.image:
-            try:
-                if os.path.isfile(self.image.path):
-                    os.remove(self.image.path)
-            except (ValueError, OSError):
-                pass
-        
-        # Delete entire gallery folder for this product
-        if self.id:
-            gallery_folder = os.path.join(settings.MEDIA_ROOT, 'gallery', str(self.id))
-            if os.path.exists(gallery_folder) and os.path.isdir(gallery_folder):
-                try:
-                    shutil.rmtree(gallery_folder)
-                except OSError as e:
-                    # Log error but don't stop deletion
-                    print(f"Error deleting gallery folder {gallery_folder}: {e}")
-        
+        # Removed by a background thread after commit, so a large gallery
+        # doesn't hold the request (or the transaction) open
+        delete_media_later(
+            files=[self.image.name] if self.image else [],
+            directories=[os.path.join('gallery', str(self.id))] if self.id else [],
+        )
         super().delete(*args, **kwargs)
 
 class ProductVariation(models.Model):
@@ -155,6 +184,10 @@ class ProductVariation(models.Model):
 
     class Meta:
         unique_together = ('product', 'size', 'color')
+        indexes = [
+            # SaleItem.get_variation() lookup
+            models.Index(fields=['product', 'size', 'color', 'is_active']),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - {self.size} - {self.color}"
@@ -245,11 +278,25 @@ class StockMovement(models.Model):
     reference_number = models.CharField(max_length=50, blank=True)  # For linking to purchase orders, sales, etc.
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
-  
+    # Local business day of created_at (settings.BUSINESS_TIME_ZONE), indexed for date-bucketed reports
+    business_date = models.DateField(null=True, blank=True, editable=False, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Sale stock reduction / gift conversion look movements up by invoice
+            models.Index(fields=['reference_number', 'movement_type']),
+            # Stock in/out totals over a period
+            models.Index(fields=['movement_type', 'created_at']),
+        ]
 
     def __str__(self):
         return f"{self.get_movement_type_display()} - {self.product.name} ({self.quantity})"
 
+    def save(self, *args, **kwargs):
+        if self.business_date is None:
+            self.business_date = business_localtime(self.created_at).date()
+        super().save(*args, **kwargs)
+
 class InventoryAlert(models.Model):
     ALERT_TYPES = [
         ('LOW', 'Low Stock'),
@@ -265,6 +312,13 @@ class InventoryAlert(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     resolved_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Alert engine upserts and the dashboard's active-alert list
+            models.Index(fields=['product', 'is_active', 'alert_type']),
+            models.Index(fields=['is_active', 'created_at']),
+        ]
+
     def __str__(self):
         return f"{self.get_alert_type_display()} - {self.product.name}"
 
@@ -274,17 +328,83 @@ class InventoryAlert(models.Model):
         self.save()
 
 
+class StockTake(models.Model):
+    """A physical count of the variations in a category (or the whole shop)."""
+    STATUS_CHOICES = [
+        ('OPEN', 'Open'),
+        ('POSTED', 'Posted'),
+        ('CANCELLED', 'Cancelled'),
+    ]
+
+    name = models.CharField(max_length=100, blank=True)
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_takes')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='OPEN')
+    notes = models.TextField(blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    started_at = models.DateTimeField(default=timezone.now)
+    posted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"Stock take {self.reference} ({self.get_status_display()})"
+
+    @property
+    def reference(self):
+        """Reference number of the adjustment movements posted by this count."""
+        return f"ST-{self.pk}"
+
+
+class StockTakeLine(models.Model):
+    """Snapshot of one variation at the start of a stock take, and its count."""
+    stock_take = models.ForeignKey(StockTake, on_delete=models.CASCADE, related_name='lines')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_take_lines')
+    variation = models.ForeignKey(ProductVariation, on_delete=models.CASCADE, related_name='stock_take_lines')
+    expected = models.IntegerField()  # variation stock when the count started
+    cost_price = models.DecimalField(max_digits=10, decimal_places=2)
+    counted = models.IntegerField(null=True, blank=True)
+    counted_at = models.DateTimeField(null=True, blank=True)
+    adjustment = models.IntegerField(null=True, blank=True)  # stock change booked when posted
+
+    class Meta:
+        unique_together = ('stock_take', 'variation')
+
+
+class InventorySnapshot(models.Model):
+    """End-of-business-day stock of one variation, for point-in-time inventory reports."""
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='inventory_snapshots')
+    variation = models.ForeignKey(ProductVariation, on_delete=models.CASCADE, related_name='inventory_snapshots')
+    quantity = models.IntegerField()
+    units_in = models.IntegerField(default=0)
+    units_out = models.IntegerField(default=0)  # sold or gifted that day
+    cost_price = models.DecimalField(max_digits=10, decimal_places=2)
+    selling_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        unique_together = ('date', 'variation')
+        indexes = [
+            # Per-product turnover over a date range
+            models.Index(fields=['product', 'date']),
+        ]
+
+
+class ProductSearchDocument(models.Model):
+    """Searchable text of one product, maintained by apps.inventory.search."""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    name = models.CharField(max_length=200)
+    codes = models.CharField(max_length=255, blank=True)  # SKU and barcode
+    attributes = models.TextField(blank=True)  # category, colors and sizes
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+
 # Signal to handle file deletion when Image is deleted
 @receiver(post_delete, sender=Image)
 def delete_image_file(sender, instance, **kwargs):
     """Delete the image file from filesystem when Image instance is deleted"""
     if instance.image:
-        try:
-            if os.path.isfile(instance.image.path):
-                os.remove(instance.image.path)
-        except (ValueError, OSError):
-            # File might have been already deleted or path might be invalid
-            pass
+        delete_media_later(files=[instance.image.name])
 
 
 # Signal to handle file deletion when Gallery is deleted (cascade delete)
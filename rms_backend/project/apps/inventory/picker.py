@@ -0,0 +1,118 @@
+"""
+Product picker for the POS, preorder and return forms.
+
+A compact projection (id, name, sku, barcode, price, stock and the active
+variations with their stock) built from two ``values()`` queries per page,
+with type-ahead search and page-number pagination.
+
+The ETag is derived from the filter, the page and a fingerprint of the
+matching rows (count and latest ``updated_at`` of products and variations),
+so a revalidation costs two aggregate queries and no serialization. Stock
+writes that bypass ``updated_at`` (a bare ``queryset.update()``) are not
+seen until something else changes; every stock path in this project sets it.
+"""
+
+import hashlib
+from django.db.models import Count, Max, Q
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from .models import Product, ProductVariation
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+
+
+def _search(queryset, search):
+    """Every word must prefix-match the SKU or barcode, or appear in the name."""
+    for term in search.split():
+        queryset = queryset.filter(
+            Q(name__icontains=term) | Q(sku__istartswith=term) | Q(barcode__istartswith=term)
+        )
+    return queryset
+
+
+def _int_param(request, name, default, maximum=None):
+    try:
+        value = max(1, int(request.query_params.get(name, default)))
+    except (TypeError, ValueError):
+        value = default
+    return min(value, maximum) if maximum else value
+
+
+def picker_queryset(request):
+    products = Product.objects.filter(is_active=True)
+    search = request.query_params.get('search', '').strip()
+    if search:
+        products = _search(products, search)
+    category = request.query_params.get('category')
+    if category:
+        products = products.filter(category_id=category)
+    if request.query_params.get('in_stock') in ('1', 'true'):
+        products = products.filter(stock_quantity__gt=0)
+    return products
+
+
+def _etag(request, products, page, page_size):
+    product_stamp = products.aggregate(count=Count('id'), updated=Max('updated_at'))
+    variation_stamp = ProductVariation.objects.filter(product__in=products).aggregate(
+        count=Count('id'), updated=Max('updated_at')
+    )
+    raw = '|'.join(str(value) for value in [
+        sorted(request.query_params.items()), page, page_size,
+        product_stamp['count'], product_stamp['updated'], variation_stamp['count'], variation_stamp['updated'],
+    ])
+    return product_stamp['count'], f'"{hashlib.sha1(raw.encode()).hexdigest()}"'
+
+
+def picker_response(request):
+    """Paginated picker page (``count``/``next``/``previous``/``results``) with an ETag."""
+    products = picker_queryset(request)
+    page = _int_param(request, 'page', 1)
+    page_size = _int_param(request, 'page_size', DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    count, etag = _etag(request, products, page, page_size)
+
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if header and etag in parse_etags(header):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    offset = (page - 1) * page_size
+    rows = list(products.order_by('name', 'id').values(
+        'id', 'name', 'sku', 'barcode', 'selling_price', 'stock_quantity', 'category_id', 'category__name',
+    )[offset:offset + page_size])
+    variations = {}
+    for variation in ProductVariation.objects.filter(
+        product_id__in=[row['id'] for row in rows], is_active=True
+    ).order_by('product_id', 'id').values('id', 'product_id', 'size', 'color', 'stock'):
+        variations.setdefault(variation.pop('product_id'), []).append(variation)
+
+    url = request.build_absolute_uri()
+    response = Response({
+        'count': count,
+        'next': replace_query_param(url, 'page', page + 1) if offset + page_size < count else None,
+        'previous': (
+            None if page == 1 else
+            remove_query_param(url, 'page') if page == 2 else replace_query_param(url, 'page', page - 1)
+        ),
+        'results': [
+            {
+                'id': row['id'],
+                'name': row['name'],
+                'sku': row['sku'],
+                'barcode': row['barcode'],
+                'price': row['selling_price'],
+                'category': row['category__name'],
+                'category_id': row['category_id'],
+                'stock': row['stock_quantity'],
+                'variations': variations.get(row['id'], []),
+            }
+            for row in rows
+        ],
+    })
+    response['ETag'] = etag
+    # The browser may keep the page but must revalidate it
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,103 @@
+"""
+Goods receipts: book a whole supplier delivery in one transaction.
+
+Lines name a variation directly or by product barcode (plus size/color when
+the product has more than one variation). All touched variations and
+products are locked, stock is raised with one ``F()`` update per distinct
+quantity, the movements are bulk-inserted and every affected product's total
+is recomputed once. With ``update_cost_price`` the product cost becomes the
+weighted average of the stock on hand and the received units.
+"""
+
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from .models import Product, ProductVariation, StockMovement
+from .stock import apply_stock_changes, resolve_variations
+
+CENT = Decimal('0.01')
+
+
+def receive_goods(supplier, reference_number, lines, notes='', update_cost_price=False):
+    """
+    Book a delivery; returns the new stock of every touched variation and product.
+
+    ``lines`` are dicts with ``quantity``, optional ``unit_cost`` and either
+    ``variation_id`` or ``barcode`` (with optional ``size``/``color``).
+    """
+    variation_ids = resolve_variations(lines)
+
+    # Merge repeated variations; keep received cost per variation for the average
+    quantities = defaultdict(int)
+    received_cost = defaultdict(Decimal)
+    costed_quantity = defaultdict(int)
+    for variation_id, line in zip(variation_ids, lines):
+        quantities[variation_id] += line['quantity']
+        if line.get('unit_cost') is not None:
+            received_cost[variation_id] += line['unit_cost'] * line['quantity']
+            costed_quantity[variation_id] += line['quantity']
+
+    with transaction.atomic():
+        # Lock in a fixed order so concurrent receipts cannot deadlock
+        variation_products = dict(
+            ProductVariation.objects.select_for_update().filter(id__in=quantities)
+            .order_by('id').values_list('id', 'product_id')
+        )
+        missing = sorted(set(quantities) - set(variation_products))
+        if missing:
+            raise ValidationError({'lines': f'Unknown variation ids: {missing}'})
+        products = {
+            product.id: product
+            for product in Product.objects.select_for_update().filter(id__in=set(variation_products.values()))
+            .order_by('id').only('id', 'cost_price', 'stock_quantity')
+        }
+        # Only once the rows are locked: a resubmitted delivery locks the same
+        # variations, so it waits here until the first one is committed
+        if StockMovement.objects.filter(reference_number=reference_number, movement_type='IN').exists():
+            raise ValidationError({'reference_number': f'Delivery {reference_number} has already been received'})
+
+        now = timezone.now()
+        if update_cost_price:
+            _update_cost_prices(products, variation_products, quantities, received_cost, costed_quantity, now)
+        apply_stock_changes(
+            quantities, variation_products, 'IN', reference_number,
+            notes or f'Goods receipt from {supplier}', now,
+        )
+
+        return {
+            'reference_number': reference_number,
+            'supplier': supplier.id,
+            'lines': len(lines),
+            'total_quantity': sum(quantities.values()),
+            'variations': list(
+                ProductVariation.objects.filter(id__in=quantities).order_by('id').values('id', 'product_id', 'stock')
+            ),
+            'products': list(
+                Product.objects.filter(id__in=products).order_by('id').values('id', 'stock_quantity', 'cost_price')
+            ),
+        }
+
+
+def _update_cost_prices(products, variation_products, quantities, received_cost, costed_quantity, now):
+    """Weighted-average cost: (on hand x current cost + received value) / (on hand + received)."""
+    received = defaultdict(lambda: [0, Decimal('0')])
+    for variation_id, quantity in quantities.items():
+        product = products[variation_products[variation_id]]
+        # Units delivered without a unit cost are valued at the current cost
+        uncosted = quantity - costed_quantity[variation_id]
+        totals = received[product.id]
+        totals[0] += quantity
+        totals[1] += received_cost[variation_id] + uncosted * product.cost_price
+
+    changed = []
+    for product_id, (quantity, value) in received.items():
+        product = products[product_id]
+        on_hand = max(product.stock_quantity, 0)
+        cost = ((on_hand * product.cost_price + value) / (on_hand + quantity)).quantize(CENT, ROUND_HALF_UP)
+        if cost != product.cost_price:
+            product.cost_price = cost
+            product.updated_at = now
+            changed.append(product)
+    Product.objects.bulk_update(changed, ['cost_price', 'updated_at'])
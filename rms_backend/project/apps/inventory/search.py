@@ -0,0 +1,346 @@
+"""
+Product search for the admin/POS product list and the storefront.
+
+Every product has a ``ProductSearchDocument`` with its name, codes (SKU and
+barcode) and attributes (category, variation colors and sizes). Product,
+variation and category writes queue the affected products and the documents
+are rebuilt in one batch when the transaction commits; ``rebuild_search_index``
+covers writes that bypass signals.
+
+``search_products(query)`` returns the ids of the best matching products,
+most relevant first, and ``search_queryset`` narrows a (filtered) product
+queryset to all of its hits. Hits are restricted to the queryset before any
+limit applies. There are two backends (``PRODUCT_SEARCH_BACKEND``):
+
+* ``fulltext`` (default on MySQL): a FULLTEXT index over the documents in
+  boolean mode, every word as a prefix, with SKU/barcode prefix matches
+  ranked first. Words shorter than ``innodb_ft_min_token_size`` are not in
+  the index; a query made only of such words matches name prefixes.
+* ``memory`` (default elsewhere): an in-process inverted index with exact,
+  prefix and trigram (typo-tolerant) matching, weighted by field. Each
+  worker loads the documents once and afterwards only the ones updated since
+  its last look, whenever the documents' data version moves.
+"""
+
+import bisect
+import re
+import threading
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Max, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from apps.response_cache import bump_version, model_version, track_versions
+from .models import Category, Product, ProductSearchDocument, ProductVariation
+
+FIELD_WEIGHTS = {'codes': 4.0, 'name': 3.0, 'attributes': 1.0}
+EXACT, PREFIX, FUZZY = 1.0, 0.8, 0.6
+MIN_SIMILARITY = 0.4
+FULLTEXT_MIN_TOKEN = 3
+BATCH_SIZE = 500
+SYNC_OVERLAP = timedelta(minutes=1)
+
+_WORD_RE = re.compile(r'[0-9a-z]+(?:[-_./][0-9a-z]+)*')
+_PART_RE = re.compile(r'[0-9a-z]+')
+
+_local = threading.local()
+
+
+def tokenize(text):
+    """Lowercase words of ``text``; joined codes ("SH-001") also yield their parts."""
+    tokens = []
+    for word in _WORD_RE.findall((text or '').lower()):
+        tokens.append(word)
+        parts = _PART_RE.findall(word)
+        if len(parts) > 1:
+            tokens += parts
+    return tokens
+
+
+# Indexing
+
+def _documents(product_ids):
+    """{product_id: ProductSearchDocument} built from the current rows, in two queries."""
+    attributes = defaultdict(list)
+    documents = {}
+    for row in Product.objects.filter(id__in=product_ids).values('id', 'name', 'sku', 'barcode', 'category__name'):
+        documents[row['id']] = ProductSearchDocument(
+            product_id=row['id'],
+            name=row['name'],
+            codes=' '.join(code for code in [row['sku'], row['barcode']] if code)[:255],
+        )
+        if row['category__name']:
+            attributes[row['id']].append(row['category__name'])
+    for product_id, color, size in ProductVariation.objects.filter(
+        product_id__in=documents, is_active=True
+    ).values_list('product_id', 'color', 'size').distinct():
+        for value in (color, size):
+            if value and value not in attributes[product_id]:
+                attributes[product_id].append(value)
+    for product_id, document in documents.items():
+        document.attributes = ' '.join(attributes[product_id])
+    return documents
+
+
+def reindex_products(product_ids):
+    """Rebuild the search documents of ``product_ids``; returns how many were written."""
+    product_ids = list(set(product_ids))
+    written = 0
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        documents = _documents(product_ids[start:start + BATCH_SIZE])
+        now = timezone.now()
+        for document in documents.values():
+            document.updated_at = now
+        existing = set(
+            ProductSearchDocument.objects.filter(product_id__in=documents).values_list('product_id', flat=True)
+        )
+        with transaction.atomic():
+            ProductSearchDocument.objects.bulk_update(
+                [document for product_id, document in documents.items() if product_id in existing],
+                ['name', 'codes', 'attributes', 'updated_at'],
+            )
+            ProductSearchDocument.objects.bulk_create(
+                [document for product_id, document in documents.items() if product_id not in existing]
+            )
+        written += len(documents)
+    if written:
+        transaction.on_commit(lambda: bump_version(ProductSearchDocument))
+    return written
+
+
+def _pending():
+    if not hasattr(_local, 'product_ids'):
+        _local.product_ids = set()
+    return _local.product_ids
+
+
+def queue_reindex(product_ids):
+    """Rebuild the documents of ``product_ids`` when the current transaction commits."""
+    _pending().update(product_id for product_id in product_ids if product_id)
+    # One callback per call; the first one to run drains the whole batch
+    transaction.on_commit(_flush)
+
+
+def _flush():
+    pending = _pending()
+    product_ids = list(pending)
+    pending.clear()
+    if product_ids:
+        reindex_products(product_ids)
+
+
+# Saves limited to these fields don't change what is searchable
+STOCK_FIELDS = {'stock', 'stock_quantity', 'updated_at'}
+
+
+def _stock_only(update_fields):
+    return bool(update_fields) and set(update_fields) <= STOCK_FIELDS
+
+
+def _product_saved(sender, instance, update_fields=None, **kwargs):
+    if not _stock_only(update_fields):
+        queue_reindex([instance.pk])
+
+
+def _variation_changed(sender, instance, update_fields=None, **kwargs):
+    if not _stock_only(update_fields):
+        queue_reindex([instance.product_id])
+
+
+def _category_saved(sender, instance, created, **kwargs):
+    if not created:
+        queue_reindex(Product.objects.filter(category=instance).values_list('id', flat=True))
+
+
+def connect_search_signals():
+    # Documents of deleted products go with them (cascade)
+    track_versions(ProductSearchDocument)
+    post_save.connect(_product_saved, sender=Product, dispatch_uid='search-product')
+    post_save.connect(_variation_changed, sender=ProductVariation, dispatch_uid='search-variation-save')
+    post_delete.connect(_variation_changed, sender=ProductVariation, dispatch_uid='search-variation-delete')
+    post_save.connect(_category_saved, sender=Category, dispatch_uid='search-category')
+
+
+# In-process backend
+
+def _trigrams(token):
+    padded = f'  {token} '
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+class MemoryIndex:
+    def __init__(self):
+        self.postings = defaultdict(dict)  # token -> {product_id: field weight}
+        self.tokens_of = {}  # product_id -> tokens
+        self.trigrams = defaultdict(set)  # trigram -> tokens
+        self.sorted_tokens = []
+        self.version = None
+        self.synced_until = None
+        self.lock = threading.Lock()
+
+    def add(self, document):
+        self.remove(document.product_id)
+        tokens = set()
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(getattr(document, field)):
+                postings = self.postings[token]
+                if not postings:
+                    bisect.insort(self.sorted_tokens, token)
+                    for trigram in _trigrams(token):
+                        self.trigrams[trigram].add(token)
+                postings[document.product_id] = max(weight, postings.get(document.product_id, 0))
+                tokens.add(token)
+        self.tokens_of[document.product_id] = tokens
+
+    def remove(self, product_id):
+        for token in self.tokens_of.pop(product_id, ()):
+            postings = self.postings[token]
+            postings.pop(product_id, None)
+            if not postings:
+                del self.postings[token]
+                del self.sorted_tokens[bisect.bisect_left(self.sorted_tokens, token)]
+                for trigram in _trigrams(token):
+                    self.trigrams[trigram].discard(token)
+
+    def _matches(self, term):
+        """{token: match quality} for one query term."""
+        matches = {}
+        start = bisect.bisect_left(self.sorted_tokens, term)
+        for token in self.sorted_tokens[start:]:
+            if not token.startswith(term):
+                break
+            matches[token] = EXACT if token == term else PREFIX
+        if len(term) >= 3:
+            wanted = _trigrams(term)
+            shared = defaultdict(int)
+            for trigram in wanted:
+                for token in self.trigrams.get(trigram, ()):
+                    shared[token] += 1
+            for token, count in shared.items():
+                similarity = count / (len(wanted) + len(_trigrams(token)) - count)
+                if similarity >= MIN_SIMILARITY and token not in matches:
+                    matches[token] = FUZZY * similarity
+        return matches
+
+    def search(self, query, limit, allowed=None):
+        """Best ``limit`` (None: all) product ids, only among ``allowed`` ids when given."""
+        scores = None
+        with self.lock:
+            for term in dict.fromkeys(tokenize(query)):
+                term_scores = defaultdict(float)
+                for token, quality in self._matches(term).items():
+                    for product_id, weight in self.postings[token].items():
+                        term_scores[product_id] = max(term_scores[product_id], quality * weight)
+                # Every term has to match something
+                scores = term_scores if scores is None else {
+                    product_id: score + term_scores[product_id]
+                    for product_id, score in scores.items() if product_id in term_scores
+                }
+                if not scores:
+                    return []
+        scores = scores or {}
+        if allowed is not None:
+            scores = {product_id: score for product_id, score in scores.items() if product_id in allowed}
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [product_id for product_id, _ in ranked[:limit]]
+
+    def sync(self):
+        """Apply the documents updated since the last sync, if their data version moved."""
+        version = model_version(ProductSearchDocument)
+        if version == self.version:
+            return
+        with self.lock:
+            documents = ProductSearchDocument.objects.all()
+            if self.synced_until is not None:
+                # Overlap, for documents committed a little after they were stamped
+                documents = documents.filter(updated_at__gte=self.synced_until - SYNC_OVERLAP)
+            latest = documents.aggregate(latest=Max('updated_at'))['latest']
+            for document in documents.iterator():
+                self.add(document)
+            live = set(ProductSearchDocument.objects.values_list('product_id', flat=True))
+            for product_id in set(self.tokens_of) - live:
+                self.remove(product_id)
+            self.synced_until = latest or self.synced_until
+            self.version = version
+
+
+_memory_index = MemoryIndex()
+
+
+def _memory_search(query, limit, within):
+    _memory_index.sync()
+    allowed = None if within is None else set(within.values_list('id', flat=True))
+    return _memory_index.search(query, limit, allowed)
+
+
+# FULLTEXT backend
+
+def _fulltext_search(query, limit, within):
+    text = query.strip()
+    long_words = [word for word in _PART_RE.findall(text.lower()) if len(word) >= FULLTEXT_MIN_TOKEN]
+    products = Product.objects.all() if within is None else within
+
+    # Scanned codes and code prefixes first (unique indexes on both columns)
+    hits = list(dict.fromkeys(
+        products.filter(Q(sku__istartswith=text) | Q(barcode__istartswith=text))
+        .order_by('sku').values_list('id', flat=True)[:limit]
+    ))
+    documents = ProductSearchDocument.objects.exclude(product_id__in=hits)
+    if within is not None:
+        documents = documents.filter(product_id__in=within.order_by().values('id'))
+    if long_words:
+        table = ProductSearchDocument._meta.db_table
+        documents = documents.annotate(score=RawSQL(
+            f'MATCH ({table}.name, {table}.codes, {table}.attributes) AGAINST (%s IN BOOLEAN MODE)',
+            [' '.join(f'+{word}*' for word in long_words)],
+        )).filter(score__gt=0).order_by('-score', 'product_id')
+    else:
+        documents = documents.filter(name__istartswith=text).order_by('name', 'product_id')
+    rest = None if limit is None else limit - len(hits)
+    return hits + list(documents.values_list('product_id', flat=True)[:rest])
+
+
+def _backend():
+    backend = getattr(settings, 'PRODUCT_SEARCH_BACKEND', 'auto')
+    if backend == 'auto':
+        return 'fulltext' if connection.vendor == 'mysql' else 'memory'
+    return backend
+
+
+def _search(query, limit, within):
+    if not query or not query.strip():
+        return []
+    if _backend() == 'fulltext':
+        return _fulltext_search(query, limit, within)
+    return _memory_search(query, limit, within)
+
+
+def search_products(query, limit=None, within=None):
+    """
+    Ids of the products matching ``query``, most relevant first.
+
+    ``within`` (a product queryset) restricts the hits before the limit
+    (``limit``, default ``PRODUCT_SEARCH_LIMIT``) is applied.
+    """
+    return _search(query, limit or getattr(settings, 'PRODUCT_SEARCH_LIMIT', 100), within)
+
+
+def search_queryset(queryset, query):
+    """
+    ``queryset`` narrowed to all of its hits for ``query``, annotated with ``search_rank``.
+
+    Apply it after the other filters. Only the best ``PRODUCT_SEARCH_LIMIT``
+    hits are ranked (0 is best); the rest share the rank after them.
+    """
+    product_ids = _search(query, None, queryset)
+    if not product_ids:
+        return queryset.none().annotate(search_rank=Value(0, output_field=IntegerField()))
+    ranked = product_ids[:getattr(settings, 'PRODUCT_SEARCH_LIMIT', 100)]
+    return queryset.filter(id__in=product_ids).annotate(search_rank=Case(
+        *[When(id=product_id, then=Value(rank)) for rank, product_id in enumerate(ranked)],
+        default=Value(len(ranked)),
+        output_field=IntegerField(),
+    ))
@@ -1,17 +1,39 @@
+from decimal import Decimal
 from rest_framework import serializers
 from django.core.validators import MinValueValidator
 from django.utils.text import slugify
-from .models import Category, OnlineCategory, Product, ProductVariation, StockMovement, InventoryAlert, MeterialComposition, WhoIsThisFor, Features, Gallery, Image
+from apps.dynamic_fields import DynamicFieldsMixin
+from .models import Category, OnlineCategory, Product, ProductVariation, StockMovement, InventoryAlert, MeterialComposition, WhoIsThisFor, Features, Gallery, Image, StockTake
 from apps.supplier.models import Supplier
 from apps.supplier.serializers import SupplierSerializer
 
+def _tree_node(serializer, model, obj):
+    """``obj``'s node in the cached category tree, shared by the whole response."""
+    trees = serializer.context.setdefault('category_trees', {})
+    if model not in trees:
+        from .category_tree import category_tree
+        request = serializer.context.get('request')
+        trees[model] = category_tree(model, fresh=request is None or request.method not in ('GET', 'HEAD'))
+    tree = trees[model]
+    return tree, tree['nodes'].get(obj.pk)
+
+
+def _validate_tree_parent(instance, parent):
+    if instance is not None and parent is not None and parent.is_in_subtree_of(instance):
+        raise serializers.ValidationError({'parent': "A category cannot be moved under itself or one of its descendants."})
+
+
 class CategorySerializer(serializers.ModelSerializer):
     product_count = serializers.SerializerMethodField()
+    total_product_count = serializers.SerializerMethodField()
     children = serializers.SerializerMethodField()
 
     class Meta:
         model = Category
-        fields = ['id', 'name', 'slug', 'description', 'parent', 'created_at', 'updated_at', 'product_count', 'children']
+        fields = [
+            'id', 'name', 'slug', 'description', 'parent', 'created_at', 'updated_at',
+            'product_count', 'total_product_count', 'children'
+        ]
         extra_kwargs = {
             'slug': {'read_only': True},
             'parent': {'required': False, 'allow_null': True},
@@ -19,16 +41,32 @@ class CategorySerializer(serializers.ModelSerializer):
         }
 
     def get_product_count(self, obj):
-        return obj.products.count()
+        _, node = _tree_node(self, Category, obj)
+        return node['product_count'] if node else 0
+
+    def get_total_product_count(self, obj):
+        _, node = _tree_node(self, Category, obj)
+        return node['total_product_count'] if node else 0
 
     def get_children(self, obj):
-        try:
-            children = Category.objects.filter(parent=obj)
-            if not children.exists():
-                return []
-            return CategorySerializer(children, many=True).data
-        except Exception:
-            return []
+        # Rendered from the cached tree: no query per node
+        tree, node = _tree_node(self, Category, obj)
+        return [self._render_node(tree, child_id) for child_id in node['children']] if node else []
+
+    def _render_node(self, tree, node_id):
+        node = tree['nodes'][node_id]
+        return {
+            'id': node['id'],
+            'name': node['name'],
+            'slug': node['slug'],
+            'description': node['description'],
+            'parent': node['parent_id'],
+            'created_at': self.fields['created_at'].to_representation(node['created_at']),
+            'updated_at': self.fields['updated_at'].to_representation(node['updated_at']),
+            'product_count': node['product_count'],
+            'total_product_count': node['total_product_count'],
+            'children': [self._render_node(tree, child_id) for child_id in node['children']],
+        }
 
     def validate(self, data):
         # Handle empty strings for optional fields
@@ -36,6 +74,7 @@ class CategorySerializer(serializers.ModelSerializer):
             data['description'] = None
         if 'parent' in data and data['parent'] == '':
             data['parent'] = None
+        _validate_tree_parent(self.instance, data.get('parent'))
         return data
 
     def create(self, validated_data):
@@ -113,7 +152,14 @@ class ProductVariationSerializer(serializers.ModelSerializer):
 
 # Ecommerce Showcase Serializers
 class EcommerceProductSerializer(serializers.ModelSerializer):
-    """Simplified serializer for ecommerce showcase"""
+    """
+    Simplified serializer for ecommerce showcase.
+
+    Variations, galleries and images are read through ``.all()`` so prefetched
+    querysets are used; pass ``discounts`` (product id -> Discount or None,
+    see discount_utils.get_applicable_discounts) in the context to skip the
+    per-product discount lookups.
+    """
     image_url = serializers.SerializerMethodField()
     online_categories = serializers.SerializerMethodField()
     available_colors = serializers.SerializerMethodField()
@@ -162,20 +208,19 @@ class EcommerceProductSerializer(serializers.ModelSerializer):
     
     def get_available_colors(self, obj):
         """Get unique colors from product variations"""
-        colors = obj.variations.filter(is_active=True).values_list('color', 'color_hax').distinct()
+        colors = dict.fromkeys((v.color, v.color_hax) for v in obj.variations.all() if v.is_active)
         return [{'name': color[0], 'hex': color[1]} for color in colors]
     
     def get_available_sizes(self, obj):
         """Get unique sizes from product variations"""
-        sizes = obj.variations.filter(is_active=True).values_list('size', flat=True).distinct()
-        return list(sizes)
+        return list(dict.fromkeys(v.size for v in obj.variations.all() if v.is_active))
     
     def get_primary_image(self, obj):
         """Get primary image from galleries"""
         try:
-            primary_gallery = obj.galleries.first()
+            primary_gallery = min(obj.galleries.all(), key=lambda gallery: gallery.pk, default=None)
             if primary_gallery:
-                primary_img = primary_gallery.images.filter(imageType='PRIMARY').first()
+                primary_img = next((img for img in primary_gallery.images.all() if img.imageType == 'PRIMARY'), None)
                 if primary_img and getattr(primary_img.image, 'url', None):
                     url = primary_img.image.url
                     request = self.context.get('request')
@@ -193,8 +238,11 @@ class EcommerceProductSerializer(serializers.ModelSerializer):
             for gallery in obj.galleries.all():
                 # Get images in specific order
                 image_order = ['PRIMARY', 'SECONDARY', 'THIRD', 'FOURTH']
+                by_type = {}
+                for img in gallery.images.all():
+                    by_type.setdefault(img.imageType, img)
                 for img_type in image_order:
-                    img = gallery.images.filter(imageType=img_type).first()
+                    img = by_type.get(img_type)
                     if img and getattr(img.image, 'url', None):
                         url = img.image.url
                         request = self.context.get('request')
@@ -208,11 +256,17 @@ class EcommerceProductSerializer(serializers.ModelSerializer):
     
     # No custom method needed; nested serializer handles the shape
     
+    def _get_discount(self, obj):
+        discounts = self.context.get('discounts')
+        if discounts is not None and obj.id in discounts:
+            return discounts[obj.id]
+        from apps.ecommerce.discount_utils import get_applicable_discount
+        return get_applicable_discount(obj)
+
     def get_original_price(self, obj):
         """Get original price before discount"""
         # Check for discounts using utility
-        from apps.ecommerce.discount_utils import get_applicable_discount
-        discount = get_applicable_discount(obj)
+        discount = self._get_discount(obj)
         
         if discount:
             return obj.selling_price
@@ -221,8 +275,7 @@ class EcommerceProductSerializer(serializers.ModelSerializer):
     
     def get_discount(self, obj):
         """Get discount percentage"""
-        from apps.ecommerce.discount_utils import get_applicable_discount
-        discount = get_applicable_discount(obj)
+        discount = self._get_discount(obj)
         
         if discount:
             return float(discount.value)
@@ -379,7 +432,11 @@ class ProductVariationSerializer(serializers.ModelSerializer):
             'height': {'required': False, 'allow_null': True},
         }
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Full product document, as used by the product editor. Supports
+    ?fields=/?omit=/?expand= (see apps.dynamic_fields).
+    """
     variations = ProductVariationSerializer(many=True, read_only=True)
     galleries = GallerySerializer(many=True, read_only=True)
     ecommerce_statuses = serializers.SerializerMethodField()
@@ -428,6 +485,24 @@ class ProductSerializer(serializers.ModelSerializer):
             'minimum_stock': {'required': False},
             'is_active': {'required': False}
         }
+        query_plan = {
+            'category': (['category__parent'], []),
+            'category_name': (['category'], []),
+            'supplier': (['supplier'], []),
+            'supplier_name': (['supplier'], []),
+            'online_categories': ([], ['online_categories__parent']),
+            'ecommerce_statuses': ([], ['ecommerce_statuses']),
+            'variations': ([], ['variations']),
+            'galleries': ([], ['galleries__images']),
+            'color_galleries': ([], ['galleries__images']),
+            'material_composition': ([], ['material_compositions']),
+            'material_composition_string': ([], ['material_compositions']),
+            'who_is_this_for': ([], ['who_is_this_for']),
+            'features': ([], ['features']),
+            'first_variation_color': ([], ['variations']),
+            'first_variation_size': ([], ['variations']),
+            'first_variation_color_slug': ([], ['variations']),
+        }
 
     def get_ecommerce_statuses(self, obj):
         return [
@@ -497,8 +572,21 @@ class ProductSerializer(serializers.ModelSerializer):
         return ", ".join([f"{m.percentige}% {m.title}" for m in materials if m.title])
 
     def _get_active_discount(self, obj):
-        from apps.ecommerce.discount_utils import get_applicable_discount
-        return get_applicable_discount(obj)
+        # Shared by the three discount fields; resolved for the whole page at once in list views
+        discounts = self.context.setdefault('product_discounts', {})
+        if obj.pk not in discounts:
+            from apps.ecommerce.discount_utils import get_applicable_discounts
+            parent = self.parent
+            page = parent.instance if isinstance(parent, serializers.ListSerializer) and parent.instance is not None else []
+            products = {product.pk: product for product in page if product.pk not in discounts}
+            products[obj.pk] = obj
+            discounts.update(get_applicable_discounts(products.values()))
+        return discounts[obj.pk]
+
+    def _first_variation(self, obj):
+        if 'variations' in getattr(obj, '_prefetched_objects_cache', {}):
+            return min(obj.variations.all(), key=lambda variation: variation.pk, default=None)
+        return obj.variations.first()
 
     def get_discount_percentage(self, obj):
         discount = self._get_active_discount(obj)
@@ -516,28 +604,25 @@ class ProductSerializer(serializers.ModelSerializer):
         return float(obj.selling_price)
 
     def get_first_variation_color(self, obj):
-        first_variant = obj.variations.first()
+        first_variant = self._first_variation(obj)
         return first_variant.color if first_variant else None
 
     def get_first_variation_size(self, obj):
-        first_variant = obj.variations.first()
+        first_variant = self._first_variation(obj)
         return first_variant.size if first_variant else None
 
     def get_first_variation_image(self, obj):
-        first_variant = obj.variations.first()
-        if first_variant:
-            gallery = Gallery.objects.filter(product=obj, color=first_variant.color).first()
-            if gallery:
-                primary_img = gallery.images.filter(imageType='PRIMARY').first()
-                if primary_img:
-                    request = self.context.get('request')
-                    if request:
-                        return request.build_absolute_uri(primary_img.image.url)
-                    return primary_img.image.url
-        return obj.image.url if obj.image else None
+        # Shared, cached thumbnails; resolved for the whole page at once in list views
+        from apps.ecommerce.thumbnails import absolute_url, page_thumbnails
+        thumbnail = page_thumbnails(self, obj, lambda product: [product.id]).get(obj.id)
+        if not thumbnail:
+            return None
+        if thumbnail['from_gallery']:
+            return absolute_url(self.context.get('request'), thumbnail['image'])
+        return thumbnail['image']
 
     def get_first_variation_color_slug(self, obj):
-        first_variant = obj.variations.first()
+        first_variant = self._first_variation(obj)
         return slugify(first_variant.color) if first_variant and first_variant.color else None
 
     def get_image_url(self, obj):
@@ -549,6 +634,19 @@ class ProductSerializer(serializers.ModelSerializer):
         return None
 
 
+class ProductListSerializer(ProductSerializer):
+    """
+    Row of the inventory product table. The nested collections and the
+    editor-only fields are left out unless requested with ?expand=
+    (e.g. ?expand=variations,galleries).
+    """
+
+    class Meta(ProductSerializer.Meta):
+        expandable_fields = [
+            'variations', 'galleries', 'color_galleries',
+            'material_composition', 'material_composition_string', 'who_is_this_for', 'features',
+        ]
+
 
 class ProductCreateSerializer(serializers.ModelSerializer):
     variations = ProductVariationSerializer(many=True, required=False)
@@ -781,7 +879,8 @@ class StockMovementSerializer(serializers.ModelSerializer):
 
 class InventoryAlertSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
-    variation_code = serializers.CharField(source='variation.variation_code', read_only=True)
+    variation_size = serializers.CharField(source='variation.size', read_only=True, default=None)
+    variation_color = serializers.CharField(source='variation.color', read_only=True, default=None)
 
     class Meta:
         model = InventoryAlert
@@ -824,23 +923,97 @@ class AddStockSerializer(serializers.Serializer):
         return value
 
 
+class GoodsReceiptLineSerializer(serializers.Serializer):
+    variation_id = serializers.IntegerField(required=False, min_value=1)
+    barcode = serializers.CharField(max_length=50, required=False)
+    size = serializers.CharField(max_length=50, required=False)
+    color = serializers.CharField(max_length=50, required=False)
+    quantity = serializers.IntegerField(validators=[MinValueValidator(1)])
+    unit_cost = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, min_value=Decimal('0.01'))
+
+    def validate(self, data):
+        if not data.get('variation_id') and not data.get('barcode'):
+            raise serializers.ValidationError("Each line needs a variation_id or a barcode")
+        return data
+
+
+class GoodsReceiptSerializer(serializers.Serializer):
+    supplier = serializers.PrimaryKeyRelatedField(queryset=Supplier.objects.all())
+    reference_number = serializers.CharField(max_length=50)
+    notes = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    update_cost_price = serializers.BooleanField(default=False)
+    lines = GoodsReceiptLineSerializer(many=True, allow_empty=False, max_length=5000)
+
+
+class StockTakeSerializer(serializers.ModelSerializer):
+    category_name = serializers.CharField(source='category.name', read_only=True, allow_null=True)
+    reference = serializers.CharField(read_only=True)
+    line_count = serializers.IntegerField(read_only=True)
+    counted_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = StockTake
+        fields = [
+            'id', 'reference', 'name', 'category', 'category_name', 'status', 'notes',
+            'started_at', 'posted_at', 'line_count', 'counted_count',
+        ]
+        read_only_fields = ('status', 'started_at', 'posted_at')
+        extra_kwargs = {
+            'category': {'required': False, 'allow_null': True},
+        }
+
+
+class StockCountLineSerializer(serializers.Serializer):
+    variation_id = serializers.IntegerField(required=False, min_value=1)
+    barcode = serializers.CharField(max_length=50, required=False)
+    size = serializers.CharField(max_length=50, required=False)
+    color = serializers.CharField(max_length=50, required=False)
+    quantity = serializers.IntegerField(min_value=0)
+
+    def validate(self, data):
+        if not data.get('variation_id') and not data.get('barcode'):
+            raise serializers.ValidationError("Each count needs a variation_id or a barcode")
+        return data
+
+
+class StockCountBatchSerializer(serializers.Serializer):
+    mode = serializers.ChoiceField(choices=['set', 'add'], default='set')
+    counts = StockCountLineSerializer(many=True, allow_empty=False, max_length=5000)
+
+
 class OnlineCategorySerializer(serializers.ModelSerializer):
     """
     Serializer for OnlineCategory model.
     """
     parent_name = serializers.CharField(source='parent.name', read_only=True)
     children_count = serializers.SerializerMethodField()
+    product_count = serializers.SerializerMethodField()
+    total_product_count = serializers.SerializerMethodField()
     
     class Meta:
         model = OnlineCategory
         fields = [
             'id', 'name', 'slug', 'description', 'parent', 'parent_name',
-            'children_count', 'order', 'gender', 'created_at', 'updated_at'
+            'children_count', 'product_count', 'total_product_count',
+            'order', 'gender', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'slug', 'created_at', 'updated_at']
     
     def get_children_count(self, obj):
-        return obj.children.count()
+        _, node = _tree_node(self, OnlineCategory, obj)
+        return len(node['children']) if node else 0
+
+    def get_product_count(self, obj):
+        _, node = _tree_node(self, OnlineCategory, obj)
+        return node['product_count'] if node else 0
+
+    def get_total_product_count(self, obj):
+        _, node = _tree_node(self, OnlineCategory, obj)
+        return node['total_product_count'] if node else 0
+
+    def validate(self, data):
+        _validate_tree_parent(self.instance, data.get('parent'))
+        return data
     
     def create(self, validated_data):
         # Generate slug if not provided
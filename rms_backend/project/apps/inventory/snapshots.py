@@ -0,0 +1,203 @@
+"""
+Daily inventory snapshots.
+
+``take_snapshots`` writes one ``InventorySnapshot`` row per variation and
+business day: the end-of-day quantity plus the units received and sold that
+day, valued at the product's cost and selling price. Days are built
+incrementally from the stock movement ledger, starting from the last
+snapshot. With no earlier snapshot, the opening stock is the current stock
+rewound by every later movement.
+
+Rows with no stock and no movements are skipped, so a missing row means 0.
+Prices are the ones current when the snapshot is taken, because products
+keep no price history; backfilled days are valued at today's prices.
+
+The report helpers below only read the snapshot table, so any historical
+range is a single indexed aggregate.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+from apps.utils import business_localtime, business_today
+from .models import InventorySnapshot, ProductVariation, StockMovement
+from .stock import SIGNED_QUANTITY
+
+
+def _daily_movements(date_from, date_to):
+    """{(business_date, variation_id): (net, units_in, units_out)} for the range."""
+    return {
+        (row['business_date'], row['variation_id']): (row['net'], row['units_in'] or 0, row['units_out'] or 0)
+        for row in StockMovement.objects.filter(
+            business_date__range=[date_from, date_to], variation__isnull=False
+        ).values('business_date', 'variation_id').annotate(
+            net=Sum(SIGNED_QUANTITY),
+            units_in=Sum('quantity', filter=Q(movement_type='IN')),
+            units_out=Sum('quantity', filter=Q(movement_type__in=['OUT', 'GIFT'])),
+        ).order_by()
+    }
+
+
+def _opening_quantities(date_from, rebase, created_on):
+    """
+    Stock per variation at the end of the day before ``date_from``.
+
+    Taken from that day's snapshot when there is one; otherwise (and for
+    variations created since) current stock rewound by the later movements.
+    """
+    opening = dict(ProductVariation.objects.values_list('id', 'stock'))
+    for variation_id, net in StockMovement.objects.filter(
+        business_date__gte=date_from, variation__isnull=False
+    ).values('variation_id').annotate(net=Sum(SIGNED_QUANTITY)).order_by().values_list('variation_id', 'net'):
+        if variation_id in opening:
+            opening[variation_id] -= net
+
+    previous = date_from - timedelta(days=1)
+    if not rebase and InventorySnapshot.objects.filter(date=previous).exists():
+        snapshot = dict(InventorySnapshot.objects.filter(date=previous).values_list('variation_id', 'quantity'))
+        for variation_id in opening:
+            if created_on[variation_id] <= previous:
+                opening[variation_id] = snapshot.get(variation_id, 0)
+    return opening
+
+
+def take_snapshots(through=None, date_from=None, rebase=False, batch_size=2000):
+    """
+    Snapshot every business day from ``date_from`` to ``through`` (default: yesterday).
+
+    ``date_from`` defaults to the day after the last snapshot, or ``through``
+    on the first run. Existing rows in the range are replaced. ``rebase``
+    ignores earlier snapshots and rewinds from current stock instead, which
+    also corrects drift from stock edits that recorded no movement.
+    Returns ``(days, rows)`` written.
+    """
+    through = through or business_today() - timedelta(days=1)
+    if date_from is None:
+        last = InventorySnapshot.objects.aggregate(last=Max('date'))['last']
+        date_from = last + timedelta(days=1) if last and not rebase else through
+    if date_from > through:
+        return 0, 0
+
+    variations = list(ProductVariation.objects.values(
+        'id', 'product_id', 'created_at', 'product__cost_price', 'product__selling_price'
+    ))
+    for variation in variations:
+        variation['created_on'] = business_localtime(variation['created_at']).date()
+
+    rows = 0
+    days = (through - date_from).days + 1
+    with transaction.atomic():
+        quantities = _opening_quantities(
+            date_from, rebase, {variation['id']: variation['created_on'] for variation in variations}
+        )
+        movements = _daily_movements(date_from, through)
+        InventorySnapshot.objects.filter(date__range=[date_from, through]).delete()
+        for offset in range(days):
+            day = date_from + timedelta(days=offset)
+            snapshots = []
+            for variation in variations:
+                if variation['created_on'] > day:
+                    continue
+                net, units_in, units_out = movements.get((day, variation['id']), (0, 0, 0))
+                quantity = quantities.get(variation['id'], 0) + net
+                quantities[variation['id']] = quantity
+                if quantity or units_in or units_out:
+                    snapshots.append(InventorySnapshot(
+                        date=day,
+                        product_id=variation['product_id'],
+                        variation_id=variation['id'],
+                        quantity=quantity,
+                        units_in=units_in,
+                        units_out=units_out,
+                        cost_price=variation['product__cost_price'],
+                        selling_price=variation['product__selling_price'],
+                    ))
+            InventorySnapshot.objects.bulk_create(snapshots, batch_size=batch_size)
+            rows += len(snapshots)
+    return days, rows
+
+
+def _zero(value):
+    return value if value is not None else Decimal('0')
+
+
+def valuation_series(date_from, date_to):
+    """Total units, cost value and retail value of stock at the end of each day."""
+    return list(
+        InventorySnapshot.objects.filter(date__range=[date_from, date_to]).values('date').annotate(
+            units=Sum('quantity'),
+            cost_value=Sum(F('quantity') * F('cost_price')),
+            retail_value=Sum(F('quantity') * F('selling_price')),
+            units_sold=Sum('units_out'),
+        ).order_by('date')
+    )
+
+
+def valuation_by_category(date):
+    """Stock value per category at the end of ``date``."""
+    return list(
+        InventorySnapshot.objects.filter(date=date).values('product__category__name').annotate(
+            category_name=F('product__category__name'),
+            units=Sum('quantity'),
+            cost_value=Sum(F('quantity') * F('cost_price')),
+            retail_value=Sum(F('quantity') * F('selling_price')),
+        ).values('category_name', 'units', 'cost_value', 'retail_value').order_by('-cost_value')
+    )
+
+
+def turnover_report(date_from, date_to, limit=50):
+    """
+    Inventory turnover and days of cover for the range.
+
+    Turnover is cost of goods sold over the average daily inventory value at
+    cost; days of cover is closing stock over the average daily units sold.
+    """
+    days = (date_to - date_from).days + 1
+    snapshots = InventorySnapshot.objects.filter(date__range=[date_from, date_to])
+    products = [
+        _turnover_row(row, days)
+        for row in snapshots.values('product_id', 'product__name').annotate(
+            units_sold=Sum('units_out'),
+            cogs=Sum(F('units_out') * F('cost_price')),
+            inventory_value=Sum(F('quantity') * F('cost_price')),
+            closing_units=Sum('quantity', filter=Q(date=date_to)),
+            closing_value=Sum(F('quantity') * F('cost_price'), filter=Q(date=date_to)),
+        ).order_by()
+    ]
+
+    totals = snapshots.aggregate(
+        units_sold=Sum('units_out'),
+        cogs=Sum(F('units_out') * F('cost_price')),
+        inventory_value=Sum(F('quantity') * F('cost_price')),
+        closing_units=Sum('quantity', filter=Q(date=date_to)),
+        closing_value=Sum(F('quantity') * F('cost_price'), filter=Q(date=date_to)),
+        snapshot_days=Count('date', distinct=True),
+    )
+    return {
+        'date_from': date_from,
+        'date_to': date_to,
+        'days': days,
+        'snapshot_days': totals.pop('snapshot_days'),
+        'totals': _turnover_row(totals, days),
+        'products': sorted(products, key=lambda row: row['cogs'], reverse=True)[:limit],
+    }
+
+
+def _turnover_row(row, days):
+    units_sold = row['units_sold'] or 0
+    cogs = _zero(row['cogs'])
+    average_value = _zero(row['inventory_value']) / days
+    closing_units = row['closing_units'] or 0
+    result = {
+        'units_sold': units_sold,
+        'cogs': cogs,
+        'average_inventory_value': round(average_value, 2),
+        'closing_units': closing_units,
+        'closing_value': _zero(row['closing_value']),
+        'turnover': round(cogs / average_value, 2) if average_value else None,
+        'days_of_cover': round(Decimal(closing_units) * days / units_sold, 1) if units_sold else None,
+    }
+    if 'product_id' in row:
+        result = {'product_id': row['product_id'], 'product_name': row['product__name'], **result}
+    return result
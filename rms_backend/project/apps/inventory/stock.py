@@ -0,0 +1,105 @@
+"""
+Bulk stock helpers shared by goods receipts and stock takes.
+
+Movement quantities are positive for IN/OUT/GIFT and signed for ADJ, so the
+stock effect of any movement is ``SIGNED_QUANTITY``.
+"""
+
+from collections import defaultdict
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, When
+from django.db.models.functions import Coalesce
+from rest_framework.exceptions import ValidationError
+from apps.response_cache import bump_versions_on_commit
+from apps.utils import business_localtime
+from .alerts import queue_stock_check
+from .models import Product, ProductVariation, StockMovement
+
+SIGNED_QUANTITY = Case(
+    When(movement_type='IN', then=F('quantity')),
+    When(movement_type__in=['OUT', 'GIFT'], then=-F('quantity')),
+    default=F('quantity'),
+    output_field=IntegerField(),
+)
+
+
+def resolve_variations(lines):
+    """
+    Map every line to a variation id.
+
+    Lines carry a ``variation_id`` or a product ``barcode`` with optional
+    ``size``/``color``; raises ValidationError listing the lines that don't
+    resolve to exactly one active variation.
+    """
+    barcodes = {line['barcode'] for line in lines if not line.get('variation_id')}
+    by_barcode = defaultdict(list)
+    if barcodes:
+        for variation in ProductVariation.objects.filter(
+            product__barcode__in=barcodes, is_active=True
+        ).values('id', 'size', 'color', 'product__barcode'):
+            by_barcode[variation['product__barcode']].append(variation)
+
+    resolved, errors = [], {}
+    for index, line in enumerate(lines):
+        if line.get('variation_id'):
+            resolved.append(line['variation_id'])
+            continue
+        candidates = by_barcode.get(line['barcode'], [])
+        if line.get('size'):
+            candidates = [v for v in candidates if v['size'].lower() == line['size'].lower()]
+        if line.get('color'):
+            candidates = [v for v in candidates if v['color'].lower() == line['color'].lower()]
+        if len(candidates) == 1:
+            resolved.append(candidates[0]['id'])
+        elif not candidates:
+            errors[index] = f"No active variation for barcode {line['barcode']}"
+        else:
+            errors[index] = f"Barcode {line['barcode']} matches several variations; give size and color"
+    if errors:
+        raise ValidationError({'lines': errors})
+    return resolved
+
+
+def apply_stock_changes(changes, variation_products, movement_type, reference_number, notes, now):
+    """
+    Apply ``{variation_id: delta}`` with bulk F() updates and record one movement each.
+
+    Callers lock the variations and products first. Every affected product's
+    ``stock_quantity`` is recomputed once from its variations.
+    """
+    changes = {variation_id: delta for variation_id, delta in changes.items() if delta}
+    by_delta = defaultdict(list)
+    for variation_id, delta in changes.items():
+        by_delta[delta].append(variation_id)
+    for delta, ids in by_delta.items():
+        ProductVariation.objects.filter(id__in=ids).update(stock=F('stock') + delta, updated_at=now)
+
+    business_date = business_localtime(now).date()
+    StockMovement.objects.bulk_create([
+        StockMovement(
+            product_id=variation_products[variation_id],
+            variation_id=variation_id,
+            movement_type=movement_type,
+            quantity=delta if movement_type == 'ADJ' else abs(delta),
+            reference_number=reference_number,
+            notes=notes,
+            created_at=now,
+            business_date=business_date,
+        )
+        for variation_id, delta in changes.items()
+    ])
+
+    product_ids = {variation_products[variation_id] for variation_id in changes}
+    Product.objects.filter(id__in=product_ids).update(
+        stock_quantity=Coalesce(
+            Subquery(
+                ProductVariation.objects.filter(product=OuterRef('pk')).order_by()
+                .values('product').annotate(total=Sum('stock')).values('total')
+            ),
+            0,
+        ),
+        updated_at=now,
+    )
+    # update() and bulk_create() skip post_save, so queue the alert check and bump explicitly
+    queue_stock_check(product_ids)
+    bump_versions_on_commit(StockMovement)
+    return product_ids
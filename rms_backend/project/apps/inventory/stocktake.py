@@ -0,0 +1,213 @@
+"""
+Stock takes (cycle counts).
+
+Opening a count snapshots the stock of every active variation in scope.
+Counts then arrive in batches while the shop keeps selling, and each line
+remembers when it was last counted. A line's variance is
+
+    counted - (snapshot + stock movements between the snapshot and the count)
+
+so sales and deliveries during the count are not mistaken for shrinkage.
+Posting books every variance as one signed ADJ movement per variation in a
+single transaction, on top of whatever the stock is at that moment.
+"""
+
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from .models import ProductVariation, StockMovement, StockTake, StockTakeLine
+from .stock import SIGNED_QUANTITY, apply_stock_changes, resolve_variations
+
+
+def open_stock_take(category=None, name='', notes='', user=None):
+    """Start a count of ``category`` (whole shop when None) and snapshot its stock."""
+    with transaction.atomic():
+        stock_take = StockTake.objects.create(
+            category=category, name=name, notes=notes, created_by=user, started_at=timezone.now()
+        )
+        variations = ProductVariation.objects.filter(is_active=True, product__is_active=True)
+        if category is not None:
+            variations = variations.filter(product__category__path__startswith=category.path)
+        StockTakeLine.objects.bulk_create(
+            [
+                StockTakeLine(
+                    stock_take=stock_take,
+                    product_id=variation['product_id'],
+                    variation_id=variation['id'],
+                    expected=variation['stock'],
+                    cost_price=variation['product__cost_price'],
+                )
+                for variation in variations.values('id', 'product_id', 'stock', 'product__cost_price').iterator()
+            ],
+            batch_size=1000,
+        )
+    return stock_take
+
+
+def _lock_open(stock_take):
+    stock_take = StockTake.objects.select_for_update().get(pk=stock_take.pk)
+    if stock_take.status != 'OPEN':
+        raise ValidationError({'detail': f'Stock take {stock_take.reference} is {stock_take.get_status_display().lower()}'})
+    return stock_take
+
+
+def record_counts(stock_take, counts, mode='set'):
+    """
+    Record a batch of scanned counts.
+
+    ``mode='set'`` replaces a line's count, ``'add'`` adds to it (one scan
+    per unit). Returns the number of lines touched.
+    """
+    variation_ids = resolve_variations(counts)
+    with transaction.atomic():
+        stock_take = _lock_open(stock_take)
+        lines = {
+            line.variation_id: line
+            for line in StockTakeLine.objects.filter(stock_take=stock_take, variation_id__in=variation_ids)
+        }
+        errors = {
+            index: 'Variation is not part of this stock take'
+            for index, variation_id in enumerate(variation_ids) if variation_id not in lines
+        }
+        if errors:
+            raise ValidationError({'counts': errors})
+
+        now = timezone.now()
+        for variation_id, count in zip(variation_ids, counts):
+            line = lines[variation_id]
+            line.counted = count['quantity'] + ((line.counted or 0) if mode == 'add' else 0)
+            line.counted_at = now
+        StockTakeLine.objects.bulk_update(lines.values(), ['counted', 'counted_at'], batch_size=1000)
+    return len(lines)
+
+
+def variance_lines(stock_take):
+    """Counted lines annotated with ``moved`` (stock movements during the count) and ``variance``."""
+    moved = StockMovement.objects.filter(
+        variation=OuterRef('variation_id'),
+        created_at__gt=stock_take.started_at,
+        created_at__lte=OuterRef('counted_at'),
+    ).order_by().values('variation').annotate(total=Sum(SIGNED_QUANTITY)).values('total')
+    return StockTakeLine.objects.filter(stock_take=stock_take, counted__isnull=False).annotate(
+        moved=Coalesce(Subquery(moved, output_field=IntegerField()), 0),
+    ).annotate(variance=F('counted') - F('expected') - F('moved'))
+
+
+def post_stock_take(stock_take, zero_uncounted=False):
+    """
+    Book all variances as ADJ movements and close the count.
+
+    Uncounted lines are left alone unless ``zero_uncounted`` is set, in
+    which case they are counted as 0 (i.e. the whole scope was counted).
+    """
+    with transaction.atomic():
+        stock_take = _lock_open(stock_take)
+        now = timezone.now()
+        if zero_uncounted:
+            stock_take.lines.filter(counted__isnull=True).update(counted=0, counted_at=now)
+
+        # Lock before reading variances so no sale can slip in between
+        variation_products = dict(
+            ProductVariation.objects.select_for_update()
+            .filter(stock_take_lines__stock_take=stock_take, stock_take_lines__counted__isnull=False)
+            .order_by('id').values_list('id', 'product_id')
+        )
+        lines = list(variance_lines(stock_take))
+        apply_stock_changes(
+            {line.variation_id: line.variance for line in lines},
+            variation_products, 'ADJ', stock_take.reference, f'Stock take {stock_take.reference}', now,
+        )
+        for line in lines:
+            line.adjustment = line.variance
+        StockTakeLine.objects.bulk_update(lines, ['adjustment'], batch_size=1000)
+
+        stock_take.status = 'POSTED'
+        stock_take.posted_at = now
+        stock_take.save(update_fields=['status', 'posted_at'])
+    return stock_take
+
+
+def cancel_stock_take(stock_take):
+    with transaction.atomic():
+        stock_take = _lock_open(stock_take)
+        stock_take.status = 'CANCELLED'
+        stock_take.save(update_fields=['status'])
+    return stock_take
+
+
+def variance_report(stock_take, all_lines=False):
+    """
+    Variance valuation of a stock take at snapshot cost.
+
+    Posted counts report the adjustments that were booked; open counts the
+    variances as they stand. Only lines with a variance are listed unless
+    ``all_lines`` is set.
+    """
+    posted = stock_take.status == 'POSTED'
+    rows = variance_lines(stock_take).values(
+        'variation_id', 'product_id', 'expected', 'moved', 'counted', 'variance', 'adjustment', 'cost_price',
+        'product__name', 'variation__size', 'variation__color',
+    )
+    summary = {
+        'lines': stock_take.lines.count(),
+        'counted': 0,
+        'with_variance': 0,
+        'shrinkage_units': 0,
+        'shrinkage_value': Decimal('0'),
+        'surplus_units': 0,
+        'surplus_value': Decimal('0'),
+    }
+    by_product = {}
+    lines = []
+    for row in rows:
+        variance = row['adjustment'] if posted else row['variance']
+        value = variance * row['cost_price']
+        summary['counted'] += 1
+        if variance:
+            summary['with_variance'] += 1
+        if variance < 0:
+            summary['shrinkage_units'] -= variance
+            summary['shrinkage_value'] -= value
+        else:
+            summary['surplus_units'] += variance
+            summary['surplus_value'] += value
+
+        product = by_product.setdefault(row['product_id'], {
+            'product_id': row['product_id'], 'product_name': row['product__name'], 'variance': 0, 'value': Decimal('0'),
+        })
+        product['variance'] += variance
+        product['value'] += value
+
+        if variance or all_lines:
+            lines.append({
+                'variation_id': row['variation_id'],
+                'product_id': row['product_id'],
+                'product_name': row['product__name'],
+                'size': row['variation__size'],
+                'color': row['variation__color'],
+                'expected': row['expected'],
+                'moved_during_count': row['moved'],
+                'counted': row['counted'],
+                'variance': variance,
+                'cost_price': row['cost_price'],
+                'variance_value': value,
+            })
+
+    summary['uncounted'] = summary['lines'] - summary['counted']
+    summary['net_value'] = summary['surplus_value'] - summary['shrinkage_value']
+    return {
+        'id': stock_take.id,
+        'reference': stock_take.reference,
+        'status': stock_take.status,
+        'started_at': stock_take.started_at,
+        'posted_at': stock_take.posted_at,
+        'summary': summary,
+        'by_product': sorted(
+            (product for product in by_product.values() if product['variance']),
+            key=lambda product: abs(product['value']), reverse=True,
+        ),
+        'lines': sorted(lines, key=lambda line: abs(line['variance_value']), reverse=True),
+    }
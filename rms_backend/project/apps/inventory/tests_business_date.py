@@ -0,0 +1,59 @@
+from datetime import date, datetime, timezone as dt_timezone
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from decimal import Decimal
+from apps.inventory.models import Product, Category, StockMovement
+from apps.sales.models import Sale
+
+
+@override_settings(BUSINESS_TIME_ZONE='Asia/Dhaka')
+class BusinessDateTest(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name="Test Category", slug="test-category")
+        self.product = Product.objects.create(
+            name="Test Product",
+            category=self.category,
+            cost_price=Decimal("10.00"),
+            selling_price=Decimal("20.00"),
+        )
+
+    def create_sale(self, when):
+        return Sale.objects.create(
+            date=when,
+            subtotal=Decimal("20.00"),
+            tax=Decimal("0.00"),
+            total=Decimal("20.00"),
+            payment_method='cash',
+        )
+
+    def test_sale_business_date_uses_local_day(self):
+        """A sale at 20:00 UTC falls on the next day at 02:00 in Dhaka"""
+        sale = self.create_sale(datetime(2024, 1, 1, 20, 0, tzinfo=dt_timezone.utc))
+        sale.refresh_from_db()
+        self.assertEqual(sale.business_date, date(2024, 1, 2))
+        self.assertEqual(sale.business_hour, 2)
+
+    def test_sale_business_date_follows_date_updates(self):
+        """Saving with update_fields=['date'] also refreshes the business date"""
+        sale = self.create_sale(datetime(2024, 1, 1, 8, 0, tzinfo=dt_timezone.utc))
+        sale.date = datetime(2024, 3, 5, 10, 0, tzinfo=dt_timezone.utc)
+        sale.save(update_fields=['date'])
+        sale.refresh_from_db()
+        self.assertEqual(sale.business_date, date(2024, 3, 5))
+        self.assertEqual(sale.business_hour, 16)
+
+    def test_backfill_command_fills_missing_rows(self):
+        """Rows written without a business date are filled by the backfill command"""
+        sale = self.create_sale(datetime(2024, 1, 1, 20, 0, tzinfo=dt_timezone.utc))
+        movement = StockMovement.objects.create(product=self.product, movement_type='IN', quantity=5)
+        Sale.objects.filter(pk=sale.pk).update(business_date=None, business_hour=None)
+        StockMovement.objects.filter(pk=movement.pk).update(business_date=None)
+
+        call_command('backfill_business_dates', stdout=StringIO())
+
+        sale.refresh_from_db()
+        movement.refresh_from_db()
+        self.assertEqual(sale.business_date, date(2024, 1, 2))
+        self.assertEqual(sale.business_hour, 2)
+        self.assertIsNotNone(movement.business_date)
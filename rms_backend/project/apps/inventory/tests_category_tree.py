@@ -0,0 +1,83 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.inventory.models import Category, OnlineCategory, Product, ProductVariation
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'category-tree-tests'}},
+)
+class CategoryTreeTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(username='admin', password='x'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.men = Category.objects.create(name="Men", slug="men")
+            self.tops = Category.objects.create(name="Tops", slug="tops", parent=self.men)
+            self.shirts = Category.objects.create(name="Shirts", slug="shirts", parent=self.tops)
+            self.women = Category.objects.create(name="Women", slug="women")
+            for index, category in enumerate([self.men, self.shirts, self.shirts, self.women]):
+                self.create_product(f"Product {index}", category)
+
+    def create_product(self, name, category):
+        return Product.objects.create(
+            name=name, category=category, cost_price=Decimal("10.00"), selling_price=Decimal("20.00"),
+        )
+
+    def test_paths_follow_moves(self):
+        self.assertEqual(self.shirts.path, f'{self.men.id}/{self.tops.id}/{self.shirts.id}/')
+        self.assertEqual(Product.objects.filter(category__path__startswith=self.men.path).count(), 3)
+
+        self.tops.parent = self.women
+        self.tops.save()
+        self.shirts.refresh_from_db()
+        self.assertEqual(self.shirts.path, f'{self.women.id}/{self.tops.id}/{self.shirts.id}/')
+        self.assertEqual(Product.objects.filter(category__path__startswith=self.women.path).count(), 3)
+
+        self.women.parent = self.shirts
+        with self.assertRaises(ValidationError):
+            self.women.save()
+
+    def test_tree_renders_from_one_query(self):
+        self.client.get('/api/inventory/categories/')
+        # Warm cache: only the root categories are read
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/inventory/categories/')
+        men = next(node for node in response.json() if node['id'] == self.men.id)
+        self.assertEqual((men['product_count'], men['total_product_count']), (1, 3))
+        shirts = men['children'][0]['children'][0]
+        self.assertEqual((shirts['name'], shirts['product_count'], shirts['children']), ("Shirts", 2, []))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_product("Product 5", self.tops)
+        response = self.client.get('/api/inventory/categories/')
+        men = next(node for node in response.json() if node['id'] == self.men.id)
+        self.assertEqual(men['total_product_count'], 4)
+
+    def test_move_under_descendant_is_rejected(self):
+        response = self.client.patch(
+            f'/api/inventory/categories/{self.men.id}/', {'parent': self.shirts.id}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_storefront_filter_includes_every_depth(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            clothing = OnlineCategory.objects.create(name="Clothing", slug="clothing")
+            tops = OnlineCategory.objects.create(name="Tops", slug="online-tops", parent=clothing)
+            tees = OnlineCategory.objects.create(name="Tees", slug="tees", parent=tops)
+            product = self.create_product("Tee", self.shirts)
+            product.assign_to_online = True
+            product.save()
+            product.online_categories.add(tees)
+            ProductVariation.objects.create(product=product, size="M", color="White", stock=3)
+        response = self.client.get('/api/ecommerce/public/products-by-color/', {'online_category': 'clothing'})
+        self.assertEqual([row['product_id'] for row in response.json()['results']], [product.id])
+
+        tree = self.client.get('/api/inventory/online-categories/tree/').json()
+        self.assertEqual(tree[0]['total_product_count'], 1)
+        self.assertEqual(tree[0]['children'][0]['children'][0]['product_count'], 1)
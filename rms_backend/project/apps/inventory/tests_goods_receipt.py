@@ -0,0 +1,80 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.inventory.models import Category, InventoryAlert, Product, ProductVariation, StockMovement
+from apps.supplier.models import Supplier
+
+URL = '/api/inventory/stock-movements/receive/'
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class GoodsReceiptTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(username='clerk', password='x'))
+        self.supplier = Supplier.objects.create(company_name='Loom Ltd', contact_person='Rafi', phone='0170000000')
+        category = Category.objects.create(name='Shirts', slug='shirts')
+        self.product = Product.objects.create(
+            name='Oxford Shirt', barcode='8900001', category=category,
+            cost_price=Decimal('10.00'), selling_price=Decimal('20.00'), stock_quantity=0, minimum_stock=5,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.small = ProductVariation.objects.create(product=self.product, size='S', color='Blue', stock=0)
+            self.medium = ProductVariation.objects.create(product=self.product, size='M', color='Blue', stock=10)
+            self.product.stock_quantity = 10
+            self.product.save()
+
+    def receive(self, lines, **extra):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(URL, {
+                'supplier': self.supplier.id, 'reference_number': 'PO-1', 'lines': lines, **extra,
+            }, format='json')
+
+    def test_delivery_is_booked_in_one_go(self):
+        """Lines by id and by barcode update stock, movements and the product total"""
+        response = self.receive([
+            {'variation_id': self.small.id, 'quantity': 6},
+            {'barcode': '8900001', 'size': 'm', 'color': 'blue', 'quantity': 4},
+            {'variation_id': self.small.id, 'quantity': 2},
+        ])
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['total_quantity'], 12)
+
+        self.small.refresh_from_db()
+        self.medium.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual((self.small.stock, self.medium.stock, self.product.stock_quantity), (8, 14, 22))
+        movements = StockMovement.objects.filter(reference_number='PO-1', movement_type='IN')
+        self.assertEqual(sorted(movements.values_list('quantity', flat=True)), [4, 8])
+        self.assertTrue(all(movement.business_date for movement in movements))
+        # Stock recovered from 0, so the variation's OUT alert is resolved
+        self.assertTrue(InventoryAlert.objects.filter(variation=self.small, alert_type='OUT').exists())
+        self.assertFalse(InventoryAlert.objects.filter(variation=self.small, is_active=True).exists())
+
+    def test_weighted_average_cost(self):
+        """10 on hand at 10.00 plus 10 received at 16.00 averages to 13.00"""
+        response = self.receive([{'variation_id': self.small.id, 'quantity': 10, 'unit_cost': '16.00'}],
+                                update_cost_price=True)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.cost_price, Decimal('13.00'))
+
+    def test_invalid_lines_and_repeated_reference_change_nothing(self):
+        """An ambiguous barcode rejects the whole delivery; a reference can only be received once"""
+        response = self.receive([
+            {'variation_id': self.small.id, 'quantity': 5},
+            {'barcode': '8900001', 'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('1', response.json()['lines'])
+        self.small.refresh_from_db()
+        self.assertEqual(self.small.stock, 0)
+
+        self.assertEqual(self.receive([{'variation_id': self.small.id, 'quantity': 5}]).status_code, 201)
+        self.assertEqual(self.receive([{'variation_id': self.small.id, 'quantity': 5}]).status_code, 400)
+        self.small.refresh_from_db()
+        self.assertEqual(self.small.stock, 5)
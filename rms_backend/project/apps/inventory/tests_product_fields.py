@@ -0,0 +1,78 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.inventory.models import Category, Features, Gallery, Product, ProductVariation
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class ProductFieldsTest(TestCase):
+    url = '/api/inventory/products/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(username='admin', password='x'))
+        self.category = Category.objects.create(name="Shirts", slug="shirts")
+        for index in range(3):
+            self.create_product(index)
+
+    def create_product(self, index):
+        product = Product.objects.create(
+            name=f"Shirt {index}", category=self.category,
+            cost_price=Decimal("10.00"), selling_price=Decimal("20.00"),
+        )
+        ProductVariation.objects.create(product=product, size="M", color="Blue", stock=2)
+        ProductVariation.objects.create(product=product, size="L", color="Red", stock=3)
+        Gallery.objects.create(product=product, color="Blue")
+        Features.objects.create(product=product, title="Breathable")
+        return product
+
+    def get(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+
+    def test_list_is_slim_unless_expanded(self):
+        data, _ = self.get(self.url)
+        row = data['results'][0]
+        self.assertNotIn('variations', row)
+        self.assertNotIn('features', row)
+        self.assertEqual(row['first_variation_color'], "Blue")
+        self.assertEqual(row['category']['name'], "Shirts")
+
+        row = self.get(self.url, {'expand': 'variations,features'})[0]['results'][0]
+        self.assertEqual(len(row['variations']), 2)
+        self.assertEqual(row['features'][0]['title'], "Breathable")
+        self.assertNotIn('galleries', row)
+
+    def test_fields_and_omit(self):
+        row = self.get(self.url, {'fields': 'id,name,variations', 'expand': 'galleries'})[0]['results'][0]
+        self.assertEqual(set(row), {'id', 'name', 'variations', 'galleries'})
+
+        detail = self.get(f"{self.url}{row['id']}/", {'omit': 'description,features'})[0]
+        self.assertNotIn('features', detail)
+        self.assertIn('color_galleries', detail)
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        # The default table (discounts and thumbnails included) and the fully expanded one
+        requests = [{}, {'expand': 'variations,galleries,features,material_composition,who_is_this_for'}]
+
+        def count(params):
+            cache.clear()  # thumbnails are cached across requests
+            data, queries = self.get(self.url, params)
+            return len(data['results']), queries
+
+        few = [count(params) for params in requests]
+        for index in range(3, 6):
+            self.create_product(index)
+        more = [count(params) for params in requests]
+        self.assertEqual([rows for rows, _ in few], [3, 3])
+        self.assertEqual([rows for rows, _ in more], [6, 6])
+        self.assertEqual([queries for _, queries in few], [queries for _, queries in more])
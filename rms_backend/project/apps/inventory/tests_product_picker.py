@@ -0,0 +1,63 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.inventory.models import Category, Product, ProductVariation
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class ProductPickerTest(TestCase):
+    url = '/api/inventory/products/picker/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(username='cashier', password='x'))
+        category = Category.objects.create(name="Shirts", slug="shirts")
+        for index in range(30):
+            product = Product.objects.create(
+                name=f"Shirt {index:02d}", sku=f"SH-{index:03d}", category=category,
+                cost_price=Decimal("10.00"), selling_price=Decimal("20.00"),
+            )
+            ProductVariation.objects.create(product=product, size="M", color="Blue", stock=index)
+        self.polo = Product.objects.create(
+            name="Polo Classic", sku="PL-001", barcode="8901234", category=category,
+            cost_price=Decimal("10.00"), selling_price=Decimal("25.00"),
+        )
+        Product.objects.create(
+            name="Polo Retired", sku="PL-002", category=category, is_active=False,
+            cost_price=Decimal("10.00"), selling_price=Decimal("25.00"),
+        )
+
+    def test_pages_are_compact(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url, {'page_size': 10})
+        data = response.json()
+        self.assertEqual(data['count'], 31)
+        self.assertEqual(len(data['results']), 10)
+        self.assertIn('page=2', data['next'])
+        first = data['results'][0]
+        self.assertEqual(first['name'], "Polo Classic")
+        self.assertEqual(set(first), {'id', 'name', 'sku', 'barcode', 'price', 'category', 'category_id', 'stock', 'variations'})
+        self.assertEqual(data['results'][1]['variations'][0]['size'], "M")
+
+    def test_type_ahead_search(self):
+        for term in ['polo cla', 'PL-0', '89012']:
+            results = self.client.get(self.url, {'search': term}).json()['results']
+            self.assertEqual([row['name'] for row in results], ["Polo Classic"], term)
+
+    def test_etag_revalidation(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        variation = ProductVariation.objects.first()
+        variation.stock = 99
+        variation.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
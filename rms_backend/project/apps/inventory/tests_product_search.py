@@ -0,0 +1,82 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.inventory.models import Category, Product, ProductSearchDocument, ProductVariation
+from apps.inventory.search import search_products
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'search-tests'}},
+    PRODUCT_SEARCH_BACKEND='memory',
+)
+class ProductSearchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(username='cashier', password='x'))
+        with self.captureOnCommitCallbacks(execute=True):
+            shirts = Category.objects.create(name="Shirts", slug="shirts")
+            self.polo = self.create_product("Polo Classic", "PL-001", shirts, color="Navy")
+            self.oxford = self.create_product("Oxford Shirt", "OX-001", shirts, color="White")
+            self.belt = self.create_product("Leather Belt", "BL-001", None, color="Navy")
+
+    def create_product(self, name, sku, category, color):
+        product = Product.objects.create(
+            name=name, sku=sku, category=category, cost_price=Decimal("10.00"), selling_price=Decimal("20.00"),
+            assign_to_online=True,
+        )
+        ProductVariation.objects.create(product=product, size="M", color=color, stock=3)
+        return product
+
+    def test_ranked_prefix_and_typo_matches(self):
+        self.assertEqual(search_products("pol"), [self.polo.id])
+        self.assertEqual(search_products("polp classic"), [self.polo.id])
+        self.assertEqual(search_products("ox-0"), [self.oxford.id])
+        # A name match outranks a category match
+        self.assertEqual(search_products("shirt"), [self.oxford.id, self.polo.id])
+        self.assertEqual(set(search_products("navy")), {self.polo.id, self.belt.id})
+        self.assertEqual(search_products("navy shirts"), [self.polo.id])
+
+    def test_documents_follow_writes(self):
+        self.assertEqual(ProductSearchDocument.objects.count(), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.belt.name = "Canvas Belt"
+            self.belt.save()
+            ProductVariation.objects.create(product=self.oxford, size="L", color="Sky Blue", stock=1)
+        self.assertEqual(search_products("canvas"), [self.belt.id])
+        self.assertEqual(search_products("leather"), [])
+        self.assertEqual(search_products("sky"), [self.oxford.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.polo.delete()
+        self.assertEqual(search_products("polo"), [])
+
+    def test_endpoints_use_the_index(self):
+        data = self.client.get('/api/inventory/products/', {'search': 'shirt'}).json()
+        self.assertEqual([row['id'] for row in data['results']], [self.oxford.id, self.polo.id])
+
+        data = self.client.get('/api/ecommerce/public/products-by-color/', {'search': 'navy'}).json()
+        self.assertEqual({row['product_id'] for row in data['results']}, {self.polo.id, self.belt.id})
+
+    @override_settings(PRODUCT_SEARCH_LIMIT=5)
+    def test_filters_apply_before_the_limit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk = Category.objects.create(name="Bulk", slug="bulk")
+            for index in range(8):
+                product = self.create_product(f"Plain shirt {index}", f"PS-{index}", bulk, color="Grey")
+                if index:
+                    product.is_active = False
+                    product.save()
+        data = self.client.get('/api/inventory/products/', {'search': 'shirt'}).json()
+        self.assertEqual(data['count'], 10)
+        data = self.client.get('/api/inventory/products/', {'search': 'shirt', 'category': self.polo.category_id}).json()
+        self.assertEqual({row['id'] for row in data['results']}, {self.polo.id, self.oxford.id})
+        data = self.client.get('/api/inventory/products/', {'search': 'shirt', 'is_active': 'True'}).json()
+        self.assertEqual(data['count'], 3)
+
+        data = self.client.get('/api/ecommerce/public/products-by-color/', {'search': 'shirt'}).json()
+        self.assertEqual({row['product_id'] for row in data['results']} & {self.polo.id, self.oxford.id},
+                         {self.polo.id, self.oxford.id})
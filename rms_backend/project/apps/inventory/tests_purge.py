@@ -0,0 +1,103 @@
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.customer.models import Customer
+from apps.inventory.models import Category, Product
+from apps.purge import create_purge_job, run_purge_job
+from apps.sales.models import Payment, Return, ReturnItem, Sale, SaleItem, SalePayment
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class PurgeTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = APIClient()
+        category = Category.objects.create(name="Shirts", slug="shirts")
+        self.product = Product.objects.create(
+            name="Shirt", category=category, cost_price=Decimal("10.00"), selling_price=Decimal("20.00"),
+        )
+        self.customer = Customer.objects.create(first_name="Rina", phone="01700000001")
+        self.sales = [self.create_sale() for _ in range(5)]
+
+    def create_sale(self):
+        sale = Sale.objects.create(
+            customer=self.customer,
+            subtotal=Decimal("20.00"),
+            tax=Decimal("0.00"),
+            total=Decimal("20.00"),
+            payment_method='cash',
+        )
+        item = SaleItem.objects.create(
+            sale=sale, product=self.product, size="M", color="Blue", quantity=1,
+            unit_price=Decimal("20.00"), total=Decimal("20.00"),
+        )
+        SalePayment.objects.create(sale=sale, amount=Decimal("20.00"), payment_method='cash')
+        Payment.objects.create(sale=sale, amount=Decimal("20.00"), payment_method='cash')
+        return_order = Return.objects.create(sale=sale, reason="Too small", refund_amount=Decimal("20.00"))
+        ReturnItem.objects.create(return_order=return_order, sale_item=item, quantity=1, reason="Too small")
+        return sale
+
+    def test_job_resumes_in_batches_and_skips_newer_rows(self):
+        """A job interrupted after one batch picks up where it stopped and leaves later sales alone"""
+        job = create_purge_job(['sales'], batch_size=2)
+        later = self.create_sale()
+
+        job = run_purge_job(job, time_budget=0)
+        self.assertEqual(job['status'], 'running')
+        self.assertEqual(job['deleted']['sales.Sale'], 2)
+        self.assertEqual(Sale.objects.count(), 4)
+
+        # Starting the same purge again returns the unfinished job
+        job = create_purge_job(['sales'], batch_size=2)
+        job = run_purge_job(job)
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['deleted']['sales.Sale'], 5)
+        self.assertEqual(job['deleted']['sales.ReturnItem'], 5)
+        self.assertEqual(list(Sale.objects.values_list('id', flat=True)), [later.id])
+        self.assertEqual(SaleItem.objects.count(), 1)
+        self.assertEqual(Return.objects.count(), 1)
+
+    def test_bulk_delete_and_delete_all(self):
+        response = self.client.post(
+            '/api/sales/sales/bulk_delete/', {'sale_ids': [self.sales[0].id, self.sales[1].id]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['deleted_count'], 2)
+        self.assertEqual(Sale.objects.count(), 3)
+
+        response = self.client.post('/api/sales/sales/bulk_delete/', {'sale_ids': 'all'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/api/sales/sales/delete_all_sales/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['message'], 'Successfully deleted all 3 sales')
+        self.assertFalse(Sale.objects.exists())
+        self.assertFalse(Payment.objects.exists())
+        self.assertFalse(SalePayment.objects.exists())
+
+    def test_flush_customers_keeps_sales(self):
+        user = get_user_model().objects.create_user(username='owner', password='x')
+        self.client.force_authenticate(user)
+        response = self.client.delete('/api/settings/flush-database/?database_type=customers')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Customer.objects.exists())
+        self.assertEqual(Sale.objects.filter(customer__isnull=True).count(), 5)
+
+        response = self.client.get(f"/api/settings/purge-jobs/{response.data['job_id']}/")
+        self.assertEqual(response.data['status'], 'done')
+
+        response = self.client.delete('/api/settings/flush-database/?database_type=orders')
+        self.assertEqual(response.status_code, 400)
+
+    def test_purge_data_command_dry_run(self):
+        out = StringIO()
+        call_command('purge_data', 'sales', 'customers', '--dry-run', stdout=out)
+        self.assertIn('DRY RUN MODE', out.getvalue())
+        self.assertEqual(Sale.objects.count(), 5)
@@ -0,0 +1,61 @@
+from decimal import Decimal
+from django.test import TestCase, override_settings
+from apps.inventory.alerts import _flush
+from apps.inventory.models import Category, InventoryAlert, Product, ProductVariation
+
+
+@override_settings(VARIATION_LOW_STOCK_THRESHOLD=2)
+class StockAlertEngineTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Shirts", slug="shirts")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product = Product.objects.create(
+                name="Oxford Shirt",
+                category=category,
+                cost_price=Decimal("10.00"),
+                selling_price=Decimal("20.00"),
+                stock_quantity=20,
+                minimum_stock=5,
+            )
+            self.variation = ProductVariation.objects.create(product=self.product, size='M', color='Blue', stock=20)
+
+    def set_stock(self, quantity):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.variation.stock = quantity
+            self.variation.save()
+            self.product.stock_quantity = quantity
+            self.product.save()
+
+    def active(self):
+        return set(InventoryAlert.objects.filter(is_active=True).values_list('variation_id', 'alert_type'))
+
+    def test_repeated_sales_keep_one_alert_per_type(self):
+        """Selling below the minimum several times leaves a single LOW alert per product/variation"""
+        for quantity in (4, 3, 1):
+            self.set_stock(quantity)
+        self.assertEqual(self.active(), {(None, 'LOW'), (self.variation.id, 'LOW')})
+        self.assertEqual(InventoryAlert.objects.count(), 2)
+        self.assertIn('1 units remaining', InventoryAlert.objects.get(variation=None).message)
+
+    def test_out_of_stock_replaces_low_and_recovery_resolves(self):
+        """Hitting zero raises OUT (resolving LOW); restocking resolves everything"""
+        self.set_stock(1)
+        self.set_stock(0)
+        self.assertEqual(self.active(), {(None, 'OUT'), (self.variation.id, 'OUT')})
+
+        self.set_stock(50)
+        self.assertEqual(self.active(), set())
+        self.assertFalse(InventoryAlert.objects.filter(resolved_at__isnull=True).exists())
+
+    def test_rows_saved_in_one_transaction_are_evaluated_once(self):
+        """Every save in a transaction is collected into a single evaluation at commit"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.variation.stock = 0
+            self.variation.save()
+            self.product.stock_quantity = 0
+            self.product.save()
+            self.assertEqual(InventoryAlert.objects.count(), 0)
+        with self.assertNumQueries(0):
+            # Later callbacks of the same transaction find the batch already drained
+            _flush()
+        self.assertEqual(self.active(), {(None, 'OUT'), (self.variation.id, 'OUT')})
@@ -0,0 +1,118 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.inventory.models import Category, Product, ProductVariation, StockMovement
+
+URL = '/api/inventory/stock-takes/'
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class StockTakeTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(username='clerk', password='x'))
+        self.shirts = Category.objects.create(name='Shirts', slug='shirts')
+        formal = Category.objects.create(name='Formal Shirts', slug='formal-shirts', parent=self.shirts)
+        shoes = Category.objects.create(name='Shoes', slug='shoes')
+        self.product = Product.objects.create(
+            name='Oxford Shirt', barcode='8900001', category=formal,
+            cost_price=Decimal('10.00'), selling_price=Decimal('20.00'), stock_quantity=15,
+        )
+        self.small = ProductVariation.objects.create(product=self.product, size='S', color='Blue', stock=10)
+        self.medium = ProductVariation.objects.create(product=self.product, size='M', color='Blue', stock=5)
+        other = Product.objects.create(
+            name='Loafer', category=shoes, cost_price=Decimal('30.00'), selling_price=Decimal('60.00'),
+        )
+        ProductVariation.objects.create(product=other, size='42', color='Brown', stock=3)
+
+    def sell(self, variation, quantity):
+        """What a POS sale does to stock"""
+        StockMovement.objects.create(product=self.product, variation=variation, movement_type='OUT', quantity=quantity)
+        variation.stock -= quantity
+        variation.save()
+
+    def test_count_with_sales_during_the_count(self):
+        """Sales before an item is counted are not shrinkage; posting books only real variances"""
+        response = self.client.post(URL, {'category': self.shirts.id, 'name': 'Shirts Q3'}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        stock_take = response.json()
+        # Subcategories are included, other categories are not
+        self.assertEqual(stock_take['line_count'], 2)
+        detail = f"{URL}{stock_take['id']}/"
+
+        self.sell(self.small, 2)  # sold before counting: 8 left on the shelf
+        response = self.client.post(f'{detail}counts/', {'counts': [
+            {'variation_id': self.small.id, 'quantity': 8},
+            {'barcode': '8900001', 'size': 'M', 'color': 'Blue', 'quantity': 3},
+        ]}, format='json')
+        self.assertEqual(response.json(), {'updated': 2})
+        self.sell(self.medium, 1)  # sold after counting
+
+        report = self.client.get(f'{detail}report/').json()
+        self.assertEqual(report['summary']['with_variance'], 1)
+        self.assertEqual(report['summary']['shrinkage_units'], 2)
+        self.assertEqual(Decimal(str(report['summary']['shrinkage_value'])), Decimal('20.00'))
+        self.assertEqual([line['variation_id'] for line in report['lines']], [self.medium.id])
+
+        response = self.client.post(f'{detail}post/', format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.small.refresh_from_db()
+        self.medium.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual((self.small.stock, self.medium.stock, self.product.stock_quantity), (8, 2, 10))
+        adjustment = StockMovement.objects.get(movement_type='ADJ')
+        self.assertEqual((adjustment.variation_id, adjustment.quantity), (self.medium.id, -2))
+        self.assertEqual(adjustment.reference_number, f"ST-{stock_take['id']}")
+
+        # A posted count is closed
+        self.assertEqual(self.client.post(f'{detail}post/', format='json').status_code, 400)
+        self.assertEqual(self.client.post(f'{detail}counts/', {'counts': [
+            {'variation_id': self.small.id, 'quantity': 1},
+        ]}, format='json').status_code, 400)
+
+    def test_scans_accumulate_and_unknown_variations_are_rejected(self):
+        """'add' mode sums scans; variations outside the count reject the whole batch"""
+        stock_take = self.client.post(URL, {'category': self.shirts.id}, format='json').json()
+        detail = f"{URL}{stock_take['id']}/"
+        for _ in range(3):
+            self.client.post(f'{detail}counts/', {'mode': 'add', 'counts': [
+                {'variation_id': self.small.id, 'quantity': 1},
+            ]}, format='json')
+        response = self.client.post(f'{detail}counts/', {'counts': [
+            {'variation_id': self.small.id, 'quantity': 9},
+            {'variation_id': ProductVariation.objects.get(size='42').id, 'quantity': 3},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        report = self.client.get(f'{detail}report/?all_lines=true').json()
+        self.assertEqual(report['summary']['counted'], 1)
+        self.assertEqual(report['summary']['uncounted'], 1)
+        self.assertEqual(report['lines'][0]['counted'], 3)
+
+    def test_manual_adjustment_during_the_count_is_not_a_variance(self):
+        """ADJ movements change stock with their sign, so the count sees them like any other movement"""
+        stock_take = self.client.post(URL, {'category': self.shirts.id, 'name': 'Shirts Q4'}, format='json').json()
+        detail = f"{URL}{stock_take['id']}/"
+        response = self.client.post('/api/inventory/stock-movements/', {
+            'product': self.product.id, 'variation': self.small.id, 'movement_type': 'ADJ', 'quantity': -3,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.small.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual(self.small.stock, 7)
+        self.assertEqual(self.product.stock_quantity, 12)
+
+        self.client.post(f'{detail}counts/', {'counts': [
+            {'variation_id': self.small.id, 'quantity': 7},
+        ]}, format='json')
+        self.assertEqual(self.client.get(f'{detail}report/').json()['summary']['with_variance'], 0)
+
+        response = self.client.post('/api/inventory/stock-movements/', {
+            'product': self.product.id, 'variation': self.small.id, 'movement_type': 'ADJ', 'quantity': -8,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(StockMovement.objects.filter(movement_type='ADJ').count(), 1)
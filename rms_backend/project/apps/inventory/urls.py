@@ -6,6 +6,7 @@ from .views import (
     ProductViewSet,
     ProductVariationViewSet,
     StockMovementViewSet,
+    StockTakeViewSet,
     InventoryAlertViewSet,
     DashboardViewSet,
     MeterialCompositionViewSet,
@@ -21,6 +22,7 @@ router.register(r'online-categories', OnlineCategoryViewSet)
 router.register(r'products', ProductViewSet)
 router.register(r'variations', ProductVariationViewSet)
 router.register(r'stock-movements', StockMovementViewSet)
+router.register(r'stock-takes', StockTakeViewSet)
 router.register(r'alerts', InventoryAlertViewSet)
 router.register(r'dashboard', DashboardViewSet, basename='dashboard')
 router.register(r'material-composition', MeterialCompositionViewSet)
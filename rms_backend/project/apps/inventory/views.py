@@ -1,19 +1,21 @@
 from rest_framework import viewsets, filters, status, permissions, pagination
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.parsers import MultiPartParser, FormParser
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
 from django.db.models import Q, F, Sum, Count, Avg, Case, When, IntegerField
 from django.utils import timezone
 from datetime import datetime, timedelta
-from django.db.models.functions import TruncDate, TruncMonth, TruncYear
-from .models import Category, OnlineCategory, Product, ProductVariation, StockMovement, InventoryAlert, MeterialComposition, WhoIsThisFor, Features, Gallery, Image
+from django.db.models.functions import TruncMonth, TruncYear
+from .models import Category, OnlineCategory, Product, ProductVariation, StockMovement, InventoryAlert, MeterialComposition, WhoIsThisFor, Features, Gallery, Image, StockTake
 from apps.supplier.models import Supplier
 from apps.supplier.serializers import SupplierSerializer
 from .serializers import (
     CategorySerializer,
     OnlineCategorySerializer,
     ProductSerializer,
+    ProductListSerializer,
     ProductCreateSerializer,
     ProductVariationSerializer,
     ImageSerializer,
@@ -27,10 +29,23 @@ from .serializers import (
     WhoIsThisForSerializer,
     FeaturesSerializer,
     EcommerceProductSerializer,
-    EcommerceProductDetailSerializer
+    EcommerceProductDetailSerializer,
+    GoodsReceiptSerializer,
+    StockTakeSerializer,
+    StockCountBatchSerializer
 )
+from .category_tree import category_tree
+from .picker import picker_response
+from .search import search_queryset
+from .receiving import receive_goods
+from .stocktake import cancel_stock_take, open_stock_take, post_stock_take, record_counts, variance_report
 from rest_framework.exceptions import ValidationError
 from apps.sales.models import SaleItem
+from apps.reports.queries import ReportQuery
+from apps.response_cache import bump_version, conditional_response
+from apps.db_routing import ReplicaReadMixin
+from apps.json_codec import ORJSONParser
+from apps.utils import business_date_range
 
 class StandardResultsSetPagination(pagination.PageNumberPagination):
     page_size = 20
@@ -45,7 +60,8 @@ class CategoryViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        queryset = Category.objects.prefetch_related('products')
+        # Children and product counts come from the cached tree (see category_tree)
+        queryset = Category.objects.all()
         search = self.request.query_params.get('search', None)
         if search:
             queryset = queryset.filter(name__icontains=search)
@@ -94,17 +110,19 @@ class SupplierViewSet(viewsets.ModelViewSet):
 class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.all()
     pagination_class = StandardResultsSetPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # ?search= is handled by get_queryset with the product search index
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['category', 'online_category', 'supplier', 'is_active']
-    search_fields = ['name', 'sku', 'barcode', 'description']
     ordering_fields = ['name', 'created_at', 'stock_quantity', 'selling_price']
     ordering = ['-created_at']
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    parser_classes = (MultiPartParser, FormParser, ORJSONParser)
     permission_classes = [permissions.IsAuthenticated]
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return ProductCreateSerializer
+        if self.action == 'list':
+            return ProductListSerializer
         return ProductSerializer
 
     def get_serializer(self, *args, **kwargs):
@@ -121,12 +139,6 @@ class ProductViewSet(viewsets.ModelViewSet):
         is_active = self.request.query_params.get('is_active', None)
         stock_status = self.request.query_params.get('stock_status', None)
 
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) |
-                Q(sku__icontains=search) |
-                Q(description__icontains=search)
-            )
         if category:
             queryset = queryset.filter(category_id=category)
         if supplier:
@@ -140,7 +152,23 @@ class ProductViewSet(viewsets.ModelViewSet):
                 queryset = queryset.filter(stock_quantity__lte=F('minimum_stock'))
             elif stock_status == 'out':
                 queryset = queryset.filter(stock_quantity=0)
+        # Last, so the hits are taken from the filtered products
+        if search:
+            queryset = search_queryset(queryset, search)
 
+        return self.optimize_queryset(queryset)
+
+    def optimize_queryset(self, queryset):
+        """Load what the serializer will render (see apps.dynamic_fields) in a fixed number of queries"""
+        if self.action not in ['list', 'retrieve']:
+            return queryset
+        return self.get_serializer_class().optimize_queryset(queryset, self.request)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        # Search hits keep their relevance order unless the client asked for another one
+        if self.request.query_params.get('search') and not self.request.query_params.get('ordering'):
+            queryset = queryset.order_by('search_rank', 'id')
         return queryset
 
     def create(self, request, *args, **kwargs):
@@ -164,37 +192,37 @@ class ProductViewSet(viewsets.ModelViewSet):
         # Get filtered queryset (respects search, category, status, stock filters)
         queryset = self.get_queryset()
         
-        # Calculate statistics
-        total_products = queryset.count()
-        active_products = queryset.filter(is_active=True).count()
-        low_stock_products = queryset.filter(stock_quantity__lte=F('minimum_stock')).count()
-        out_of_stock_products = queryset.filter(stock_quantity=0).count()
-        
-        # Calculate total cost (cost_price * stock_quantity)
-        total_cost = queryset.aggregate(
-            total=Sum(F('cost_price') * F('stock_quantity'))
-        )['total'] or 0
-        
-        # Calculate total value (selling_price * stock_quantity)
-        total_value = queryset.aggregate(
-            total=Sum(F('selling_price') * F('stock_quantity'))
-        )['total'] or 0
-        
-        # Calculate potential profit ((selling_price - cost_price) * stock_quantity)
-        potential_profit = queryset.aggregate(
-            total=Sum((F('selling_price') - F('cost_price')) * F('stock_quantity'))
-        )['total'] or 0
+        # Calculate all statistics in a single aggregate query
+        metrics = (
+            ReportQuery(queryset)
+            .count('total_products')
+            .count('active_products', is_active=True)
+            .count('low_stock_products', stock_quantity__lte=F('minimum_stock'))
+            .count('out_of_stock_products', stock_quantity=0)
+            # total cost (cost_price * stock_quantity)
+            .sum('total_cost', F('cost_price') * F('stock_quantity'), default=0)
+            # total value (selling_price * stock_quantity)
+            .sum('total_value', F('selling_price') * F('stock_quantity'), default=0)
+            # potential profit ((selling_price - cost_price) * stock_quantity)
+            .sum('potential_profit', (F('selling_price') - F('cost_price')) * F('stock_quantity'), default=0)
+            .run()
+        )
         
         return Response({
-            'total_products': total_products,
-            'active_products': active_products,
-            'low_stock_products': low_stock_products,
-            'out_of_stock_products': out_of_stock_products,
-            'total_cost': float(total_cost),
-            'total_value': float(total_value),
-            'potential_profit': float(potential_profit),
+            'total_products': metrics['total_products'],
+            'active_products': metrics['active_products'],
+            'low_stock_products': metrics['low_stock_products'],
+            'out_of_stock_products': metrics['out_of_stock_products'],
+            'total_cost': float(metrics['total_cost']),
+            'total_value': float(metrics['total_value']),
+            'potential_profit': float(metrics['potential_profit']),
         })
 
+    @action(detail=False, methods=['get'])
+    def picker(self, request):
+        """Compact, searchable product list for POS/preorder/return forms (see picker.py)"""
+        return picker_response(request)
+
     @action(detail=False, methods=['post'])
     def bulk_price_update(self, request):
         serializer = BulkPriceUpdateSerializer(data=request.data)
@@ -399,7 +427,7 @@ class ProductViewSet(viewsets.ModelViewSet):
             
             stock_movements = StockMovement.objects.filter(
                 product=product,
-                created_at__range=[start_date, end_date]
+                business_date__range=business_date_range(start_date, end_date)
             ).order_by('created_at')
             
             sales_items = SaleItem.objects.filter(
@@ -447,12 +475,12 @@ class ProductViewSet(viewsets.ModelViewSet):
             
             month_stock_in = stock_movements.filter(
                 movement_type='IN',
-                created_at__range=[month_start, month_end]
+                business_date__range=[month_start.date(), month_end.date()]
             ).aggregate(total=Sum('quantity'))['total'] or 0
             
             month_stock_out = stock_movements.filter(
                 movement_type='OUT',
-                created_at__range=[month_start, month_end]
+                business_date__range=[month_start.date(), month_end.date()]
             ).aggregate(total=Sum('quantity'))['total'] or 0
             
             monthly_stock_data.append({
@@ -575,6 +603,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         return Response(analytics_data)
 
     @action(detail=True, methods=['get'])
+    @conditional_response(StockMovement, ProductVariation, Product)
     def stock_history(self, request, pk=None):
         """Get detailed stock movement history"""
         product = self.get_object()
@@ -595,7 +624,7 @@ class ProductViewSet(viewsets.ModelViewSet):
             
             stock_movements = StockMovement.objects.filter(
                 product=product,
-                created_at__range=[start_date, end_date]
+                business_date__range=business_date_range(start_date, end_date)
             ).order_by('-created_at')
         
         history_data = []
@@ -1055,8 +1084,11 @@ class StockMovementViewSet(viewsets.ModelViewSet):
     serializer_class = StockMovementSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    # A rejected movement must not stay on record without its stock change
+    @transaction.atomic
     def perform_create(self, serializer):
-        movement = serializer.save(created_by=self.request.user)
+        # StockMovement has no created_by field
+        movement = serializer.save()
         
         # Update variant stock if specified
         if movement.variation:
@@ -1066,6 +1098,11 @@ class StockMovementViewSet(viewsets.ModelViewSet):
                 if movement.variation.stock < movement.quantity:
                     raise ValidationError(f"Not enough stock in variation. Available: {movement.variation.stock}")
                 movement.variation.stock -= movement.quantity
+            elif movement.movement_type == 'ADJ':
+                # Signed, as in stock.SIGNED_QUANTITY (stock takes book ADJ the same way)
+                if movement.variation.stock + movement.quantity < 0:
+                    raise ValidationError(f"Not enough stock in variation. Available: {movement.variation.stock}")
+                movement.variation.stock += movement.quantity
             movement.variation.save()
         
         # Update main product stock by recalculating from all variants
@@ -1074,23 +1111,23 @@ class StockMovementViewSet(viewsets.ModelViewSet):
             total=Sum('stock')
         )['total'] or 0
         product.stock_quantity = total_variant_stock
+        # Saving the product queues the stock alert check (apps.inventory.alerts)
         product.save()
 
-        # Check for alerts
-        if product.stock_quantity <= product.minimum_stock:
-            InventoryAlert.objects.create(
-                product=product,
-                variation=movement.variation,
-                alert_type='LOW',
-                message=f'Low stock alert: {product.name} has {product.stock_quantity} units remaining'
-            )
-        elif product.stock_quantity == 0:
-            InventoryAlert.objects.create(
-                product=product,
-                variation=movement.variation,
-                alert_type='OUT',
-                message=f'Out of stock alert: {product.name} has no units remaining'
-            )
+    @action(detail=False, methods=['post'])
+    def receive(self, request):
+        """Book a whole supplier delivery (many variation lines) in one transaction"""
+        serializer = GoodsReceiptSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        receipt = receive_goods(
+            data['supplier'],
+            data['reference_number'],
+            data['lines'],
+            notes=data.get('notes', ''),
+            update_cost_price=data['update_cost_price'],
+        )
+        return Response(receipt, status=status.HTTP_201_CREATED)
 
     def get_queryset(self):
         queryset = StockMovement.objects.all()
@@ -1104,13 +1141,69 @@ class StockMovementViewSet(viewsets.ModelViewSet):
             
         return queryset
 
+class StockTakeViewSet(viewsets.ModelViewSet):
+    """Stock-take sessions: open (snapshot), stream counts, review variances, post"""
+    queryset = StockTake.objects.all()
+    serializer_class = StockTakeSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    http_method_names = ['get', 'post', 'head', 'options']
+
+    def get_queryset(self):
+        queryset = StockTake.objects.select_related('category').annotate(
+            line_count=Count('lines'),
+            counted_count=Count('lines', filter=Q(lines__counted__isnull=False)),
+        )
+        status_param = self.request.query_params.get('status', None)
+        if status_param:
+            queryset = queryset.filter(status=status_param)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        stock_take = open_stock_take(
+            category=serializer.validated_data.get('category'),
+            name=serializer.validated_data.get('name', ''),
+            notes=serializer.validated_data.get('notes', ''),
+            user=request.user,
+        )
+        stock_take = self.get_queryset().get(pk=stock_take.pk)
+        return Response(self.get_serializer(stock_take).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def counts(self, request, pk=None):
+        """Record a batch of counts (mode 'set' replaces, 'add' accumulates scans)"""
+        stock_take = self.get_object()
+        serializer = StockCountBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated = record_counts(stock_take, serializer.validated_data['counts'], serializer.validated_data['mode'])
+        return Response({'updated': updated})
+
+    @action(detail=True, methods=['get'])
+    def report(self, request, pk=None):
+        """Variance valuation report; ?all_lines=true also lists lines without variance"""
+        all_lines = request.query_params.get('all_lines', '').lower() in ('1', 'true')
+        return Response(variance_report(self.get_object(), all_lines=all_lines))
+
+    @action(detail=True, methods=['post'], url_path='post')
+    def post_adjustments(self, request, pk=None):
+        """Book all variances as adjustments in one transaction and close the count"""
+        zero_uncounted = str(request.data.get('zero_uncounted', '')).lower() in ('1', 'true')
+        stock_take = post_stock_take(self.get_object(), zero_uncounted=zero_uncounted)
+        return Response(variance_report(stock_take))
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        stock_take = cancel_stock_take(self.get_object())
+        return Response({'id': stock_take.id, 'status': stock_take.status})
+
 class InventoryAlertViewSet(viewsets.ModelViewSet):
     queryset = InventoryAlert.objects.all()
     serializer_class = InventoryAlertSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        queryset = InventoryAlert.objects.all()
+        queryset = InventoryAlert.objects.select_related('product', 'variation')
         is_active = self.request.query_params.get('active', None)
         alert_type = self.request.query_params.get('type', None)
         
@@ -1193,7 +1286,7 @@ class ImageViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(gallery__product_id=product)
         return queryset
 
-class DashboardViewSet(viewsets.ViewSet):
+class DashboardViewSet(ReplicaReadMixin, viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def _get_date_range(self, period):
@@ -1216,27 +1309,32 @@ class DashboardViewSet(viewsets.ViewSet):
         period = request.query_params.get('period', 'month')
         start_date, end_date = self._get_date_range(period)
 
-        # Basic metrics
-        total_products = Product.objects.count()
-        active_products = Product.objects.filter(is_active=True).count()
-        out_of_stock_products = Product.objects.filter(stock_quantity=0).count()
-        low_stock_products = Product.objects.filter(stock_quantity__lte=F('minimum_stock')).count()
-        
-        # Calculate total inventory value
-        total_inventory_value = Product.objects.aggregate(
-            total=Sum(F('cost_price') * F('stock_quantity'))
-        )['total'] or 0
+        # Basic metrics, stock health and total inventory value in one query
+        product_metrics = (
+            ReportQuery(Product.objects.all())
+            .count('total_products')
+            .count('active_products', is_active=True)
+            .count('out_of_stock_products', stock_quantity=0)
+            .count('low_stock_products', stock_quantity__lte=F('minimum_stock'))
+            .count('healthy_products', stock_quantity__gt=F('minimum_stock'))
+            .sum('total_inventory_value', F('cost_price') * F('stock_quantity'), default=0)
+            .run()
+        )
+        total_products = product_metrics['total_products']
+        active_products = product_metrics['active_products']
+        out_of_stock_products = product_metrics['out_of_stock_products']
+        low_stock_products = product_metrics['low_stock_products']
+        total_inventory_value = product_metrics['total_inventory_value']
 
         # Stock movement metrics
-        stock_movements = StockMovement.objects.filter(
-            created_at__range=(start_date, end_date)
+        movement_metrics = (
+            ReportQuery(StockMovement.objects.filter(business_date__range=business_date_range(start_date, end_date)))
+            .sum('stock_in', 'quantity', default=0, movement_type='IN')
+            .sum('stock_out', 'quantity', default=0, movement_type='OUT')
+            .run()
         )
-        stock_in = stock_movements.filter(movement_type='IN').aggregate(
-            total=Sum('quantity')
-        )['total'] or 0
-        stock_out = stock_movements.filter(movement_type='OUT').aggregate(
-            total=Sum('quantity')
-        )['total'] or 0
+        stock_in = movement_metrics['stock_in']
+        stock_out = movement_metrics['stock_out']
 
         # Category distribution
         category_distribution = Category.objects.annotate(
@@ -1260,7 +1358,7 @@ class DashboardViewSet(viewsets.ViewSet):
 
         # Stock health metrics
         stock_health = {
-            'healthy': Product.objects.filter(stock_quantity__gt=F('minimum_stock')).count(),
+            'healthy': product_metrics['healthy_products'],
             'low': low_stock_products,
             'out': out_of_stock_products
         }
@@ -1304,24 +1402,23 @@ class DashboardViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=['get'])
     def stock_alerts(self, request):
-        # Get low stock and out of stock products
-        low_stock_products = Product.objects.filter(
-            stock_quantity__lte=F('minimum_stock')
-        ).select_related('category', 'supplier')
-        
-        out_of_stock_products = Product.objects.filter(
-            stock_quantity=0
-        ).select_related('category', 'supplier')
-
-        # Get active alerts
-        active_alerts = InventoryAlert.objects.filter(
-            is_active=True
-        ).select_related('product', 'variation')
+        # Flat rows instead of ProductSerializer: the alert list only needs a few columns
+        product_fields = ['id', 'name', 'sku', 'stock_quantity', 'minimum_stock', 'category_name']
+        products = Product.objects.annotate(category_name=F('category__name')).order_by('stock_quantity', 'name')
+        low_stock_products = products.filter(stock_quantity__lte=F('minimum_stock')).values(*product_fields)
+        out_of_stock_products = products.filter(stock_quantity=0).values(*product_fields)
+
+        # Active alerts are kept deduplicated by apps.inventory.alerts
+        active_alerts = InventoryAlert.objects.filter(is_active=True).order_by('-created_at').values(
+            'id', 'product', 'variation', 'alert_type', 'message', 'is_active', 'created_at', 'resolved_at',
+            product_name=F('product__name'), variation_size=F('variation__size'),
+            variation_color=F('variation__color'),
+        )
 
         return Response({
-            'low_stock': ProductSerializer(low_stock_products, many=True, context={'request': request}).data,
-            'out_of_stock': ProductSerializer(out_of_stock_products, many=True, context={'request': request}).data,
-            'active_alerts': InventoryAlertSerializer(active_alerts, many=True).data
+            'low_stock': list(low_stock_products),
+            'out_of_stock': list(out_of_stock_products),
+            'active_alerts': list(active_alerts)
         })
 
     @action(detail=False, methods=['get'])
@@ -1345,9 +1442,9 @@ class DashboardViewSet(viewsets.ViewSet):
 
         # Daily stock movements
         daily_movements = StockMovement.objects.filter(
-            created_at__range=(start_date, end_date)
+            business_date__range=business_date_range(start_date, end_date)
         ).annotate(
-            date=TruncDate('created_at')
+            date=F('business_date')
         ).values('date').annotate(
             stock_in=Sum('quantity', filter=Q(movement_type='IN')),
             stock_out=Sum('quantity', filter=Q(movement_type='OUT'))
@@ -1355,7 +1452,7 @@ class DashboardViewSet(viewsets.ViewSet):
 
         # Movement by category
         category_movements = StockMovement.objects.filter(
-            created_at__range=(start_date, end_date)
+            business_date__range=business_date_range(start_date, end_date)
         ).values('product__category__name').annotate(
             stock_in=Sum('quantity', filter=Q(movement_type='IN')),
             stock_out=Sum('quantity', filter=Q(movement_type='OUT'))
@@ -1382,9 +1479,9 @@ class OnlineCategoryViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         """
         Instantiates and returns the list of permissions that this view requires.
-        For list and retrieve actions, allow public access.
+        For list, retrieve and tree actions, allow public access.
         """
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'tree']:
             permission_classes = []
         else:
             permission_classes = [permissions.IsAuthenticated]
@@ -1394,6 +1491,26 @@ class OnlineCategoryViewSet(viewsets.ModelViewSet):
         queryset = super().get_queryset()
         return queryset.select_related('parent')
     
+    @action(detail=False, methods=['get'], permission_classes=[])
+    def tree(self, request):
+        """The whole category tree, nested, with product counts per node"""
+        tree = category_tree(OnlineCategory)
+
+        def render(node_id):
+            node = tree['nodes'][node_id]
+            return {
+                'id': node['id'],
+                'name': node['name'],
+                'slug': node['slug'],
+                'order': node['order'],
+                'gender': node['gender'],
+                'product_count': node['product_count'],
+                'total_product_count': node['total_product_count'],
+                'children': [render(child_id) for child_id in node['children']],
+            }
+
+        return Response([render(root_id) for root_id in tree['roots']])
+
     @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def update_order(self, request):
         """
@@ -1419,6 +1536,8 @@ class OnlineCategoryViewSet(viewsets.ModelViewSet):
                         continue
                     
                     OnlineCategory.objects.filter(id=category_id).update(order=new_order)
+                # update() sends no signals; the cached tree follows the new order
+                transaction.on_commit(lambda: bump_version(OnlineCategory))
             
             return Response({'message': 'Order updated successfully'}, status=status.HTTP_200_OK)
         except Exception as e:
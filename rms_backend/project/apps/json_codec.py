@@ -0,0 +1,69 @@
+"""
+Project-wide JSON encoding (orjson) for API responses and request bodies.
+
+Decimal policy: every ``Decimal`` is rendered as a JSON number, whether it
+comes from a serializer ``DecimalField`` (``COERCE_DECIMAL_TO_STRING`` is off)
+or straight from an aggregate or a ``values()`` row. Views hand such data to
+``Response`` as it is; no conversion pass over the payload is needed.
+
+``values()`` querysets, sets and lazy strings are serialized directly, and
+dict keys may be ints (e.g. rows keyed by id).
+"""
+
+import datetime
+import decimal
+import orjson
+from django.db.models.query import QuerySet
+from django.utils.functional import Promise
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import JSONRenderer
+
+OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+
+def _default(obj):
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (QuerySet, set, frozenset)):
+        return list(obj)
+    if isinstance(obj, Promise):
+        return str(obj)
+    if isinstance(obj, datetime.timedelta):
+        # Same as DRF's encoder
+        return str(obj.total_seconds())
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if hasattr(obj, '__iter__'):
+        return list(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def dumps(data, indent=False):
+    """``data`` as UTF-8 JSON bytes."""
+    return orjson.dumps(data, default=_default, option=OPTIONS | (orjson.OPT_INDENT_2 if indent else 0))
+
+
+def loads(body):
+    return orjson.loads(body)
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # The browsable API asks for indented JSON
+        return dumps(data, indent=bool(self.get_indent(accepted_media_type, renderer_context or {})))
+
+
+class ORJSONParser(BaseParser):
+    media_type = 'application/json'
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
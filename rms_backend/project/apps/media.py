@@ -0,0 +1,82 @@
+"""
+Delivery of uploaded media (MEDIA_URL).
+
+Best is the web server serving MEDIA_ROOT itself, with Django not routing
+MEDIA_URL at all (``MEDIA_SERVE = False``). Otherwise ``serve_media`` only
+resolves the file and sets the headers:
+
+* ``MEDIA_SENDFILE = 'nginx'``: ``X-Accel-Redirect`` to the file under
+  ``MEDIA_ACCEL_PREFIX`` (an ``internal`` nginx location aliased to
+  MEDIA_ROOT); nginx sends the bytes.
+* ``MEDIA_SENDFILE = 'apache'``: ``X-Sendfile`` with the file's path
+  (mod_xsendfile, lighttpd, LiteSpeed).
+* neither: a ``FileResponse`` the WSGI server streams with sendfile(), with
+  the same caching headers and 304s a static file server would give.
+
+Optimized images carry a content hash in their name (``optimize_image``), so
+their URL changes whenever their bytes do and they are cached as immutable;
+other files are cached for ``MEDIA_MAX_AGE`` seconds.
+"""
+
+import mimetypes
+import os
+import re
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags, quote_etag
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+# name.<12 hex digits>.ext, possibly with the suffix storage adds to avoid a clash
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}(?:_[A-Za-z0-9]{7})?\.\w+$')
+
+
+def cache_control(path):
+    if HASHED_NAME_RE.search(path):
+        return f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return f'public, max-age={getattr(settings, "MEDIA_MAX_AGE", 24 * 60 * 60)}'
+
+
+def _resolve(path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    return full_path
+
+
+@require_safe
+def serve_media(request, path):
+    full_path = _resolve(path)
+    stat = os.stat(full_path)
+    etag = quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')) or (
+        'HTTP_IF_NONE_MATCH' not in request.META
+        and not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime)
+    ):
+        response = HttpResponseNotModified()
+    else:
+        sendfile = getattr(settings, 'MEDIA_SENDFILE', '')
+        if sendfile == 'nginx':
+            response = HttpResponse(content_type=content_type)
+            prefix = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + path.lstrip('/')
+        elif sendfile == 'apache':
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = full_path
+        else:
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(stat.st_mtime)
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control(path)
+    return response
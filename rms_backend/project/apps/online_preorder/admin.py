@@ -26,26 +26,12 @@ class OnlinePreorderAdmin(admin.ModelAdmin):
             if not product_id:
                 return "-"
 
-            from apps.inventory.models import Product, Gallery, Image
-            
-            product = Product.objects.get(id=product_id)
-            
-            # Logic: "primary photo of first variant of that product"
-            image_url = None
-            
-            # 1. Try first variant's primary photo
-            first_variant = product.variations.first()
-            if first_variant:
-                gallery = Gallery.objects.filter(product=product, color=first_variant.color).first()
-                if gallery:
-                    primary_img = Image.objects.filter(gallery=gallery, imageType='PRIMARY').first()
-                    if primary_img and primary_img.image:
-                        image_url = primary_img.image.url
-            
-            # 2. Fallback to main product image
-            if not image_url and product.image:
-                image_url = product.image.url
-                
+            from apps.ecommerce.thumbnails import product_thumbnails
+
+            # Primary photo of the first variant, or the product image (cached)
+            thumbnail = product_thumbnails([int(product_id)]).get(int(product_id))
+            image_url = thumbnail['image'] if thumbnail else None
+
             if image_url:
                 from django.utils.html import mark_safe
                 return mark_safe(f'<img src="{image_url}" width="50" height="50" style="object-fit: cover; border-radius: 4px;" />')
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from decimal import Decimal
+from apps.ecommerce.thumbnails import absolute_url, page_thumbnails
 from .models import (
     OnlinePreorder,
     OnlinePreorderVerification,
@@ -133,7 +134,7 @@ class OnlinePreorderCreateSerializer(serializers.ModelSerializer):
 
         try:
             # Try to find existing customer
-            customer = Customer.objects.get(phone=customer_phone)
+            customer = Customer.objects.get_by_phone(customer_phone)
             
             # Update customer info
             if first_name:
@@ -180,7 +181,7 @@ class OnlinePreorderCreateSerializer(serializers.ModelSerializer):
                 )
             except IntegrityError:
                 # Race condition: created by another request?
-                customer = Customer.objects.get(phone=customer_phone)
+                customer = Customer.objects.get_by_phone(customer_phone)
 
         # Note: OnlinePreorder model does not have a ForeignKey to Customer, 
         # so we don't assign it to validated_data. 
@@ -230,7 +231,7 @@ class OnlinePreorderCreateSerializer(serializers.ModelSerializer):
 
         # Update or create customer
         try:
-            customer = Customer.objects.get(phone=customer_phone)
+            customer = Customer.objects.get_by_phone(customer_phone)
             
             # Update customer info
             if first_name:
@@ -284,47 +285,31 @@ class OnlinePreorderSerializer(serializers.ModelSerializer):
         ret = super().to_representation(instance)
         items = ret.get('items', [])
         if isinstance(items, list):
-            enriched_items = []
-            from apps.inventory.models import Product
+            # Names and "primary photo of first variant" of every product on the page, loaded once
+            thumbnails = page_thumbnails(self, instance, _item_product_ids)
+            request = self.context.get('request')
             for item in items:
-                pid = item.get('product_id')
-                if pid:
-                    try:
-                        product = Product.objects.get(id=pid)
-                        item['product_name'] = product.name
-                        
-                        # Logic: "primary photo of first variant of that product"
-                        image_url = None
-                        
-                        from apps.inventory.models import Gallery, Image
-                        
-                        # 1. Try first variant's primary photo
-                        first_variant = product.variations.first()
-                        if first_variant:
-                            gallery = Gallery.objects.filter(product=product, color=first_variant.color).first()
-                            if gallery:
-                                primary_img = Image.objects.filter(gallery=gallery, imageType='PRIMARY').first()
-                                if primary_img and primary_img.image:
-                                    image_url = primary_img.image.url
-                        
-                        # 2. Fallback to main product image
-                        if not image_url and product.image:
-                            image_url = product.image.url
-
-                        if image_url:
-                            request = self.context.get('request')
-                            if request:
-                                item['product_image'] = request.build_absolute_uri(image_url)
-                            else:
-                                item['product_image'] = image_url
-
-                    except Product.DoesNotExist:
-                        pass
-                enriched_items.append(item)
-            ret['items'] = enriched_items
+                thumbnail = thumbnails.get(_product_id(item))
+                if thumbnail:
+                    item['product_name'] = thumbnail['name']
+                    if thumbnail['image']:
+                        item['product_image'] = absolute_url(request, thumbnail['image'])
+            ret['items'] = items
         return ret
 
 
+def _product_id(item):
+    try:
+        return int(item.get('product_id'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _item_product_ids(order):
+    items = order.items if isinstance(order.items, list) else []
+    return {product_id for product_id in map(_product_id, items) if product_id}
+
+
 class OnlinePreorderVerificationItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OnlinePreorderVerificationItem
@@ -2,7 +2,7 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.db.models import Sum, Count
+from django.db.models import Count
 from django.utils import timezone
 from datetime import timedelta
 from .models import PreorderProduct, PreorderVariation, Preorder
@@ -11,7 +11,7 @@ from .serializers import (
     PreorderVariationSerializer, PreorderSerializer, PreorderCreateSerializer,
     PreorderDashboardSerializer
 )
-from apps.inventory.models import Product
+from apps.reports.queries import ReportQuery
 
 
 class PreorderProductViewSet(viewsets.ModelViewSet):
@@ -102,28 +102,20 @@ class PreorderViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def dashboard(self, request):
         """Get dashboard statistics"""
-        total_orders = Preorder.objects.count()
-        total_revenue = Preorder.objects.filter(status='COMPLETED').aggregate(total=Sum('total_amount'))['total'] or 0
-        pending_orders = Preorder.objects.filter(status__in=['PENDING', 'CONFIRMED', 'DEPOSIT_PAID']).count()
-        completed_orders = Preorder.objects.filter(status='COMPLETED').count()
-        
-        # Recent orders (last 7 days)
         week_ago = timezone.now() - timedelta(days=7)
-        recent_orders = Preorder.objects.filter(created_at__gte=week_ago).count()
-        
-        # Status breakdown
-        status_breakdown = {}
-        for status_choice in Preorder.STATUS_CHOICES:
-            status_breakdown[status_choice[0]] = Preorder.objects.filter(status=status_choice[0]).count()
+        metrics = (
+            ReportQuery(Preorder.objects.all())
+            .count('total_orders')
+            .sum('total_revenue', 'total_amount', default=0, status='COMPLETED')
+            .count('pending_orders', status__in=['PENDING', 'CONFIRMED', 'DEPOSIT_PAID'])
+            .count('completed_orders', status='COMPLETED')
+            # Recent orders (last 7 days)
+            .count('recent_orders', created_at__gte=week_ago)
+            .breakdown('status_breakdown', Preorder.STATUS_CHOICES)
+            .run()
+        )
         
-        return Response({
-            'total_orders': total_orders,
-            'total_revenue': total_revenue,
-            'pending_orders': pending_orders,
-            'completed_orders': completed_orders,
-            'recent_orders': recent_orders,
-            'status_breakdown': status_breakdown
-        })
+        return Response(metrics)
     
     @action(detail=True, methods=['post'])
     def complete(self, request, pk=None):
@@ -203,8 +195,6 @@ class PreorderViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def available_products(self, request):
-        """Get all available products for preorders"""
-        products = Product.objects.filter(is_active=True)
-        from apps.inventory.serializers import ProductSerializer
-        serializer = ProductSerializer(products, many=True)
-        return Response(serializer.data) 
\ No newline at end of file
+        """Active products for the preorder form: the paginated, searchable product picker"""
+        from apps.inventory.picker import picker_response
+        return picker_response(request) 
\ No newline at end of file
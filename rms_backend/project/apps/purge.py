@@ -0,0 +1,336 @@
+"""
+Chunked, resumable purges of large data sets.
+
+``Model.objects.all().delete()`` makes Django's collector load every related
+row into memory, fire per-object signals and hold one transaction (and its
+locks) for the whole run. A purge job instead walks the root table in
+primary-key batches; each batch is one short transaction that deletes the
+dependent rows with plain ``DELETE ... WHERE fk IN (...)`` statements in
+dependency order, then the roots.
+
+Jobs only touch rows up to the highest primary key that existed when they
+started, and their progress lives in the shared cache, so an interrupted job
+is resumed by starting it again (or with ``purge_data --resume``). Files of
+deleted rows are removed afterwards by a background thread.
+"""
+
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connection, connections, transaction
+from django.db.models import FileField, Max
+from django.utils import timezone
+from apps.response_cache import bump_versions_on_commit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+# A running job that has not reported progress for this long is considered dead
+STALE_AFTER = 120
+JOB_TIMEOUT = 7 * 24 * 60 * 60
+
+PURGE_TARGETS = ('sales', 'customers', 'expenses', 'reports')
+
+
+def _plans():
+    """Per target: the root model and its dependents in deletion order."""
+    from apps.customer.models import Customer
+    from apps.expenses.models import Expense
+    from apps.online_preorder.models import OnlineConversion
+    from apps.reports.models import Report, ReportDataPoint, ReportMetric, SavedReport
+    from apps.sales.models import DuePayment, Payment, Return, ReturnItem, Sale, SaleItem, SalePayment
+
+    # (model, lookup of the root id, field to null instead of deleting)
+    return {
+        'sales': (Sale, [
+            (ReturnItem, 'return_order__sale_id', None),
+            (ReturnItem, 'sale_item__sale_id', None),
+            (Return, 'sale_id', None),
+            (SaleItem, 'sale_id', None),
+            (SalePayment, 'sale_id', None),
+            (Payment, 'sale_id', None),
+            (DuePayment, 'sale_id', None),
+            (OnlineConversion, 'sale_id', 'sale'),
+        ]),
+        'customers': (Customer, [
+            (Sale, 'customer_id', 'customer'),
+        ]),
+        'expenses': (Expense, []),
+        'reports': (Report, [
+            (ReportMetric, 'report_id', None),
+            (ReportDataPoint, 'report_id', None),
+            (SavedReport, 'report_id', None),
+        ]),
+    }
+
+
+# Background media deletion
+
+_media_queue = queue.Queue()
+_media_worker = None
+_media_lock = threading.Lock()
+
+
+def _delete_media_worker():
+    while True:
+        kind, name = _media_queue.get()
+        try:
+            if kind == 'dir':
+                shutil.rmtree(os.path.join(settings.MEDIA_ROOT, name), ignore_errors=True)
+            else:
+                default_storage.delete(name)
+        except Exception:
+            logger.exception('Could not delete media %s', name)
+        finally:
+            _media_queue.task_done()
+
+
+def delete_media_later(files=(), directories=()):
+    """
+    Remove media files (storage names) and directories (relative to
+    MEDIA_ROOT) in a background thread once the current transaction commits.
+    """
+    items = [('file', name) for name in files if name] + [('dir', name) for name in directories if name]
+    if items:
+        transaction.on_commit(lambda: _enqueue_media(items))
+
+
+def _enqueue_media(items):
+    global _media_worker
+    with _media_lock:
+        if _media_worker is None or not _media_worker.is_alive():
+            _media_worker = threading.Thread(target=_delete_media_worker, name='media-cleanup', daemon=True)
+            _media_worker.start()
+    for item in items:
+        _media_queue.put(item)
+
+
+def wait_for_media_deletion():
+    """Block until queued media deletions are done (management commands, tests)."""
+    _media_queue.join()
+
+
+# Jobs
+
+def _job_key(job_id):
+    return f'rms:purge:{job_id}'
+
+
+def _active_key(targets, ids):
+    scope = 'selected' if ids else 'all'
+    return f"rms:purge:active:{'+'.join(targets)}:{scope}"
+
+
+def get_purge_job(job_id):
+    return cache.get(_job_key(job_id))
+
+
+def _save(job):
+    job['updated_at'] = time.time()
+    cache.set(_job_key(job['id']), job, JOB_TIMEOUT)
+
+
+def _is_stale(job):
+    return job['status'] == 'running' and time.time() - job['updated_at'] > STALE_AFTER
+
+
+def create_purge_job(targets, ids=None, batch_size=DEFAULT_BATCH_SIZE, reset_sequences=False):
+    """
+    Create a job for ``targets`` (in order), or return the unfinished one.
+
+    ``ids`` restricts a single-target job to those root primary keys.
+    """
+    unknown = set(targets) - set(PURGE_TARGETS)
+    if unknown:
+        raise ValueError(f"Unknown purge target(s): {', '.join(sorted(unknown))}")
+    plans = _plans()
+    active_key = _active_key(targets, ids)
+    job = get_purge_job(cache.get(active_key) or '')
+    if job and job['status'] != 'done' and not ids:
+        return job
+
+    job = {
+        'id': uuid.uuid4().hex,
+        'targets': list(targets),
+        'ids': sorted(set(ids)) if ids else None,
+        'batch_size': batch_size,
+        'reset_sequences': reset_sequences,
+        'status': 'pending',
+        'current': 0,
+        'deleted': {},
+        'total': 0,
+        # Rows created after the job starts are never touched
+        'cutoffs': {
+            target: plans[target][0].objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0 for target in targets
+        },
+        'created_at': timezone.now().isoformat(),
+        'error': None,
+    }
+    job['total'] = sum(_remaining(plans[target][0], job, target) for target in targets)
+    _save(job)
+    cache.set(active_key, job['id'], JOB_TIMEOUT)
+    return job
+
+
+def purge_counts(targets):
+    """Root rows each target would delete right now."""
+    plans = _plans()
+    return {target: plans[target][0].objects.count() for target in targets}
+
+
+def _roots(root, job, target):
+    queryset = root.objects.filter(pk__lte=job['cutoffs'][target])
+    if job['ids']:
+        queryset = queryset.filter(pk__in=job['ids'])
+    return queryset
+
+
+def _remaining(root, job, target):
+    return _roots(root, job, target).count()
+
+
+def _file_names(model, ids, lookup):
+    fields = [field.name for field in model._meta.concrete_fields if isinstance(field, FileField)]
+    if not fields:
+        return []
+    return [name for row in model.objects.filter(**{f'{lookup}__in': ids}).values_list(*fields) for name in row if name]
+
+
+def _purge_batch(root, steps, ids):
+    """Delete one batch of roots and their dependents; returns rows deleted per model."""
+    deleted = {}
+    media = []
+    with transaction.atomic():
+        for model, lookup, null_field in steps:
+            queryset = model.objects.filter(**{f'{lookup}__in': ids})
+            label = model._meta.label
+            if null_field:
+                queryset.update(**{null_field: None})
+                continue
+            media += _file_names(model, ids, lookup)
+            # Plain DELETE: no collector, no per-object signals
+            deleted[label] = deleted.get(label, 0) + queryset._raw_delete(queryset.db)
+        media += _file_names(root, ids, 'pk')
+        queryset = root.objects.filter(pk__in=ids)
+        deleted[root._meta.label] = queryset._raw_delete(queryset.db)
+        delete_media_later(files=media)
+        bump_versions_on_commit(root, *[model for model, _, _ in steps])
+    return deleted
+
+
+def _reset_sequence(model):
+    if connection.vendor == 'mysql' and not model.objects.exists():
+        with connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {connection.ops.quote_name(model._meta.db_table)} AUTO_INCREMENT = 1')
+
+
+def run_purge_job(job, time_budget=None, progress=None):
+    """
+    Work on ``job`` until it is done or ``time_budget`` seconds have passed.
+
+    ``progress(job)`` is called after every batch. Returns the job state.
+    """
+    plans = _plans()
+    started = time.monotonic()
+    job['status'] = 'running'
+    _save(job)
+    try:
+        while job['current'] < len(job['targets']):
+            target = job['targets'][job['current']]
+            root, steps = plans[target]
+            ids = list(_roots(root, job, target).order_by('pk').values_list('pk', flat=True)[:job['batch_size']])
+            if not ids:
+                if job['reset_sequences']:
+                    _reset_sequence(root)
+                job['current'] += 1
+                _save(job)
+                continue
+
+            for label, count in _purge_batch(root, steps, ids).items():
+                job['deleted'][label] = job['deleted'].get(label, 0) + count
+            _save(job)
+            if progress:
+                progress(job)
+            if time_budget is not None and time.monotonic() - started >= time_budget:
+                return job
+
+        job['status'] = 'done'
+    except Exception as exc:
+        logger.exception('Purge job %s failed', job['id'])
+        job['status'] = 'failed'
+        job['error'] = str(exc)
+    _save(job)
+    return job
+
+
+def _run_in_background(job_id):
+    try:
+        job = get_purge_job(job_id)
+        if job:
+            run_purge_job(job)
+    finally:
+        connections.close_all()
+
+
+def purge(targets, ids=None, batch_size=DEFAULT_BATCH_SIZE, reset_sequences=False, time_budget=None):
+    """
+    Start (or resume) a purge and work on it in this request for up to
+    ``time_budget`` seconds (``settings.PURGE_SYNC_SECONDS``); whatever is
+    left continues in a background thread. Returns the job state.
+    """
+    if time_budget is None:
+        time_budget = getattr(settings, 'PURGE_SYNC_SECONDS', 20)
+    job = create_purge_job(targets, ids=ids, batch_size=batch_size, reset_sequences=reset_sequences)
+    if job['status'] == 'running' and not _is_stale(job):
+        # Another worker is on it
+        return job
+    job = run_purge_job(job, time_budget=time_budget)
+    if job['status'] == 'running':
+        threading.Thread(target=_run_in_background, args=(job['id'],), name=f"purge-{job['id']}", daemon=True).start()
+    return job
+
+
+def job_summary(job):
+    """Public view of a job state for API responses."""
+    deleted_roots = sum(
+        job['deleted'].get(label, 0) for label in {
+            _plans()[target][0]._meta.label for target in job['targets']
+        }
+    )
+    return {
+        'job_id': job['id'],
+        'status': 'stalled' if _is_stale(job) else job['status'],
+        'targets': job['targets'],
+        'total': job['total'],
+        'deleted_count': deleted_roots,
+        'deleted': job['deleted'],
+        'error': job['error'],
+    }
+
+
+def purge_response(job, done_message):
+    """
+    DRF response for a purge started from an API view: 200 with
+    ``done_message`` (formatted with ``count``) when it finished in the
+    request, 202 while it continues in the background.
+    """
+    from rest_framework import status
+    from rest_framework.response import Response
+
+    summary = job_summary(job)
+    if job['status'] == 'done':
+        return Response({'message': done_message.format(count=summary['deleted_count']), **summary})
+    if job['status'] == 'failed':
+        return Response({'error': job['error'], **summary}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return Response({
+        'message': 'Deletion continues in the background',
+        'progress_url': f"/api/settings/purge-jobs/{job['id']}/",
+        **summary,
+    }, status=status.HTTP_202_ACCEPTED)
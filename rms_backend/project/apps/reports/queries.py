@@ -0,0 +1,88 @@
+"""
+Report query builder.
+
+Report and dashboard endpoints used to call ``.aggregate()`` on the same
+queryset several times in a row and to count each status choice in its own
+query. ``ReportQuery`` collects every metric requested for a base queryset and
+resolves them in a single SQL aggregate, using conditional ``filter=``
+aggregates for subsets and status breakdowns.
+
+Example::
+
+    metrics = (
+        ReportQuery(Preorder.objects.filter(created_at__range=[date_from, date_to]))
+        .count('total_orders')
+        .sum('completed_revenue', 'total_amount', status='COMPLETED')
+        .breakdown('status_breakdown', Preorder.STATUS_CHOICES)
+        .run()
+    )
+"""
+
+from decimal import Decimal
+from django.db.models import Avg, Count, Q, Sum
+
+
+class ReportQuery:
+    """Collects named aggregates for a base queryset and runs them in one query."""
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+        self._aggregates = {}
+        self._defaults = {}
+        self._breakdowns = {}
+
+    @staticmethod
+    def _condition(condition, filters):
+        if filters:
+            condition = (condition & Q(**filters)) if condition is not None else Q(**filters)
+        return condition
+
+    def add(self, name, aggregate, default=None):
+        """Register an arbitrary aggregate expression under ``name``."""
+        self._aggregates[name] = aggregate
+        self._defaults[name] = default
+        return self
+
+    def sum(self, name, expression, condition=None, default=Decimal('0.00'), **filters):
+        """``SUM(expression)``, optionally restricted to rows matching ``condition``/``filters``."""
+        condition = self._condition(condition, filters)
+        return self.add(name, Sum(expression, filter=condition), default)
+
+    def count(self, name, expression='id', condition=None, distinct=False, **filters):
+        """``COUNT(expression)``, optionally restricted to rows matching ``condition``/``filters``."""
+        condition = self._condition(condition, filters)
+        return self.add(name, Count(expression, filter=condition, distinct=distinct), 0)
+
+    def avg(self, name, expression, condition=None, default=Decimal('0.00'), **filters):
+        """``AVG(expression)``, optionally restricted to rows matching ``condition``/``filters``."""
+        condition = self._condition(condition, filters)
+        return self.add(name, Avg(expression, filter=condition), default)
+
+    def breakdown(self, name, choices, field='status'):
+        """
+        Count rows per value of ``field``.
+
+        ``choices`` accepts model ``choices`` tuples or plain values. The result
+        is returned as ``{value: count}`` under ``name``.
+        """
+        keys = []
+        for index, choice in enumerate(choices):
+            value = choice[0] if isinstance(choice, (list, tuple)) else choice
+            key = f'{name}_{index}'
+            self.add(key, Count('id', filter=Q(**{field: value})), 0)
+            keys.append((key, value))
+        self._breakdowns[name] = keys
+        return self
+
+    def run(self):
+        """Execute the aggregate and return a dict of metric name -> value."""
+        if not self._aggregates:
+            return {}
+        raw = self.queryset.aggregate(**self._aggregates)
+        result = {
+            name: self._defaults[name] if value is None else value
+            for name, value in raw.items()
+        }
+        for name, keys in self._breakdowns.items():
+            result[name] = {value: result.pop(key) for key, value in keys}
+        return result
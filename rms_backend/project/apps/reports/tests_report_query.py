@@ -0,0 +1,49 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from decimal import Decimal
+from apps.preorder.models import Preorder
+from apps.reports.queries import ReportQuery
+
+
+class ReportQueryTest(TestCase):
+    def setUp(self):
+        for status_value, amount in [('PENDING', '100.00'), ('COMPLETED', '250.00'), ('COMPLETED', '50.00')]:
+            Preorder.objects.create(
+                customer_name="Test Customer",
+                customer_phone="01700000000",
+                total_amount=Decimal(amount),
+                status=status_value,
+            )
+
+    def test_metrics_resolve_in_single_query(self):
+        """All requested metrics, including the status breakdown, come from one aggregate"""
+        with CaptureQueriesContext(connection) as ctx:
+            metrics = (
+                ReportQuery(Preorder.objects.all())
+                .count('total_orders')
+                .count('completed_orders', status='COMPLETED')
+                .sum('completed_revenue', 'total_amount', status='COMPLETED')
+                .breakdown('status_breakdown', Preorder.STATUS_CHOICES)
+                .run()
+            )
+
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(metrics['total_orders'], 3)
+        self.assertEqual(metrics['completed_orders'], 2)
+        self.assertEqual(metrics['completed_revenue'], Decimal('300.00'))
+        self.assertEqual(metrics['status_breakdown']['PENDING'], 1)
+        self.assertEqual(metrics['status_breakdown']['COMPLETED'], 2)
+        self.assertEqual(metrics['status_breakdown']['CANCELLED'], 0)
+
+    def test_empty_queryset_uses_defaults(self):
+        """Sums over no rows fall back to their defaults instead of None"""
+        metrics = (
+            ReportQuery(Preorder.objects.filter(status='CANCELLED'))
+            .sum('revenue', 'total_amount')
+            .sum('profit', 'profit', default=0)
+            .run()
+        )
+
+        self.assertEqual(metrics['revenue'], Decimal('0.00'))
+        self.assertEqual(metrics['profit'], 0)
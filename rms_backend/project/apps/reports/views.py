@@ -3,8 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db.models import Sum, Count, Avg, F, Q, DecimalField, Max, OuterRef, Subquery, Case, When, Value, CharField, DateField
 from django.db.models.functions import Coalesce, Cast, TruncDate
-from django.utils import timezone
-from datetime import timedelta, datetime, time
+from datetime import timedelta, datetime
 from decimal import Decimal
 from .models import Report, ReportMetric, ReportDataPoint, SavedReport
 from .serializers import (
@@ -17,17 +16,34 @@ from .serializers import (
 from apps.sales.models import Sale, SaleItem
 from apps.expenses.models import Expense, ExpenseCategory
 from apps.inventory.models import Product, Category, StockMovement
+from apps.inventory.snapshots import turnover_report, valuation_by_category, valuation_series
 from apps.customer.models import Customer
 from apps.preorder.models import Preorder, PreorderProduct
 from apps.online_preorder.models import OnlinePreorder
+from .queries import ReportQuery
+from apps.utils import business_timezone, business_datetime_range
+from apps.db_routing import ReplicaReadMixin
+from apps.response_cache import conditional_response
 import logging
 
 logger = logging.getLogger(__name__)
 
-class ReportViewSet(viewsets.ModelViewSet):
+class ReportViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Report.objects.all()
     serializer_class = ReportSerializer
 
+    def _preorder_metrics(self, date_from, date_to):
+        """Preorder totals and status breakdown for the period in a single query."""
+        # Only count revenue and profit for COMPLETED preorders
+        return (
+            ReportQuery(Preorder.objects.filter(created_at__range=[date_from, date_to]))
+            .count('preorder_total_orders', status='COMPLETED')
+            .sum('preorder_total_revenue', 'total_amount', status='COMPLETED')
+            .sum('preorder_profit', 'profit', status='COMPLETED')
+            .breakdown('preorder_status_breakdown', Preorder.STATUS_CHOICES)
+            .run()
+        )
+
     def _get_date_range(self, request):
         date_from_str = request.query_params.get('date_from')
         date_to_str = request.query_params.get('date_to')
@@ -36,8 +52,12 @@ class ReportViewSet(viewsets.ModelViewSet):
             return None, None, Response({"error": "date_from and date_to parameters are required."}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            date_from = timezone.make_aware(datetime.strptime(date_from_str, '%Y-%m-%d'))
-            date_to = timezone.make_aware(datetime.combine(datetime.strptime(date_to_str, '%Y-%m-%d'), time.max))
+            # Bounds of the requested business days in the shop's time zone;
+            # use .date() for the indexed business_date/DateField columns
+            date_from, date_to = business_datetime_range(
+                datetime.strptime(date_from_str, '%Y-%m-%d').date(),
+                datetime.strptime(date_to_str, '%Y-%m-%d').date(),
+            )
         except ValueError:
             return None, None, Response({"error": "Invalid date format. Use YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -50,32 +70,30 @@ class ReportViewSet(viewsets.ModelViewSet):
             return error
 
         # Sales data
-        sales = Sale.objects.filter(date__range=[date_from, date_to], status='completed')
-        total_sales = sales.aggregate(total=Sum('total'))['total'] or Decimal('0.00')
-        total_orders = sales.count()
+        sales = Sale.objects.filter(business_date__range=[date_from.date(), date_to.date()], status='completed')
+        sales_metrics = (
+            ReportQuery(sales)
+            .sum('total_sales', 'total')
+            .count('total_orders')
+            .sum('total_profit', 'total_profit')
+            .run()
+        )
+        total_sales = sales_metrics['total_sales']
+        total_orders = sales_metrics['total_orders']
         
         # Expense data
-        expenses = Expense.objects.filter(date__range=[date_from, date_to], status='APPROVED')
-        total_expenses = expenses.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        expenses = Expense.objects.filter(date__range=[date_from.date(), date_to.date()], status='APPROVED')
+        total_expenses = ReportQuery(expenses).sum('total', 'amount').run()['total']
 
         # Profit & Loss data
-        total_profit = sales.aggregate(total=Sum('total_profit'))['total'] or Decimal('0.00')
-        net_profit = total_profit # Simplified for overview
+        net_profit = sales_metrics['total_profit'] # Simplified for overview
         profit_margin = (net_profit / total_sales * 100) if total_sales > 0 else Decimal('0.00')
 
         # Preorder analysis
-        preorders = Preorder.objects.filter(created_at__range=[date_from, date_to])
-        preorder_status_breakdown = {}
-        for status_choice in Preorder.STATUS_CHOICES:
-            preorder_status_breakdown[status_choice[0]] = preorders.filter(status=status_choice[0]).count()
-        # Only count revenue and profit for COMPLETED preorders
-        completed_preorders = preorders.filter(status='COMPLETED')
-        preorder_total_orders = completed_preorders.count()
-        preorder_total_revenue = completed_preorders.aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
-        preorder_profit = completed_preorders.aggregate(total=Sum('profit'))['total'] or Decimal('0.00')
+        preorder_metrics = self._preorder_metrics(date_from, date_to)
 
         # Data for charts
-        sales_by_date = sales.values('date__date').annotate(date=F('date__date'), total=Sum('total')).order_by('date')
+        sales_by_date = sales.values('business_date').annotate(date=F('business_date'), total=Sum('total')).order_by('business_date')
         expenses_by_date = expenses.values('date').annotate(total=Sum('amount')).order_by('date')
 
         data = {
@@ -87,10 +105,7 @@ class ReportViewSet(viewsets.ModelViewSet):
             "sales_by_date": list(sales_by_date),
             "expenses_by_date": list(expenses_by_date),
             # Preorder analytics
-            "preorder_total_orders": preorder_total_orders,
-            "preorder_total_revenue": preorder_total_revenue,
-            "preorder_profit": preorder_profit,
-            "preorder_status_breakdown": preorder_status_breakdown,
+            **preorder_metrics,
         }
         
         return Response(data)
@@ -102,23 +117,27 @@ class ReportViewSet(viewsets.ModelViewSet):
             return error
         
         sales = Sale.objects.filter(
-            date__range=[date_from, date_to],
+            business_date__range=[date_from.date(), date_to.date()],
             status='completed'
         )
 
-        total_sales = sales.aggregate(total=Sum('total'))['total'] or Decimal('0.00')
-        total_orders = sales.count()
-        total_items_sold = sales.aggregate(total_items=Sum('items__quantity'))['total_items'] or 0
+        sales_metrics = ReportQuery(sales).sum('total_sales', 'total').count('total_orders').run()
+        total_sales = sales_metrics['total_sales']
+        total_orders = sales_metrics['total_orders']
+        # Summed over SaleItem so the join does not inflate the sale totals above
+        total_items_sold = ReportQuery(
+            SaleItem.objects.filter(sale__in=sales)
+        ).sum('total_items', 'quantity', default=0).run()['total_items']
 
         average_order_value = total_sales / total_orders if total_orders > 0 else Decimal('0.00')
         average_item_price = total_sales / total_items_sold if total_items_sold > 0 else Decimal('0.00')
 
         # Sales by date
-        sales_by_date = sales.values('date__date').annotate(
-            date=F('date__date'),
+        sales_by_date = sales.values('business_date').annotate(
+            date=F('business_date'),
             total=Sum('total'),
             items_count=Sum('items__quantity')
-        ).order_by('date__date')
+        ).order_by('business_date')
 
         # Sales by category
         sales_by_category = SaleItem.objects.filter(
@@ -178,11 +197,11 @@ class ReportViewSet(viewsets.ModelViewSet):
             return error
 
         expenses = Expense.objects.filter(
-            date__range=[date_from, date_to],
+            date__range=[date_from.date(), date_to.date()],
             status='APPROVED'
         )
 
-        total_expenses = expenses.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        total_expenses = ReportQuery(expenses).sum('total', 'amount').run()['total']
 
         # Expenses by category
         expenses_by_category = expenses.values(
@@ -219,10 +238,14 @@ class ReportViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def inventory(self, request):
         products = Product.objects.all()
-        total_products = products.count()
-        total_stock_value = products.aggregate(
-            total=Sum(F('stock_quantity') * F('selling_price'))
-        )['total'] or Decimal('0.00')
+        product_metrics = (
+            ReportQuery(products)
+            .count('total_products')
+            .sum('total_stock_value', F('stock_quantity') * F('selling_price'))
+            .run()
+        )
+        total_products = product_metrics['total_products']
+        total_stock_value = product_metrics['total_stock_value']
 
         # Low stock items
         low_stock_items = products.filter(
@@ -247,12 +270,12 @@ class ReportViewSet(viewsets.ModelViewSet):
 
         # Stock movements
         stock_movements = StockMovement.objects.values(
-            'created_at__date', 'movement_type'
+            'business_date', 'movement_type'
         ).annotate(
-            date=F('created_at__date'),
+            date=F('business_date'),
             total_quantity=Sum('quantity'),
             total_value=Sum(F('quantity') * F('product__cost_price'))
-        ).order_by('-created_at__date')[:30]
+        ).order_by('-business_date')[:30]
 
         data = {
             'total_products': total_products,
@@ -265,25 +288,73 @@ class ReportViewSet(viewsets.ModelViewSet):
         serializer = InventoryReportSerializer(data)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'], url_path='inventory-valuation')
+    def inventory_valuation(self, request):
+        """Stock value at the end of each day, from the daily inventory snapshots.
+
+        ``?date=`` values a single day; ``date_from``/``date_to`` give a series.
+        """
+        if request.query_params.get('date'):
+            try:
+                date_from = date_to = datetime.strptime(request.query_params['date'], '%Y-%m-%d').date()
+            except ValueError:
+                return Response({"error": "Invalid date format. Use YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            date_from, date_to, error = self._get_date_range(request)
+            if error:
+                return error
+            date_from, date_to = date_from.date(), date_to.date()
+
+        series = valuation_series(date_from, date_to)
+        as_of = series[-1]['date'] if series else None
+        return Response({
+            'date_from': date_from,
+            'date_to': date_to,
+            'as_of': as_of,
+            'series': series,
+            'by_category': valuation_by_category(as_of) if as_of else [],
+        })
+
+    @action(detail=False, methods=['get'], url_path='inventory-turnover')
+    def inventory_turnover(self, request):
+        """Turnover and days of cover per product over a range of daily snapshots"""
+        date_from, date_to, error = self._get_date_range(request)
+        if error:
+            return error
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 50)), 1000))
+        except ValueError:
+            limit = 50
+        return Response(turnover_report(date_from.date(), date_to.date(), limit=limit))
+
     @action(detail=False, methods=['get'])
     def customers(self, request):
         date_from, date_to, error = self._get_date_range(request)
         if error:
             return error
 
-        customers = Customer.objects.all()
-        total_customers = customers.count()
-        new_customers = customers.filter(
-            created_at__range=[date_from, date_to]
-        ).count()
+        customer_metrics = (
+            ReportQuery(Customer.objects.all())
+            .count('total_customers')
+            .count('new_customers', created_at__range=[date_from, date_to])
+            .run()
+        )
+        total_customers = customer_metrics['total_customers']
+        new_customers = customer_metrics['new_customers']
 
         # Calculate total sales and average customer value
         sales = Sale.objects.filter(
-            date__range=[date_from, date_to],
+            business_date__range=[date_from.date(), date_to.date()],
             status='completed'
         )
-        total_sales = sales.aggregate(total=Sum('total'))['total'] or Decimal('0.00')
-        active_customers_count = sales.values('customer').distinct().count()
+        sales_metrics = (
+            ReportQuery(sales)
+            .sum('total_sales', 'total')
+            .count('active_customers', 'customer', distinct=True)
+            .run()
+        )
+        total_sales = sales_metrics['total_sales']
+        active_customers_count = sales_metrics['active_customers']
         average_customer_value = total_sales / active_customers_count if active_customers_count > 0 else Decimal('0.00')
 
         # Top customers
@@ -300,7 +371,7 @@ class ReportViewSet(viewsets.ModelViewSet):
         # Customer acquisition
         customer_acquisition = Customer.objects.filter(
             created_at__range=[date_from, date_to]
-        ).annotate(date=TruncDate('created_at')).values('date').annotate(
+        ).annotate(date=TruncDate('created_at', tzinfo=business_timezone())).values('date').annotate(
             new_customers=Count('id')
         ).order_by('date')
 
@@ -328,7 +399,7 @@ class ReportViewSet(viewsets.ModelViewSet):
 
         # Sales by category
         sales_by_category = SaleItem.objects.filter(
-            sale__date__range=[date_from, date_to]
+            sale__business_date__range=[date_from.date(), date_to.date()]
         ).values('product__category__name').annotate(
             category_name=F('product__category__name'),
             total_sales=Sum('total'),
@@ -350,11 +421,11 @@ class ReportViewSet(viewsets.ModelViewSet):
         top_categories = Category.objects.annotate(
             total_sales=Coalesce(Sum(
                 'products__saleitem__total',
-                filter=Q(products__saleitem__sale__date__range=[date_from, date_to])
+                filter=Q(products__saleitem__sale__business_date__range=[date_from.date(), date_to.date()])
             ), Decimal('0.00')),
             items_sold=Coalesce(Sum(
                 'products__saleitem__quantity',
-                filter=Q(products__saleitem__sale__date__range=[date_from, date_to])
+                filter=Q(products__saleitem__sale__business_date__range=[date_from.date(), date_to.date()])
             ), 0),
             product_count=Count('products', distinct=True)
         ).annotate(
@@ -385,36 +456,27 @@ class ReportViewSet(viewsets.ModelViewSet):
 
         # Sales and profit
         sales = Sale.objects.filter(
-            date__range=[date_from, date_to],
+            business_date__range=[date_from.date(), date_to.date()],
             status='completed'
         )
-        total_revenue = sales.aggregate(total=Sum('total'))['total'] or Decimal('0.00')
-        total_profit = sales.aggregate(total=Sum('total_profit'))['total'] or Decimal('0.00')
+        total_revenue = ReportQuery(sales).sum('total', 'total').run()['total']
 
         # Expenses
         expenses = Expense.objects.filter(
-            date__range=[date_from, date_to],
+            date__range=[date_from.date(), date_to.date()],
             status='APPROVED'
         )
-        total_expenses = expenses.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        total_expenses = ReportQuery(expenses).sum('total', 'amount').run()['total']
 
         net_profit = total_revenue - total_expenses
         profit_margin = (net_profit / total_revenue * 100) if total_revenue > 0 else Decimal('0.00')
 
         # Preorder analysis
-        preorders = Preorder.objects.filter(created_at__range=[date_from, date_to])
-        preorder_status_breakdown = {}
-        for status_choice in Preorder.STATUS_CHOICES:
-            preorder_status_breakdown[status_choice[0]] = preorders.filter(status=status_choice[0]).count()
-        # Only count revenue and profit for COMPLETED preorders
-        completed_preorders = preorders.filter(status='COMPLETED')
-        preorder_total_orders = completed_preorders.count()
-        preorder_total_revenue = completed_preorders.aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
-        preorder_profit = completed_preorders.aggregate(total=Sum('profit'))['total'] or Decimal('0.00')
+        preorder_metrics = self._preorder_metrics(date_from, date_to)
 
         # Revenue by date
         revenue_by_date = sales.annotate(
-            sale_date=Cast('date', DateField())
+            sale_date=F('business_date')
         ).values('sale_date').annotate(
             revenue=Sum('total'),
             items_sold=Sum('items__quantity')
@@ -451,7 +513,7 @@ class ReportViewSet(viewsets.ModelViewSet):
 
         # Profit by category
         profit_by_category = SaleItem.objects.filter(
-            sale__date__range=[date_from, date_to],
+            sale__business_date__range=[date_from.date(), date_to.date()],
             sale__status='completed'
         ).values('product__category__name').annotate(
             category_name=F('product__category__name'),
@@ -472,31 +534,34 @@ class ReportViewSet(viewsets.ModelViewSet):
             'revenue_vs_expense_by_date': revenue_vs_expense_by_date,
             'profit_by_category': list(profit_by_category),
             # Preorder analytics
-            'preorder_total_orders': preorder_total_orders,
-            'preorder_total_revenue': preorder_total_revenue,
-            'preorder_profit': preorder_profit,
-            'preorder_status_breakdown': preorder_status_breakdown,
+            **preorder_metrics,
         }
         serializer = ProfitLossReportSerializer(data)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'], url_path='product-performance')
+    @conditional_response(Sale, SaleItem, Product, Category)
     def product_performance(self, request):
         date_from, date_to, error = self._get_date_range(request)
         if error:
             return error
 
-        sales_items = SaleItem.objects.filter(sale__date__range=[date_from, date_to], sale__status='completed')
+        sales_items = SaleItem.objects.filter(sale__business_date__range=[date_from.date(), date_to.date()], sale__status='completed')
         
-        products = Product.objects.all()
-        total_products = products.count()
-        total_sales = sales_items.aggregate(total=Sum('total'))['total'] or Decimal('0.00')
-        total_profit = sales_items.aggregate(total=Sum('profit'))['total'] or Decimal('0.00')
+        total_products = Product.objects.count()
+        item_metrics = (
+            ReportQuery(sales_items)
+            .sum('total_sales', 'total')
+            .sum('total_profit', 'profit')
+            .sum('total_quantity_sold', 'quantity', default=0)
+            .run()
+        )
+        total_sales = item_metrics['total_sales']
+        total_profit = item_metrics['total_profit']
         average_profit_margin = (total_profit / total_sales * 100) if total_sales > 0 else Decimal('0.00')
         
         # Calculate average profit and average selling price with discount
-        total_quantity_sold = sales_items.aggregate(total=Sum('quantity'))['total'] or 0
-        total_discounts = sales_items.aggregate(total=Sum('discount'))['total'] or Decimal('0.00')
+        total_quantity_sold = item_metrics['total_quantity_sold']
         
         average_profit = (total_profit / total_quantity_sold) if total_quantity_sold > 0 else Decimal('0.00')
         average_selling_price_with_discount = (total_sales / total_quantity_sold) if total_quantity_sold > 0 else Decimal('0.00')
@@ -622,17 +687,26 @@ class ReportViewSet(viewsets.ModelViewSet):
         # Get online preorders in date range
         online_preorders = OnlinePreorder.objects.filter(created_at__range=[date_from, date_to])
         
-        # Total stats
-        total_orders = online_preorders.count()
+        # Total stats and status breakdown in one pass
         completed_orders = online_preorders.filter(status='COMPLETED')
-        total_sales_count = completed_orders.count()
-        total_revenue = completed_orders.aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
-        total_profit = completed_orders.aggregate(total=Sum('profit'))['total'] or Decimal('0.00')
+        order_metrics = (
+            ReportQuery(online_preorders)
+            .count('total_orders')
+            .count('total_sales_count', status='COMPLETED')
+            .sum('total_revenue', 'total_amount', status='COMPLETED')
+            .sum('total_profit', 'profit', status='COMPLETED')
+            .breakdown('status_breakdown', OnlinePreorder.STATUS_CHOICES)
+            .run()
+        )
+        total_orders = order_metrics['total_orders']
+        total_sales_count = order_metrics['total_sales_count']
+        total_revenue = order_metrics['total_revenue']
+        total_profit = order_metrics['total_profit']
         average_order_value = total_revenue / total_sales_count if total_sales_count > 0 else Decimal('0.00')
 
         # Get sales from Sale model with sale_type='online_preorder' for more accurate analytics
         online_sales = Sale.objects.filter(
-            date__range=[date_from, date_to],
+            business_date__range=[date_from.date(), date_to.date()],
             status='completed',
             sale_type='online_preorder'
         )
@@ -668,7 +742,7 @@ class ReportViewSet(viewsets.ModelViewSet):
 
         # Sales by date - convert dates to strings
         sales_by_date = online_sales.annotate(
-            sale_date=Cast('date', DateField())
+            sale_date=F('business_date')
         ).values('sale_date').annotate(
             total=Sum('total'),
             orders_count=Count('id')
@@ -689,7 +763,7 @@ class ReportViewSet(viewsets.ModelViewSet):
         top_categories_list = list(top_categories_qs)
         
         # If no sales exist, try to get data from OnlinePreorder items directly
-        if len(top_products_list) == 0 and completed_orders.exists():
+        if len(top_products_list) == 0 and total_sales_count:
             # Extract product data from OnlinePreorder items JSON
             from collections import defaultdict
             product_stats = defaultdict(lambda: {'quantity': 0, 'total': Decimal('0.00'), 'profit': Decimal('0.00'), 'name': '', 'category': ''})
@@ -729,7 +803,7 @@ class ReportViewSet(viewsets.ModelViewSet):
                 })
         
         # Get top categories from products if no sales
-        if len(top_categories_list) == 0 and completed_orders.exists():
+        if len(top_categories_list) == 0 and total_sales_count:
             from collections import defaultdict
             category_stats = defaultdict(lambda: {'quantity': 0, 'total': Decimal('0.00'), 'profit': Decimal('0.00'), 'orders': set()})
             
@@ -766,10 +840,7 @@ class ReportViewSet(viewsets.ModelViewSet):
                     'order_count': len(stats['orders'])
                 })
 
-        # Status breakdown
-        status_breakdown = {}
-        for status_choice in OnlinePreorder.STATUS_CHOICES:
-            status_breakdown[status_choice[0]] = online_preorders.filter(status=status_choice[0]).count()
+        status_breakdown = order_metrics['status_breakdown']
 
         # Convert QuerySets to lists and handle None values
         top_products_final = []
@@ -0,0 +1,175 @@
+"""
+Versioned JSON response cache.
+
+Every tracked model has a data version in the configured cache backend, bumped
+(after commit) whenever one of its rows is saved or deleted. Cached responses
+are keyed by the versions of the models they are built from, so a write makes
+the old entries unreachable instead of having to find and delete them, and
+all gunicorn workers see the new version at once when the backend is shared.
+
+Entries hold the rendered JSON bytes and a strong ETag; a matching
+``If-None-Match`` is answered with 304 without touching the database.
+``conditional_response`` gives uncached (admin) views the same 304s, with
+ETags derived from the data versions alone.
+"""
+
+import functools
+import hashlib
+import time
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from apps.json_codec import dumps
+from apps.utils import business_today
+
+# Safety net for writes that bypass signals (queryset.update(), raw SQL)
+DEFAULT_TIMEOUT = 60 * 60
+
+
+def _version_key(model, pk=None):
+    key = f'rms:data-version:{model._meta.label_lower}'
+    return key if pk is None else f'{key}:{pk}'
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock, not 1, so an evicted counter can never
+        # come back to a version that still has cached entries
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key, time.time_ns())
+    return version
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def model_version(model):
+    """Current data version of ``model``."""
+    return _get_version(_version_key(model))
+
+
+def data_version(*models):
+    return '.'.join(str(model_version(model)) for model in models)
+
+
+def bump_version(model):
+    _bump(_version_key(model))
+
+
+def object_version(model, pk):
+    """Current data version of one ``model`` row, for caches of per-object documents."""
+    return _get_version(_version_key(model, pk))
+
+
+def object_versions(model, pks):
+    """``{pk: version}`` of many ``model`` rows with one cache round trip."""
+    keys = {_version_key(model, pk): pk for pk in pks}
+    found = cache.get_many(keys)
+    return {pk: found[key] if key in found else _get_version(key) for key, pk in keys.items()}
+
+
+def bump_versions_on_commit(*models):
+    """Bump ``models`` once the current transaction commits, for writes that bypass signals."""
+    def bump():
+        for model in models:
+            bump_version(model)
+    transaction.on_commit(bump)
+
+
+def bump_object_version(model, pk):
+    """Bump the version of one ``model`` row once the current transaction commits."""
+    transaction.on_commit(lambda: _bump(_version_key(model, pk)))
+
+
+def _bump_on_commit(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version(sender))
+
+
+def track_versions(*models):
+    """Bump the data version of ``models`` whenever one of their rows changes."""
+    for model in models:
+        post_save.connect(_bump_on_commit, sender=model, dispatch_uid=f'data-version-save-{model._meta.label}')
+        post_delete.connect(_bump_on_commit, sender=model, dispatch_uid=f'data-version-delete-{model._meta.label}')
+
+
+def _opaque(etag):
+    # Weak comparison: compressed responses carry W/ ETags (apps.compression)
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def _not_modified(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or _opaque(etag) in {_opaque(tag) for tag in etags}
+
+
+def cached_json_response(request, name, models, build, timeout=DEFAULT_TIMEOUT):
+    """
+    Serve ``build()`` as JSON from the versioned cache.
+
+    ``build`` returns the response data, or ``(data, timeout)`` when the data
+    goes stale on its own (e.g. a scheduled start/end) and must not be cached
+    longer than ``timeout`` seconds. The key includes scheme and host because
+    serializers build absolute media URLs.
+    """
+    key = f'rms:response:{name}:{request.scheme}://{request.get_host()}:{data_version(*models)}'
+    entry = cache.get(key)
+    if entry is None:
+        data = build()
+        if isinstance(data, tuple):
+            data, timeout = data
+        body = dumps(data)
+        entry = (f'"{hashlib.sha1(body).hexdigest()}"', body)
+        cache.set(key, entry, max(1, int(timeout)))
+    etag, body = entry
+
+    response = HttpResponseNotModified() if _not_modified(request, etag) else HttpResponse(
+        body, content_type='application/json'
+    )
+    response['ETag'] = etag
+    # Browsers and CDNs may keep a copy but must revalidate it
+    response['Cache-Control'] = 'public, no-cache'
+    return response
+
+
+def conditional_response(*models):
+    """
+    ETag/304 for GET handlers whose response only depends on the request and the rows of ``models``.
+
+    The ETag hashes the path and query string, the Accept header, the user,
+    the business day (for "last N days" windows) and the data versions of
+    ``models``; a matching ``If-None-Match`` gets a 304 before the handler
+    runs. Writes that bypass signals bump the versions themselves
+    (``bump_versions_on_commit``); any they miss are picked up within
+    ``DEFAULT_TIMEOUT``.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            raw = '|'.join(str(part) for part in [
+                request.get_full_path(), request.META.get('HTTP_ACCEPT', ''), request.user.pk,
+                business_today(), int(time.time() // DEFAULT_TIMEOUT), data_version(*models),
+            ])
+            etag = f'"{hashlib.sha1(raw.encode()).hexdigest()}"'
+            if _not_modified(request, etag):
+                response = HttpResponseNotModified()
+            else:
+                response = handler(view, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response['ETag'] = etag
+            # Per-user data: the browser keeps it and revalidates, shared caches don't
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,563 @@
+"""
+Helpers for the query benchmark commands.
+
+``seed_dataset`` fills a local database with a synthetic but realistically
+shaped shop history (categories, products with size/color variations and
+galleries, customers, sales with items, payments and returns, stock movements,
+expenses and online preorders) using bulk inserts.
+``profile_endpoint`` calls an API endpoint through the Django test client and
+records its timing together with every SQL statement it ran and the database's
+query plan for it, so index regressions show up as plan changes.
+``api_scenarios`` and ``run_scenario`` drive the end-to-end API benchmark.
+"""
+
+import math
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+from apps.customer.models import Customer
+from apps.customer.phones import normalize_phone
+from apps.expenses.models import Expense, ExpenseCategory
+from django.utils.text import slugify
+from rest_framework.test import APIClient
+from apps.inventory.models import Category, Gallery, Image, Product, ProductVariation, StockMovement
+from apps.inventory.search import reindex_products
+from apps.online_preorder.models import OnlinePreorder
+from apps.sales.models import Return, ReturnItem, Sale, SaleItem, SalePayment
+from apps.utils import business_localtime, business_today
+
+# Marks every seeded row so benchmark data is easy to recognise and remove
+SEED_PREFIX = 'BENCH'
+
+SIZES = ['S', 'M', 'L', 'XL', 'XXL']
+COLORS = ['Black', 'White', 'Navy', 'Grey', 'Maroon', 'Olive']
+CATEGORY_NAMES = ['Shirts', 'T-Shirts', 'Pants', 'Jeans', 'Panjabi', 'Polo', 'Jackets', 'Shorts']
+PAYMENT_METHODS = ['cash', 'cash', 'cash', 'card', 'mobile', 'mobile', 'split', 'credit']
+ONLINE_STATUSES = ['PENDING', 'CONFIRMED', 'DELIVERED', 'COMPLETED', 'COMPLETED', 'CANCELLED']
+SALE_STATUSES = ['completed'] * 17 + ['partially_paid', 'pending', 'cancelled']
+SALE_TYPES = ['shop'] * 8 + ['online_preorder', 'offline_preorder']
+
+
+def benchmark_endpoints(today=None):
+    """The 20 hottest read endpoints, with realistic query parameters."""
+    today = today or business_today()
+    month_ago = (today - timedelta(days=30)).isoformat()
+    year_ago = (today - timedelta(days=365)).isoformat()
+    today = today.isoformat()
+    month = f'date_from={month_ago}&date_to={today}'
+    return [
+        '/api/sales/sales/',
+        f'/api/sales/sales/?status=completed&start_date={month_ago}&end_date={today}',
+        '/api/sales/sales/?customer_phone=01700000042',
+        '/api/sales/sales/dashboard_stats/?period=30d',
+        '/api/sales/sales/payment_analytics/',
+        '/api/sales/sales/due_sales/',
+        '/api/sales/sales/customer_lookup/?phone=01700000042',
+        '/api/dashboard/stats/',
+        f'/api/reports/overview/?{month}',
+        f'/api/reports/sales/?{month}',
+        f'/api/reports/profit-loss/?{month}',
+        f'/api/reports/product-performance/?{month}',
+        f'/api/reports/customers/?{month}',
+        f'/api/reports/categories/?date_from={year_ago}&date_to={today}',
+        '/api/reports/inventory/',
+        '/api/inventory/products/',
+        '/api/inventory/products/stats/',
+        '/api/inventory/dashboard/overview/',
+        '/api/inventory/dashboard/stock-movement-analysis/',
+        '/api/preorder/orders/dashboard/',
+    ]
+
+
+def _progress(stdout, message):
+    if stdout is not None:
+        stdout.write(message)
+
+
+def _bulk_create(model, objs, key, batch_size):
+    """
+    bulk_create ``objs`` and make sure they carry primary keys.
+
+    Backends that cannot return ids from a bulk insert (MySQL) get them
+    re-read through ``key``, whose values must be distinct.
+    """
+    objs = model.objects.bulk_create(objs, batch_size=batch_size)
+    if objs and objs[0].pk is None:
+        values = [getattr(obj, key) for obj in objs]
+        pks = {}
+        for start in range(0, len(values), batch_size):
+            pks.update(
+                model.objects.filter(**{f'{key}__in': values[start:start + batch_size]}).values_list(key, 'pk')
+            )
+        for obj in objs:
+            obj.pk = pks[getattr(obj, key)]
+    return objs
+
+
+def seed_dataset(sale_items=1_000_000, products=500, customers=20_000, items_per_sale=3,
+                 days=365, online_preorders=None, return_rate=0.02, batch_size=5000, seed=42,
+                 stdout=None):
+    """
+    Bulk-insert a synthetic dataset of roughly ``sale_items`` sale items.
+
+    Rows are written with ``bulk_create`` (model ``save()`` is bypassed), so
+    derived columns such as ``Sale.business_date`` are filled here directly.
+    Gallery images only get a file name; no image files are written.
+    ``online_preorders`` defaults to one per 20 sales.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+
+    with transaction.atomic():
+        categories = []
+        for name in CATEGORY_NAMES:
+            category, _ = Category.objects.get_or_create(
+                name=f'{SEED_PREFIX} {name}', defaults={'slug': f'{SEED_PREFIX.lower()}-{name.lower()}'}
+            )
+            categories.append(category)
+
+        product_objs = []
+        for index in range(products):
+            cost = Decimal(rng.randrange(300, 3000))
+            product_objs.append(Product(
+                name=f'{SEED_PREFIX} Product {index}',
+                sku=f'{SEED_PREFIX}-{index:06d}',
+                barcode=f'{SEED_PREFIX}{index:09d}',
+                category=rng.choice(categories),
+                cost_price=cost,
+                selling_price=(cost * Decimal('1.6')).quantize(Decimal('1')),
+                stock_quantity=0,
+                minimum_stock=10,
+                assign_to_online=rng.random() < 0.6,
+            ))
+        product_objs = _bulk_create(Product, product_objs, 'sku', batch_size)
+
+        variation_objs = []
+        for product in product_objs:
+            for color in rng.sample(COLORS, 3):
+                for size in SIZES:
+                    variation_objs.append(ProductVariation(
+                        product=product, size=size, color=color, stock=rng.randrange(0, 60),
+                    ))
+        ProductVariation.objects.bulk_create(variation_objs, batch_size=batch_size)
+        variation_objs = list(ProductVariation.objects.filter(product__in=product_objs))
+        stock_by_product = {}
+        variations_by_product = {}
+        for variation in variation_objs:
+            stock_by_product[variation.product_id] = stock_by_product.get(variation.product_id, 0) + variation.stock
+            variations_by_product.setdefault(variation.product_id, []).append(variation)
+        for product in product_objs:
+            product.stock_quantity = stock_by_product.get(product.id, 0)
+        Product.objects.bulk_update(product_objs, ['stock_quantity'], batch_size=batch_size)
+        # bulk_create() skips the signals that keep the product search index current
+        reindex_products([product.id for product in product_objs])
+
+        gallery_objs = []
+        for product in product_objs:
+            for color in sorted({variation.color for variation in variations_by_product[product.id]}):
+                gallery_objs.append(Gallery(product=product, color=color, alt_text=f'{product.name} {color}'))
+        Gallery.objects.bulk_create(gallery_objs, batch_size=batch_size)
+        gallery_objs = list(Gallery.objects.filter(product__in=product_objs))
+        Image.objects.bulk_create([
+            Image(
+                gallery=gallery,
+                imageType=image_type,
+                image=f'gallery/{gallery.product_id}/{slugify(gallery.color)}/{image_type.lower()}.webp',
+            )
+            for gallery in gallery_objs
+            for image_type in ['PRIMARY', 'SECONDARY']
+        ], batch_size=batch_size)
+
+        customer_objs = _bulk_create(Customer, [
+            Customer(
+                first_name=f'{SEED_PREFIX}{index}',
+                last_name='Customer',
+                phone=f'017{index:08d}',
+                # bulk_create() skips Customer.save(), which normally sets it
+                phone_e164=normalize_phone(f'017{index:08d}'),
+                email=None,
+                created_at=now - timedelta(days=rng.randrange(0, days)),
+            )
+            for index in range(customers)
+        ], 'phone', batch_size)
+
+        expense_category, _ = ExpenseCategory.objects.get_or_create(name=f'{SEED_PREFIX} Operations')
+        Expense.objects.bulk_create([
+            Expense(
+                description=f'{SEED_PREFIX} expense {index}',
+                amount=Decimal(rng.randrange(200, 20000)),
+                date=business_localtime(now - timedelta(days=rng.randrange(0, days))).date(),
+                category=expense_category,
+                payment_method='CASH',
+                status=rng.choice(['APPROVED', 'APPROVED', 'PENDING', 'PAID']),
+            )
+            for index in range(days * 4)
+        ], batch_size=batch_size)
+    _progress(stdout, f'Seeded {len(product_objs)} products, {len(variation_objs)} variations, '
+                      f'{len(gallery_objs)} galleries, {len(customer_objs)} customers')
+
+    sale_count = max(1, sale_items // items_per_sale)
+    written = 0
+    payment_count = 0
+    return_count = 0
+    sale_number = 0
+    while sale_number < sale_count:
+        chunk = min(batch_size, sale_count - sale_number)
+        with transaction.atomic():
+            sales = []
+            for offset in range(chunk):
+                when = now - timedelta(seconds=rng.randrange(0, days * 86400))
+                local = business_localtime(when)
+                customer = rng.choice(customer_objs) if rng.random() < 0.7 else None
+                sales.append(Sale(
+                    invoice_number=f'{SEED_PREFIX}-{sale_number + offset:09d}',
+                    customer=customer,
+                    customer_phone=customer.phone if customer else None,
+                    date=when,
+                    business_date=local.date(),
+                    business_hour=local.hour,
+                    sale_type=rng.choice(SALE_TYPES),
+                    subtotal=Decimal('0.00'),
+                    tax=Decimal('0.00'),
+                    total=Decimal('0.00'),
+                    payment_method=rng.choice(PAYMENT_METHODS),
+                    status=rng.choice(SALE_STATUSES),
+                ))
+            sales = _bulk_create(Sale, sales, 'invoice_number', batch_size)
+
+            items = []
+            movements = []
+            payments = []
+            for sale in sales:
+                subtotal = Decimal('0.00')
+                profit = Decimal('0.00')
+                for _ in range(max(1, int(rng.gauss(items_per_sale, 1)))):
+                    product = rng.choice(product_objs)
+                    variation = rng.choice(variations_by_product[product.id])
+                    quantity = rng.choice([1, 1, 1, 2, 2, 3])
+                    discount = Decimal(rng.choice([0, 0, 0, 50, 100]))
+                    total = product.selling_price * quantity - discount
+                    item_profit = total - product.cost_price * quantity
+                    items.append(SaleItem(
+                        sale=sale, product=product, size=variation.size, color=variation.color,
+                        quantity=quantity, unit_price=product.selling_price, discount=discount,
+                        total=total, profit=max(item_profit, Decimal('0.00')),
+                        loss=max(-item_profit, Decimal('0.00')),
+                    ))
+                    movements.append(StockMovement(
+                        product=product, variation=variation, movement_type='OUT', quantity=quantity,
+                        reference_number=sale.invoice_number, business_date=sale.business_date,
+                    ))
+                    subtotal += total
+                    profit += item_profit
+                sale.subtotal = sale.total = subtotal
+                sale.total_profit = max(profit, Decimal('0.00'))
+                sale.total_loss = max(-profit, Decimal('0.00'))
+                if sale.status == 'completed':
+                    sale.amount_paid = subtotal
+                elif sale.status == 'partially_paid':
+                    sale.amount_paid = (subtotal / 2).quantize(Decimal('0.01'))
+                else:
+                    sale.amount_paid = Decimal('0.00')
+                sale.amount_due = subtotal - sale.amount_paid
+                if sale.amount_paid > 0:
+                    method = sale.payment_method if sale.payment_method in ('cash', 'card', 'mobile') else 'cash'
+                    payments.append(SalePayment(
+                        sale=sale, amount=sale.amount_paid, payment_method=method,
+                        status='completed', payment_date=sale.date,
+                    ))
+            items = SaleItem.objects.bulk_create(items, batch_size=batch_size)
+            StockMovement.objects.bulk_create(movements, batch_size=batch_size)
+            SalePayment.objects.bulk_create(payments, batch_size=batch_size)
+            Sale.objects.bulk_update(
+                sales, ['subtotal', 'total', 'total_profit', 'total_loss', 'amount_paid', 'amount_due']
+            )
+            return_count += _seed_returns(rng, sales, return_rate, batch_size)
+        sale_number += chunk
+        written += len(items)
+        payment_count += len(payments)
+        _progress(stdout, f'Seeded {sale_number}/{sale_count} sales ({written} items)...')
+
+    if online_preorders is None:
+        online_preorders = sale_count // 20
+    with transaction.atomic():
+        preorders = [
+            _online_preorder(rng, index, product_objs, variations_by_product, customer_objs)
+            for index in range(online_preorders)
+        ]
+        # created_at is auto_now_add, so the spread-out history is written after the insert
+        created = [now - timedelta(seconds=rng.randrange(0, days * 86400)) for _ in preorders]
+        preorders = _bulk_create(OnlinePreorder, preorders, 'notes', batch_size)
+        for preorder, created_at in zip(preorders, created):
+            preorder.created_at = created_at
+        OnlinePreorder.objects.bulk_update(preorders, ['created_at'], batch_size=batch_size)
+    _progress(stdout, f'Seeded {online_preorders} online preorders')
+
+    return {
+        'products': len(product_objs),
+        'variations': len(variation_objs),
+        'galleries': len(gallery_objs),
+        'customers': len(customer_objs),
+        'sales': sale_count,
+        'sale_items': written,
+        'payments': payment_count,
+        'returns': return_count,
+        'online_preorders': online_preorders,
+    }
+
+
+def _seed_returns(rng, sales, return_rate, batch_size):
+    """Return one item from a ``return_rate`` share of the completed sales in a chunk."""
+    returned = [sale for sale in sales if sale.status == 'completed' and rng.random() < return_rate]
+    if not returned:
+        return 0
+    first_items = {}
+    for item in SaleItem.objects.filter(sale__in=returned).order_by('pk'):
+        first_items.setdefault(item.sale_id, item)
+    returns = _bulk_create(Return, [
+        Return(
+            return_number=f'{SEED_PREFIX}-RET-{sale.invoice_number}',
+            sale=sale,
+            reason='Size exchange',
+            status='completed',
+            refund_amount=first_items[sale.pk].unit_price,
+            processed_date=sale.date + timedelta(days=rng.randrange(1, 7)),
+        )
+        for sale in returned
+    ], 'return_number', batch_size)
+    ReturnItem.objects.bulk_create([
+        ReturnItem(return_order=return_order, sale_item=first_items[return_order.sale_id], quantity=1,
+                   reason='Size exchange')
+        for return_order in returns
+    ], batch_size=batch_size)
+    return len(returns)
+
+
+def _online_preorder(rng, index, product_objs, variations_by_product, customer_objs):
+    """One unsaved online preorder with 1-3 items in the storefront's JSON item format."""
+    customer = rng.choice(customer_objs)
+    items = []
+    for product in rng.sample(product_objs, min(len(product_objs), rng.randint(1, 3))):
+        variation = rng.choice(variations_by_product[product.id])
+        items.append({
+            'product_id': product.id,
+            'product_name': product.name,
+            'size': variation.size,
+            'color': variation.color,
+            'quantity': rng.choice([1, 1, 2]),
+            'unit_price': str(product.selling_price),
+            'discount': '0.00',
+        })
+    delivery_charge = Decimal(rng.choice([60, 120]))
+    total = sum(Decimal(item['unit_price']) * item['quantity'] for item in items) + delivery_charge
+    return OnlinePreorder(
+        customer_name=f'{customer.first_name} {customer.last_name}',
+        customer_phone=customer.phone,
+        items=items,
+        shipping_address={'address': 'House 1, Road 2', 'city': 'Dhaka'},
+        delivery_charge=delivery_charge,
+        delivery_method='home_delivery',
+        total_amount=total,
+        status=rng.choice(ONLINE_STATUSES),
+        quantity=sum(item['quantity'] for item in items),
+        notes=f'{SEED_PREFIX}-ONLINE-{index:09d}',
+    )
+
+
+def explain(sql, params):
+    """Return the database's query plan for a captured statement as text lines."""
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            columns = [col[0] for col in cursor.description]
+            return [
+                ' | '.join(f'{name}={value}' for name, value in zip(columns, row) if value is not None)
+                for row in cursor.fetchall()
+            ]
+    except Exception as e:
+        return [f'EXPLAIN failed: {e}']
+
+
+def profile_endpoint(client, path, with_plans=True, method='get', data=None):
+    """Call ``path`` and return its status, wall time and per-query SQL/timings/plans."""
+    statements = []
+
+    def record(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            statements.append({
+                'sql': sql, 'params': params, 'many': many,
+                'ms': (time.perf_counter() - started) * 1000,
+            })
+
+    with connection.execute_wrapper(record):
+        started = time.perf_counter()
+        if data is None:
+            response = getattr(client, method)(path)
+        else:
+            response = getattr(client, method)(path, data, format='json')
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+    queries = []
+    for statement in statements:
+        entry = {'sql': statement['sql'], 'ms': round(statement['ms'], 3)}
+        if with_plans and not statement['many'] and statement['sql'].lstrip().upper().startswith('SELECT'):
+            entry['plan'] = explain(statement['sql'], statement['params'])
+        queries.append(entry)
+
+    return {
+        'path': path,
+        'status': response.status_code,
+        'ms': round(elapsed_ms, 2),
+        'query_count': len(queries),
+        'sql_ms': round(sum(q['ms'] for q in queries), 2),
+        'queries': queries,
+    }
+
+
+def benchmark_client():
+    """An API client authenticated as the ``benchmark`` superuser that records 500s instead of raising."""
+    user, _ = get_user_model().objects.get_or_create(
+        username='benchmark', defaults={'is_staff': True, 'is_superuser': True}
+    )
+    client = APIClient()
+    client.force_authenticate(user)
+    client.raise_request_exception = False
+    return client
+
+
+def api_scenarios(today=None):
+    """
+    End-to-end API scenarios: POS checkout, catalogue, cart pricing, showcase,
+    dashboards and reports, built against whatever products exist.
+
+    Write scenarios are marked ``rollback`` so repeated runs leave the
+    dataset (and the baseline) unchanged.
+    """
+    today = today or business_today()
+    month = f'date_from={(today - timedelta(days=30)).isoformat()}&date_to={today.isoformat()}'
+    scenarios = [
+        {'name': 'catalogue_list', 'path': '/api/inventory/products/'},
+        {'name': 'catalogue_by_color', 'path': '/api/ecommerce/public/products-by-color/'},
+        {'name': 'showcase', 'path': '/api/inventory/products/showcase/'},
+        {'name': 'dashboard_stats', 'path': '/api/dashboard/stats/'},
+        {'name': 'sales_dashboard', 'path': '/api/sales/sales/dashboard_stats/?period=30d'},
+        {'name': 'inventory_dashboard', 'path': '/api/inventory/dashboard/overview/'},
+        {'name': 'preorder_dashboard', 'path': '/api/preorder/orders/dashboard/'},
+        {'name': 'report_overview', 'path': f'/api/reports/overview/?{month}'},
+        {'name': 'report_sales', 'path': f'/api/reports/sales/?{month}'},
+        {'name': 'report_profit_loss', 'path': f'/api/reports/profit-loss/?{month}'},
+        {'name': 'report_inventory', 'path': '/api/reports/inventory/'},
+    ]
+
+    variation = (
+        ProductVariation.objects.filter(is_active=True, stock__gt=0, product__is_active=True)
+        .select_related('product')
+        .order_by('-stock', 'pk')
+        .first()
+    )
+    if variation:
+        price = str(variation.product.selling_price)
+        scenarios.append({
+            'name': 'pos_sale_create',
+            'method': 'post',
+            'path': '/api/sales/sales/',
+            'rollback': True,
+            'data': {
+                'items': [{
+                    'product_id': variation.product_id, 'size': variation.size, 'color': variation.color,
+                    'quantity': 1, 'unit_price': price, 'discount': '0.00',
+                }],
+                'subtotal': price, 'tax': '0.00', 'discount': '0.00', 'total': price,
+                'payment_method': 'cash', 'payment_data': [{'method': 'cash', 'amount': price}],
+                'status': 'completed', 'customer_phone': '01700000042', 'customer_name': 'Benchmark Customer',
+            },
+        })
+
+    online = list(
+        Product.objects.filter(is_active=True, assign_to_online=True, variations__is_active=True)
+        .distinct().order_by('pk')[:5]
+    )
+    if online:
+        cart = []
+        for product in online:
+            line_variation = product.variations.filter(is_active=True).order_by('pk').first()
+            cart.append({
+                'productId': product.id, 'quantity': 2,
+                'variations': {'color': line_variation.color, 'size': line_variation.size},
+            })
+        scenarios.append({
+            'name': 'cart_price', 'method': 'post', 'path': '/api/ecommerce/public/cart/price/',
+            'data': {'items': cart},
+        })
+        product = online[0]
+        scenarios.append({
+            'name': 'showcase_detail', 'path': f'/api/inventory/products/{product.id}/showcase_detail/',
+        })
+        gallery = product.galleries.order_by('pk').first()
+        if gallery:
+            scenarios.append({
+                'name': 'product_detail_by_color',
+                'path': f'/api/ecommerce/public/product-details/{product.id}/{slugify(gallery.color)}/',
+            })
+    return scenarios
+
+
+def _percentile(values, percent):
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def run_scenario(client, scenario, iterations=20, warmup=2):
+    """
+    Run one scenario ``warmup + iterations`` times and summarise latency
+    (p50/p95), query counts and Python allocations for a single request.
+    """
+    method = scenario.get('method', 'get')
+
+    def call():
+        if not scenario.get('rollback'):
+            return profile_endpoint(client, scenario['path'], False, method, scenario.get('data'))
+        with transaction.atomic():
+            result = profile_endpoint(client, scenario['path'], False, method, scenario.get('data'))
+            transaction.set_rollback(True)
+        return result
+
+    for _ in range(warmup):
+        call()
+    runs = [call() for _ in range(iterations)]
+    timings = [run['ms'] for run in runs]
+
+    # Allocations are measured on a separate request; tracing slows everything down
+    tracemalloc.start()
+    try:
+        call()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'name': scenario['name'],
+        'method': method.upper(),
+        'path': scenario['path'],
+        'status': runs[-1]['status'],
+        'iterations': iterations,
+        'p50_ms': round(_percentile(timings, 50), 2),
+        'p95_ms': round(_percentile(timings, 95), 2),
+        'mean_ms': round(statistics.mean(timings), 2),
+        'max_ms': round(max(timings), 2),
+        'query_count': max(run['query_count'] for run in runs),
+        'sql_p50_ms': round(_percentile([run['sql_ms'] for run in runs], 50), 2),
+        'alloc_peak_kb': round(peak / 1024, 1),
+        'alloc_retained_kb': round(retained / 1024, 1),
+    }
@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.sales.models import Sale
+from apps.inventory.models import StockMovement
+from apps.utils import business_localtime
+
+
+class Command(BaseCommand):
+    help = 'Fill business_date/business_hour on sales and stock movements from their timestamps'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute every row, e.g. after changing BUSINESS_TIME_ZONE (default: only rows missing a business date)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Rows updated per bulk update',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show how many rows would be updated without making changes',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No changes will be made'))
+
+        sales = Sale.objects.all() if options['all'] else Sale.objects.filter(business_date__isnull=True)
+        movements = StockMovement.objects.all() if options['all'] else StockMovement.objects.filter(business_date__isnull=True)
+
+        def fill_sale(sale):
+            local = business_localtime(sale.date)
+            sale.business_date = local.date()
+            sale.business_hour = local.hour
+
+        def fill_movement(movement):
+            movement.business_date = business_localtime(movement.created_at).date()
+
+        for label, queryset, timestamp, fields, fill in [
+            ('sales', sales, 'date', ['business_date', 'business_hour'], fill_sale),
+            ('stock movements', movements, 'created_at', ['business_date'], fill_movement),
+        ]:
+            total = queryset.count()
+            self.stdout.write(f'Found {total} {label} to process')
+            if dry_run or not total:
+                continue
+
+            updated_count = 0
+            last_pk = 0
+            while True:
+                # Walk the primary key so each batch is an index range scan
+                batch = list(
+                    queryset.filter(pk__gt=last_pk).order_by('pk').only('pk', timestamp)[:batch_size]
+                )
+                if not batch:
+                    break
+                for obj in batch:
+                    fill(obj)
+                with transaction.atomic():
+                    queryset.model.objects.bulk_update(batch, fields)
+                updated_count += len(batch)
+                last_pk = batch[-1].pk
+                self.stdout.write(f'Processed {updated_count} {label}...')
+
+            self.stdout.write(self.style.SUCCESS(f'COMPLETE: Updated {updated_count} {label}'))
@@ -0,0 +1,107 @@
+import json
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from apps.sales.benchmarking import api_scenarios, benchmark_client, run_scenario
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the key API flows (POS sale, catalogue, cart price, showcase, dashboards, reports) '
+        'through the Django test client and report p50/p95 latency, query counts and allocations'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per scenario')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per scenario')
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            metavar='NAME',
+            help='Run only these scenarios',
+        )
+        parser.add_argument(
+            '--output',
+            default=os.path.join('benchmarks', 'api_baseline.json'),
+            help='Where to write the results as JSON',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Previous results file; exit with an error when a scenario regresses against it',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=1.5,
+            help='Allowed p95 latency/allocation growth factor against the baseline',
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+
+        scenarios = api_scenarios()
+        if options['only']:
+            unknown = set(options['only']) - {scenario['name'] for scenario in scenarios}
+            if unknown:
+                raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+            scenarios = [scenario for scenario in scenarios if scenario['name'] in options['only']]
+
+        client = benchmark_client()
+        results = []
+        self.stdout.write(f"{'scenario':<26} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'queries':>7} {'peak KB':>9}")
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for scenario in scenarios:
+                result = run_scenario(client, scenario, options['iterations'], options['warmup'])
+                results.append(result)
+                line = (
+                    f"{result['name']:<26} {result['status']:>6} {result['p50_ms']:>9.2f} "
+                    f"{result['p95_ms']:>9.2f} {result['query_count']:>7} {result['alloc_peak_kb']:>9.1f}"
+                )
+                self.stdout.write(self.style.ERROR(line) if result['status'] >= 500 else line)
+
+        report = {
+            'vendor': connection.vendor,
+            'database': str(connection.settings_dict['NAME']),
+            'iterations': options['iterations'],
+            'scenarios': results,
+        }
+        output_dir = os.path.dirname(options['output'])
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options['baseline']:
+            self._compare(options['baseline'], results, options['tolerance'])
+
+    def _compare(self, baseline_path, results, tolerance):
+        with open(baseline_path) as f:
+            baseline = {entry['name']: entry for entry in json.load(f)['scenarios']}
+
+        regressions = []
+        for result in results:
+            before = baseline.get(result['name'])
+            if not before:
+                continue
+            if result['status'] != before['status']:
+                regressions.append(f"{result['name']}: status {before['status']} -> {result['status']}")
+            if result['query_count'] > before['query_count']:
+                regressions.append(
+                    f"{result['name']}: {before['query_count']} -> {result['query_count']} queries"
+                )
+            if result['p95_ms'] > before['p95_ms'] * tolerance:
+                regressions.append(f"{result['name']}: p95 {before['p95_ms']} -> {result['p95_ms']} ms")
+            if result['alloc_peak_kb'] > before['alloc_peak_kb'] * tolerance:
+                regressions.append(
+                    f"{result['name']}: peak allocations {before['alloc_peak_kb']} -> {result['alloc_peak_kb']} KB"
+                )
+
+        if regressions:
+            for line in regressions:
+                self.stdout.write(self.style.ERROR(line))
+            raise CommandError(f'{len(regressions)} regression(s) against {baseline_path}')
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {baseline_path}'))
@@ -0,0 +1,130 @@
+import json
+import os
+import statistics
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from apps.sales.benchmarking import benchmark_client, benchmark_endpoints, profile_endpoint, seed_dataset
+
+# Plan fragments that mean a full table scan on SQLite / MySQL
+FULL_SCAN_MARKERS = ('type=ALL',)
+
+
+def _full_scans(result):
+    scans = set()
+    for query in result.get('queries', []):
+        for line in query.get('plan', []):
+            if any(marker in line for marker in FULL_SCAN_MARKERS) or (
+                'detail=SCAN ' in line and 'USING' not in line
+            ):
+                scans.add(line)
+    return scans
+
+
+class Command(BaseCommand):
+    help = (
+        'Record timings and query plans for the hottest API endpoints, optionally after seeding '
+        'a synthetic dataset, and compare them against a saved baseline to catch index regressions'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            action='store_true',
+            help='Seed a synthetic dataset before benchmarking (local databases only)',
+        )
+        parser.add_argument('--sale-items', type=int, default=1_000_000, help='Sale items to seed')
+        parser.add_argument('--products', type=int, default=500, help='Products to seed')
+        parser.add_argument('--customers', type=int, default=20_000, help='Customers to seed')
+        parser.add_argument('--days', type=int, default=365, help='Days of history to spread sales over')
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Allow seeding when DEBUG is off',
+        )
+        parser.add_argument('--runs', type=int, default=3, help='Timed runs per endpoint (median is reported)')
+        parser.add_argument('--no-plans', action='store_true', help='Skip EXPLAIN for captured queries')
+        parser.add_argument(
+            '--output',
+            default=os.path.join('benchmarks', 'query_plans.json'),
+            help='Where to write the results as JSON',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Previous results file; exit with an error when an endpoint regresses against it',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=1.5,
+            help='Allowed slowdown factor against the baseline before reporting a regression',
+        )
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            if not settings.DEBUG and not options['force']:
+                raise CommandError('Refusing to seed benchmark data with DEBUG off; pass --force for a local database.')
+            self.stdout.write(self.style.WARNING(
+                f"Seeding ~{options['sale_items']} sale items into '{connection.settings_dict['NAME']}'"
+            ))
+            counts = seed_dataset(
+                sale_items=options['sale_items'],
+                products=options['products'],
+                customers=options['customers'],
+                days=options['days'],
+                stdout=self.stdout,
+            )
+            self.stdout.write(self.style.SUCCESS(f'Seeded: {counts}'))
+
+        client = benchmark_client()
+        results = []
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for path in benchmark_endpoints():
+                # Warm-up run records SQL and plans; timed runs skip EXPLAIN
+                result = profile_endpoint(client, path, with_plans=not options['no_plans'])
+                timings = [profile_endpoint(client, path, with_plans=False)['ms'] for _ in range(options['runs'])]
+                result['ms'] = round(statistics.median(timings), 2) if timings else result['ms']
+                results.append(result)
+                self.stdout.write(
+                    f"{result['status']} {result['ms']:>9.2f} ms {result['query_count']:>4} queries  {path}"
+                )
+
+        report = {
+            'vendor': connection.vendor,
+            'database': str(connection.settings_dict['NAME']),
+            'endpoints': results,
+        }
+        output_dir = os.path.dirname(options['output'])
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options['baseline']:
+            self._compare(options['baseline'], results, options['tolerance'])
+
+    def _compare(self, baseline_path, results, tolerance):
+        with open(baseline_path) as f:
+            baseline = {entry['path']: entry for entry in json.load(f)['endpoints']}
+
+        regressions = []
+        for result in results:
+            before = baseline.get(result['path'])
+            if not before:
+                continue
+            if result['query_count'] > before['query_count']:
+                regressions.append(
+                    f"{result['path']}: {before['query_count']} -> {result['query_count']} queries"
+                )
+            if result['ms'] > before['ms'] * tolerance:
+                regressions.append(f"{result['path']}: {before['ms']} -> {result['ms']} ms")
+            for scan in sorted(_full_scans(result) - _full_scans(before)):
+                regressions.append(f"{result['path']}: new full scan: {scan}")
+
+        if regressions:
+            for line in regressions:
+                self.stdout.write(self.style.ERROR(line))
+            raise CommandError(f'{len(regressions)} regression(s) against {baseline_path}')
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {baseline_path}'))
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from apps.sales.benchmarking import seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a synthetic shop for local benchmarking: products with variations and galleries, '
+        'customers, years of sales with payments and returns, expenses and online preorders'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=500, help='Products to generate')
+        parser.add_argument('--customers', type=int, default=20_000, help='Customers to generate')
+        parser.add_argument('--sale-items', type=int, default=300_000, help='Sale items to generate')
+        parser.add_argument('--years', type=int, default=2, help='Years of sales history')
+        parser.add_argument(
+            '--online-preorders',
+            type=int,
+            help='Online preorders to generate (default: one per 20 sales)',
+        )
+        parser.add_argument(
+            '--return-rate',
+            type=float,
+            default=0.02,
+            help='Share of completed sales that get a return',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert')
+        parser.add_argument('--random-seed', type=int, default=42, help='Seed for reproducible data')
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Allow generating data when DEBUG is off',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError('Refusing to generate synthetic data with DEBUG off; pass --force for a local database.')
+
+        self.stdout.write(self.style.WARNING(
+            f"Generating {options['years']} year(s) of shop data into '{connection.settings_dict['NAME']}'"
+        ))
+        counts = seed_dataset(
+            sale_items=options['sale_items'],
+            products=options['products'],
+            customers=options['customers'],
+            days=options['years'] * 365,
+            online_preorders=options['online_preorders'],
+            return_rate=options['return_rate'],
+            batch_size=options['batch_size'],
+            seed=options['random_seed'],
+            stdout=self.stdout,
+        )
+        summary = ', '.join(f'{count} {name.replace("_", " ")}' for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'COMPLETE: Generated {summary}'))
@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.purge import (
+    DEFAULT_BATCH_SIZE, PURGE_TARGETS, create_purge_job, get_purge_job, job_summary, purge_counts,
+    run_purge_job, wait_for_media_deletion,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete sales, customers, expenses and/or reports in primary-key batches with bulk deletes; '
+        'an interrupted run is resumed by running the same command again'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'targets',
+            nargs='*',
+            choices=[*PURGE_TARGETS, 'all'],
+            help='What to delete, in order',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Root rows deleted per transaction',
+        )
+        parser.add_argument(
+            '--resume',
+            metavar='JOB_ID',
+            help='Resume a purge job started from the API',
+        )
+        parser.add_argument(
+            '--reset-sequences',
+            action='store_true',
+            help='Reset auto-increment counters of emptied tables (MySQL)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show how many rows would be deleted without making changes',
+        )
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            job = get_purge_job(options['resume'])
+            if job is None:
+                raise CommandError(f"Purge job {options['resume']} not found")
+        else:
+            targets = list(PURGE_TARGETS) if 'all' in options['targets'] else options['targets']
+            if not targets:
+                raise CommandError('Name what to delete (or pass --resume JOB_ID)')
+            if options['dry_run']:
+                self.stdout.write(self.style.WARNING('DRY RUN MODE - No changes will be made'))
+                for target, count in purge_counts(targets).items():
+                    self.stdout.write(f'{count} {target} would be deleted')
+                return
+            job = create_purge_job(
+                targets, batch_size=options['batch_size'], reset_sequences=options['reset_sequences']
+            )
+
+        self.stdout.write(f"Purge job {job['id']}: {', '.join(job['targets'])} ({job['total']} rows)")
+
+        def progress(job):
+            summary = job_summary(job)
+            self.stdout.write(f"  {summary['deleted_count']}/{summary['total']} deleted", ending='\r')
+            self.stdout.flush()
+
+        job = run_purge_job(job, progress=progress)
+        self.stdout.write('')
+        if job['status'] != 'done':
+            raise CommandError(f"Purge job {job['id']} failed: {job['error']} (rerun to resume)")
+        self.stdout.write('Waiting for media files to be removed...')
+        wait_for_media_deletion()
+        self.stdout.write(self.style.SUCCESS(f"COMPLETE: {job_summary(job)['deleted']}"))
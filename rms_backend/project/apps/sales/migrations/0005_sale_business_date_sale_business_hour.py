@@ -0,0 +1,23 @@
+# Generated by Django 4.2.11 on 2026-10-19 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0004_sale_sale_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sale',
+            name='business_date',
+            field=models.DateField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='business_hour',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.11 on 2026-10-19 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0005_sale_business_date_sale_business_hour'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['status', 'business_date'], name='sales_sale_status_0589e3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['sale_type', 'status', 'business_date'], name='sales_sale_sale_ty_f535cb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['payment_method', 'business_date'], name='sales_sale_payment_da0671_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['date'], name='sales_sale_date_ca4177_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['customer_phone', 'date'], name='sales_sale_custome_4cac7e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saleitem',
+            index=models.Index(fields=['product', 'sale'], name='sales_salei_product_be8a4f_idx'),
+        ),
+    ]
@@ -3,6 +3,8 @@ from django.core.validators import MinValueValidator
 from django.utils import timezone
 from pydantic import ValidationError
 from apps.inventory.models import Product, ProductVariation, StockMovement
+from apps.utils import business_localtime
+from apps.response_cache import bump_versions_on_commit
 from apps.customer.models import Customer
 import uuid
 from decimal import Decimal
@@ -61,12 +63,35 @@ class Sale(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Client-generated key of a sale synced from the POS (apps.sales.sync), so retries never double-book
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+
+    # Local business day/hour of `date` (settings.BUSINESS_TIME_ZONE), kept in sync
+    # on save so analytics can range-scan an index instead of wrapping `date` in DATE()/HOUR()
+    business_date = models.DateField(null=True, blank=True, editable=False, db_index=True)
+    business_hour = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+
     class Meta:
         ordering = ['-date']
+        indexes = [
+            # Dashboards and reports: sales of a status over a business-day range
+            models.Index(fields=['status', 'business_date']),
+            models.Index(fields=['sale_type', 'status', 'business_date']),
+            models.Index(fields=['payment_method', 'business_date']),
+            # Sales list (default ordering) and customer history lookups
+            models.Index(fields=['date']),
+            models.Index(fields=['customer_phone', 'date']),
+        ]
 
     def __str__(self):
         return f"Sale {self.invoice_number}"
 
+    def set_business_date(self):
+        """Derive business_date/business_hour from the sale date"""
+        local = business_localtime(self.date)
+        self.business_date = local.date()
+        self.business_hour = local.hour
+
     @property
     def is_fully_paid(self):
         """Check if the sale is fully paid"""
@@ -167,6 +192,7 @@ class Sale(models.Model):
             movement_type='GIFT',
             notes=f"Gift transaction from {self.invoice_number}"
         )
+        bump_versions_on_commit(StockMovement)
 
     def record_gift_as_expense(self):
         """Record gift payments as expenses in the expense system using cost price"""
@@ -217,7 +243,7 @@ class Sale(models.Model):
     def find_or_create_customer(cls, phone, name=None):
         """Find existing customer by phone or create new one"""
         try:
-            customer = Customer.objects.get(phone=phone)
+            customer = Customer.objects.get_by_phone(phone)
         except Customer.DoesNotExist:
             if name:
                 customer = Customer.objects.create(
@@ -235,6 +261,10 @@ class Sale(models.Model):
     def save(self, *args, **kwargs):
         if not self.invoice_number:
             self.invoice_number = generate_invoice_number()
+        self.set_business_date()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'date' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'business_date', 'business_hour'}
         super().save(*args, **kwargs)
  
     def calculate_totals(self):
@@ -303,6 +333,12 @@ class SaleItem(models.Model):
     loss = models.DecimalField(max_digits=10, decimal_places=2, default=0, validators=[MinValueValidator(Decimal('0.00'))])
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Per-product aggregates joined to sales in a date range
+            models.Index(fields=['product', 'sale']),
+        ]
+
     def __str__(self):
         return f"{self.product.name} - {self.size} - {self.color} - {self.quantity}"
 
@@ -4,8 +4,17 @@ from apps.inventory.serializers import ProductSerializer
 from apps.customer.serializers import CustomerSerializer
 from apps.customer.models import Customer
 from apps.inventory.models import Product, ProductVariation
+from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db.models import Prefetch
 from decimal import Decimal
+from apps.dynamic_fields import DynamicFieldsMixin
+
+# What ProductSerializer reads from every product it renders
+PRODUCT_PREFETCH = (
+    'variations', 'galleries__images', 'ecommerce_statuses', 'online_categories__parent',
+    'material_compositions', 'who_is_this_for', 'features',
+)
 
 class SaleItemSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
@@ -130,7 +139,7 @@ class ReturnSerializer(serializers.ModelSerializer):
         
         return return_order
 
-class SaleSerializer(serializers.ModelSerializer):
+class SaleSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     items = SaleItemSerializer(many=True)
     payments = PaymentSerializer(many=True, read_only=True)  # Legacy payments
     sale_payments = SalePaymentSerializer(many=True, read_only=True)  # New payment system
@@ -198,6 +207,25 @@ class SaleSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['invoice_number', 'total', 'total_profit', 'total_loss', 
                            'amount_paid', 'amount_due', 'gift_amount', 'is_fully_paid', 'payment_status']
+        query_plan = {
+            'customer': (['customer'], []),
+            'items': ([], [
+                Prefetch('items', queryset=SaleItem.objects.select_related(
+                    'product__category__parent', 'product__supplier'
+                )),
+                *[f'items__product__{lookup}' for lookup in PRODUCT_PREFETCH],
+            ]),
+            'payments': ([], ['payments']),
+            'sale_payments': ([], ['sale_payments']),
+            'due_payments': ([], ['due_payments']),
+            'returns': ([], [
+                'returns',
+                Prefetch('returns__items', queryset=ReturnItem.objects.select_related(
+                    'sale_item__product__category__parent', 'sale_item__product__supplier'
+                )),
+                *[f'returns__items__sale_item__product__{lookup}' for lookup in PRODUCT_PREFETCH],
+            ]),
+        }
 
     def validate(self, data):
         if 'items' not in data or not data['items']:
@@ -360,6 +388,112 @@ class SaleSerializer(serializers.ModelSerializer):
         # Update sale payment status
         sale.update_payment_status()
 
+class SaleCustomerSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Customer
+        fields = ['id', 'first_name', 'last_name', 'phone', 'email']
+
+class SaleProductSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'sku', 'barcode', 'cost_price', 'selling_price']
+
+class SaleItemSummarySerializer(serializers.ModelSerializer):
+    product = SaleProductSummarySerializer(read_only=True)
+
+    class Meta:
+        model = SaleItem
+        fields = [
+            'id', 'product', 'size', 'color', 'quantity', 'unit_price',
+            'discount', 'total', 'profit', 'loss'
+        ]
+
+class SaleListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Row of the sales history table. Nested collections are left out unless
+    requested with ?expand= (e.g. ?expand=items,sale_payments).
+    """
+    customer = SaleCustomerSummarySerializer(read_only=True)
+    items_count = serializers.IntegerField(read_only=True)
+    is_fully_paid = serializers.ReadOnlyField()
+    payment_status = serializers.ReadOnlyField()
+    items = SaleItemSummarySerializer(many=True, read_only=True)
+    payments = PaymentSerializer(many=True, read_only=True)
+    sale_payments = SalePaymentSerializer(many=True, read_only=True)
+    due_payments = DuePaymentSerializer(many=True, read_only=True)
+    returns = ReturnSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Sale
+        fields = [
+            'id', 'invoice_number', 'customer', 'customer_phone', 'date', 'sale_type',
+            'subtotal', 'tax', 'discount', 'total', 'total_profit', 'total_loss',
+            'payment_method', 'status', 'amount_paid', 'amount_due', 'gift_amount',
+            'is_fully_paid', 'payment_status', 'items_count',
+            'items', 'payments', 'sale_payments', 'due_payments', 'returns'
+        ]
+        read_only_fields = fields
+        expandable_fields = ['items', 'payments', 'sale_payments', 'due_payments', 'returns']
+        query_plan = {
+            'customer': (['customer'], []),
+            'items': ([], [Prefetch('items', queryset=SaleItem.objects.select_related('product'))]),
+            'payments': ([], ['payments']),
+            'sale_payments': ([], ['sale_payments']),
+            'due_payments': ([], ['due_payments']),
+            'returns': SaleSerializer.Meta.query_plan['returns'],
+        }
+
+class SaleSyncItemSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    size = serializers.CharField(max_length=50)
+    color = serializers.CharField(max_length=50)
+    quantity = serializers.IntegerField(min_value=1)
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.00'))
+    discount = serializers.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'), min_value=Decimal('0.00'))
+
+    def validate(self, data):
+        if data['quantity'] * data['unit_price'] - data['discount'] < Decimal('0.00'):
+            raise serializers.ValidationError("Item total cannot be negative")
+        return data
+
+class SaleSyncPaymentSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=['cash', 'card', 'mobile', 'gift'])
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    transaction_id = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+class SaleSyncSerializer(serializers.Serializer):
+    """One sale queued by the POS while offline (see apps.sales.sync)"""
+    idempotency_key = serializers.CharField(max_length=64)
+    date = serializers.DateTimeField(required=False)
+    sale_type = serializers.ChoiceField(choices=Sale.SALE_TYPE_CHOICES, default='shop')
+    payment_method = serializers.ChoiceField(choices=Sale.PAYMENT_METHOD_CHOICES, default='cash')
+    customer_phone = serializers.CharField(max_length=15, required=False, allow_blank=True)
+    customer_name = serializers.CharField(required=False, allow_blank=True)
+    tax = serializers.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'), min_value=Decimal('0.00'))
+    discount = serializers.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'), min_value=Decimal('0.00'))
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+    items = SaleSyncItemSerializer(many=True, allow_empty=False)
+    payments = SaleSyncPaymentSerializer(many=True, required=False, default=list)
+
+    def validate(self, data):
+        subtotal = sum(item['quantity'] * item['unit_price'] - item['discount'] for item in data['items'])
+        total = subtotal + data['tax'] - data['discount']
+        if total < Decimal('0.00'):
+            raise serializers.ValidationError("Total amount cannot be negative")
+        if sum(payment['amount'] for payment in data['payments']) > total:
+            raise serializers.ValidationError("Total payment amount cannot exceed sale total")
+        return data
+
+class SaleSyncBatchSerializer(serializers.Serializer):
+    sales = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+    def validate_sales(self, value):
+        max_batch = getattr(settings, 'SALE_SYNC_MAX_BATCH', 500)
+        if len(value) > max_batch:
+            raise serializers.ValidationError(f"At most {max_batch} sales per request")
+        return value
+
 class CompletePaymentSerializer(serializers.Serializer):
     """Serializer for completing payments on existing sales"""
     payment_data = serializers.ListField(
@@ -0,0 +1,343 @@
+"""
+Batch sync of sales queued by the POS while offline.
+
+Every sale carries a client-generated ``idempotency_key``; a key that is
+already booked is reported as a duplicate, so the POS can resend a batch
+after a dropped connection without double-booking. Sales are booked in
+chunks of ``settings.SALE_SYNC_CHUNK_SIZE``, one transaction each: the
+touched variations and products are locked in id order, stock is lowered
+with one ``F()`` update per distinct quantity, and sales, items, payments,
+dues and stock movements are bulk-inserted.
+
+The stored sale matches what ``SaleSerializer.create`` produces for the same
+input (totals and profit as in ``Sale.calculate_totals``, status and paid
+amounts as in ``Sale.update_payment_status``).
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from apps.customer.models import Customer
+from apps.customer.phones import normalize_phone
+from apps.inventory.alerts import queue_stock_check
+from apps.inventory.models import Product, ProductVariation, StockMovement
+from apps.response_cache import bump_versions_on_commit
+from apps.utils import business_localtime, business_today
+from .models import DuePayment, Sale, SaleItem, SalePayment, generate_invoice_number
+from .serializers import SaleSyncSerializer
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0.00')
+
+
+def sync_sales(payloads, chunk_size=None):
+    """
+    Book a batch of POS sales; returns one result per payload, in order.
+
+    Results have ``status`` 'created', 'duplicate' (key already booked,
+    with the existing sale), 'invalid' (with ``errors``; fix and resend) or
+    'failed' (the chunk could not be written; resend as is).
+    """
+    chunk_size = chunk_size or getattr(settings, 'SALE_SYNC_CHUNK_SIZE', 50)
+    results = [None] * len(payloads)
+    pending = []
+    seen = {}
+    for index, payload in enumerate(payloads):
+        serializer = SaleSyncSerializer(data=payload)
+        if not serializer.is_valid():
+            results[index] = {
+                'idempotency_key': payload.get('idempotency_key'), 'status': 'invalid', 'errors': serializer.errors,
+            }
+            continue
+        key = serializer.validated_data['idempotency_key']
+        if key in seen:
+            # Resolved once the first copy is booked
+            results[index] = {'idempotency_key': key, 'status': 'duplicate', 'copy_of': seen[key]}
+            continue
+        seen[key] = index
+        pending.append((index, serializer.validated_data))
+
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        try:
+            for index, result in _sync_chunk(chunk).items():
+                results[index] = result
+        except Exception as exc:
+            logger.exception('POS sale sync chunk failed')
+            for index, data in chunk:
+                results[index] = {'idempotency_key': data['idempotency_key'], 'status': 'failed', 'error': str(exc)}
+
+    for index, result in enumerate(results):
+        if 'copy_of' in result:
+            original = results[result.pop('copy_of')]
+            if original['status'] in ('created', 'duplicate'):
+                result.update(sale_id=original['sale_id'], invoice_number=original['invoice_number'])
+            else:
+                result.update(original)
+    return results
+
+
+def _sync_chunk(chunk):
+    keys = [data['idempotency_key'] for _, data in chunk]
+    with transaction.atomic():
+        existing = {
+            row['idempotency_key']: row
+            for row in Sale.objects.filter(idempotency_key__in=keys).values('idempotency_key', 'id', 'invoice_number')
+        }
+        results = {}
+        product_ids = {item['product_id'] for _, data in chunk for item in data['items']}
+        products = {
+            product.id: product
+            for product in Product.objects.select_for_update().filter(id__in=product_ids)
+            .order_by('id').only('id', 'name', 'cost_price')
+        }
+        variations = {
+            (row['product_id'], row['size'], row['color']): row['id']
+            for row in ProductVariation.objects.select_for_update()
+            .filter(product_id__in=products, is_active=True).order_by('id').values('id', 'product_id', 'size', 'color')
+        }
+
+        booked = []
+        for index, data in chunk:
+            key = data['idempotency_key']
+            if key in existing:
+                results[index] = {
+                    'idempotency_key': key, 'status': 'duplicate',
+                    'sale_id': existing[key]['id'], 'invoice_number': existing[key]['invoice_number'],
+                }
+                continue
+            missing = sorted({item['product_id'] for item in data['items']} - set(products))
+            if missing:
+                results[index] = {
+                    'idempotency_key': key, 'status': 'invalid',
+                    'errors': {'items': [f'Unknown product ids: {missing}']},
+                }
+                continue
+            booked.append((index, data))
+
+        if booked:
+            customers, errors = _customers(booked)
+            results.update(errors)
+            booked = [(index, data) for index, data in booked if index not in errors]
+        if booked:
+            for index, sale in _book(booked, products, variations, customers).items():
+                results[index] = {
+                    'idempotency_key': sale.idempotency_key, 'status': 'created',
+                    'sale_id': sale.id, 'invoice_number': sale.invoice_number,
+                }
+        return results
+
+
+def _customers(booked):
+    """
+    ({phone: customer id}, {index: result}) for the sales of a chunk, resolved
+    as Sale.find_or_create_customer would. Each new customer is created in its
+    own savepoint; a sale whose customer can't be written gets its own
+    'invalid' or 'failed' result instead of failing the chunk.
+    """
+    phones = {data['customer_phone'] for _, data in booked if data.get('customer_phone')}
+    normalized = {phone: normalize_phone(phone) for phone in phones}
+    by_e164 = {}
+    for e164, customer_id in Customer.objects.filter(
+        phone_e164__in={e164 for e164 in normalized.values() if e164}
+    ).order_by('-created_at', '-id').values_list('phone_e164', 'id'):
+        # Oldest wins, like Customer.objects.get_by_phone
+        by_e164[e164] = customer_id
+    customers = {phone: by_e164[e164] for phone, e164 in normalized.items() if e164 in by_e164}
+    # Rows written without save() have no phone_e164 yet
+    for phone, customer_id in Customer.objects.filter(
+        phone__in=phones - set(customers)
+    ).order_by('-created_at', '-id').values_list('phone', 'id'):
+        customers[phone] = customer_id
+
+    errors = {}
+    for index, data in booked:
+        phone = data.get('customer_phone')
+        if not phone or phone in customers or not data.get('customer_name'):
+            continue
+        key = data['idempotency_key']
+        try:
+            with transaction.atomic():
+                customers[phone] = Sale.find_or_create_customer(phone, data['customer_name']).id
+        except IntegrityError as exc:
+            errors[index] = {'idempotency_key': key, 'status': 'invalid', 'errors': {'customer_phone': [str(exc)]}}
+        except Exception as exc:
+            logger.exception('POS sale sync could not create customer %s', phone)
+            errors[index] = {'idempotency_key': key, 'status': 'failed', 'error': str(exc)}
+    return customers, errors
+
+
+def _book(booked, products, variations, customers):
+    """Insert the sales of one chunk with their items, payments and stock changes."""
+    now = timezone.now()
+    sales, lines = [], []
+    for index, data in booked:
+        sale, items, payments = _build_sale(data, products, variations, customers)
+        sales.append(sale)
+        lines.append((index, sale, items, payments))
+
+    Sale.objects.bulk_create(sales)
+    # Not every backend returns primary keys from bulk_create (MySQL doesn't)
+    ids = dict(Sale.objects.filter(idempotency_key__in=[sale.idempotency_key for sale in sales])
+               .values_list('idempotency_key', 'id'))
+    for sale in sales:
+        sale.id = ids[sale.idempotency_key]
+
+    sale_items, sale_payments, dues, movements = [], [], [], []
+    variation_deltas = defaultdict(int)
+    product_deltas = defaultdict(int)
+    business_date = business_localtime(now).date()
+    for _, sale, items, payments in lines:
+        for item, variation_id in items:
+            item.sale_id = sale.id
+            sale_items.append(item)
+            if variation_id is None:
+                # Same as Sale._reduce_stock_for_sale_items: unknown variations don't move stock
+                continue
+            variation_deltas[variation_id] -= item.quantity
+            product_deltas[item.product_id] -= item.quantity
+            gifted = sale.status == 'gifted'
+            movements.append(StockMovement(
+                product_id=item.product_id,
+                variation_id=variation_id,
+                movement_type='GIFT' if gifted else 'OUT',
+                quantity=item.quantity,
+                reference_number=sale.invoice_number,
+                notes=f"{'Gift transaction' if gifted else 'Sale item'} from {sale.invoice_number}",
+                business_date=business_date,
+            ))
+        for payment in payments:
+            payment.sale_id = sale.id
+            sale_payments.append(payment)
+        if payments and sale.amount_due > ZERO:
+            dues.append(DuePayment(
+                sale_id=sale.id,
+                amount_due=sale.amount_due,
+                due_date=business_today() + timedelta(days=30),
+                notes="Remaining balance from initial sale",
+            ))
+
+    SaleItem.objects.bulk_create(sale_items)
+    SalePayment.objects.bulk_create(sale_payments)
+    DuePayment.objects.bulk_create(dues)
+    StockMovement.objects.bulk_create(movements)
+    _apply_deltas(ProductVariation, variation_deltas, 'stock', now)
+    _apply_deltas(Product, product_deltas, 'stock_quantity', now)
+    queue_stock_check(product_deltas)
+    # bulk_create() skips post_save
+    bump_versions_on_commit(Sale, SaleItem, StockMovement)
+
+    for _, sale, _, _ in lines:
+        if sale.gift_amount > ZERO:
+            sale.record_gift_as_expense()
+    return {index: sale for index, sale, _, _ in lines}
+
+
+def _apply_deltas(model, deltas, field, now):
+    by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        by_delta[delta].append(pk)
+    for delta, ids in by_delta.items():
+        model.objects.filter(id__in=ids).update(**{field: F(field) + delta, 'updated_at': now})
+
+
+def _build_sale(data, products, variations, customers):
+    """Unsaved Sale, [(SaleItem, variation id)] and [SalePayment] for one payload."""
+    items = []
+    subtotal = item_discounts = ZERO
+    for line in data['items']:
+        product = products[line['product_id']]
+        variation_id = variations.get((product.id, line['size'], line['color']))
+        item = SaleItem(
+            product_id=product.id,
+            size=line['size'],
+            color=line['color'],
+            quantity=line['quantity'],
+            unit_price=line['unit_price'],
+            discount=line['discount'],
+            total=line['quantity'] * line['unit_price'] - line['discount'],
+        )
+        # As SaleItem.calculate_profit_loss: only for known variations of costed products
+        item.profit = item.loss = ZERO
+        if variation_id is not None and product.cost_price:
+            difference = item.total - product.cost_price * item.quantity
+            item.profit, item.loss = max(difference, ZERO), max(-difference, ZERO)
+        items.append((item, variation_id))
+        subtotal += item.unit_price * item.quantity
+        item_discounts += item.discount
+
+    # As Sale.calculate_totals: the global discount is spread over items by value
+    after_item_discounts = subtotal - item_discounts
+    total = after_item_discounts - data['discount'] + data['tax']
+    total_profit = total_loss = ZERO
+    for item, _ in items:
+        selling = item.unit_price * item.quantity - item.discount
+        share = data['discount'] * selling / after_item_discounts if after_item_discounts > 0 else ZERO
+        profit_loss = selling - share - (products[item.product_id].cost_price or ZERO) * item.quantity
+        if profit_loss >= 0:
+            total_profit += profit_loss
+        else:
+            total_loss -= profit_loss
+
+    date = data.get('date') or timezone.now()
+    payments = [
+        SalePayment(
+            amount=payment['amount'],
+            payment_method=payment['method'],
+            status='completed',
+            transaction_id=payment['transaction_id'],
+            payment_date=date,
+            notes=payment['notes'],
+            is_gift_payment=payment['method'] == 'gift',
+        )
+        for payment in data['payments']
+    ]
+    amount_paid = sum((payment.amount for payment in payments), ZERO)
+    gift_amount = sum((payment.amount for payment in payments if payment.is_gift_payment), ZERO)
+
+    # As Sale.update_payment_status
+    if payments and gift_amount >= total:
+        status = 'gifted'
+    elif payments and amount_paid >= total:
+        status = 'completed'
+    elif amount_paid > 0:
+        status = 'partially_paid'
+    else:
+        status = 'pending'
+
+    if len(payments) > 1:
+        payment_method = 'split'
+    elif payments:
+        payment_method = payments[0].payment_method
+    else:
+        payment_method = data['payment_method']
+
+    phone = data.get('customer_phone') or None
+    sale = Sale(
+        invoice_number=generate_invoice_number(),
+        idempotency_key=data['idempotency_key'],
+        customer_id=customers.get(phone),
+        customer_phone=phone,
+        date=date,
+        sale_type=data['sale_type'],
+        subtotal=subtotal.quantize(Decimal('0.01')),
+        tax=data['tax'],
+        discount=data['discount'],
+        total=total.quantize(Decimal('0.01')),
+        total_profit=total_profit.quantize(Decimal('0.01')),
+        total_loss=total_loss.quantize(Decimal('0.01')),
+        payment_method=payment_method,
+        status=status,
+        amount_paid=amount_paid,
+        amount_due=total - amount_paid,
+        gift_amount=gift_amount,
+        notes=data['notes'],
+    )
+    sale.set_business_date()
+    return sale, items, payments
@@ -0,0 +1,80 @@
+from decimal import Decimal
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.customer.models import Customer
+from apps.inventory.models import Category, Product
+from apps.sales.models import Sale, SaleItem, SalePayment
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class SaleListTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        category = Category.objects.create(name="Shirts", slug="shirts")
+        self.product = Product.objects.create(
+            name="Shirt", category=category, cost_price=Decimal("10.00"), selling_price=Decimal("20.00"),
+        )
+        self.customer = Customer.objects.create(first_name="Rina", phone="01700000001")
+        for _ in range(2):
+            self.create_sale()
+
+    def create_sale(self):
+        sale = Sale.objects.create(
+            customer=self.customer,
+            subtotal=Decimal("40.00"),
+            tax=Decimal("0.00"),
+            total=Decimal("40.00"),
+            payment_method='split',
+        )
+        for color in ["Blue", "Red"]:
+            SaleItem.objects.create(
+                sale=sale, product=self.product, size="M", color=color, quantity=1,
+                unit_price=Decimal("20.00"), total=Decimal("20.00"),
+            )
+            SalePayment.objects.create(sale=sale, amount=Decimal("20.00"), payment_method='cash')
+        return sale
+
+    def list_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_list_is_slim_by_default(self):
+        response, _ = self.list_queries('/api/sales/sales/')
+        row = response.data['results'][0]
+        self.assertEqual(row['items_count'], 2)
+        self.assertEqual(row['customer']['first_name'], "Rina")
+        self.assertNotIn('items', row)
+        self.assertNotIn('sale_payments', row)
+
+    def test_expand_and_fields(self):
+        response, _ = self.list_queries('/api/sales/sales/?expand=items,sale_payments')
+        row = response.data['results'][0]
+        self.assertEqual(len(row['items']), 2)
+        self.assertEqual(row['items'][0]['product']['name'], "Shirt")
+        self.assertEqual(len(row['sale_payments']), 2)
+
+        response, _ = self.list_queries('/api/sales/sales/?fields=id,total')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'total'})
+
+    def test_query_count_does_not_grow_with_rows(self):
+        url = '/api/sales/sales/?expand=items,sale_payments,due_payments,returns'
+        _, before = self.list_queries(url)
+        for _ in range(3):
+            self.create_sale()
+        _, after = self.list_queries(url)
+        self.assertEqual(before, after)
+
+    def test_detail_keeps_full_representation(self):
+        sale = Sale.objects.first()
+        response = self.client.get(f'/api/sales/sales/{sale.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['items']), 2)
+        self.assertEqual(response.data['items'][0]['product']['sku'], self.product.sku)
+        self.assertIn('returns', response.data)
@@ -0,0 +1,118 @@
+from decimal import Decimal
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.customer.models import Customer
+from apps.inventory.models import Category, Product, ProductVariation, StockMovement
+from apps.sales.models import DuePayment, Sale, SalePayment
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class SaleSyncTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        category = Category.objects.create(name="Shirts", slug="shirts")
+        self.product = Product.objects.create(
+            name="Shirt", category=category, cost_price=Decimal("10.00"), selling_price=Decimal("20.00"),
+            stock_quantity=10,
+        )
+        self.blue = ProductVariation.objects.create(product=self.product, size="M", color="Blue", stock=5)
+        self.red = ProductVariation.objects.create(product=self.product, size="M", color="Red", stock=5)
+        Customer.objects.create(first_name="Rina", phone="01700000001")
+
+    def payload(self, key, **overrides):
+        data = {
+            'idempotency_key': key,
+            'customer_phone': '01700000001',
+            'discount': '5.00',
+            'items': [
+                {'product_id': self.product.id, 'size': 'M', 'color': 'Blue', 'quantity': 2, 'unit_price': '20.00'},
+                {'product_id': self.product.id, 'size': 'M', 'color': 'Red', 'quantity': 1, 'unit_price': '20.00',
+                 'discount': '2.00'},
+            ],
+            'payments': [{'method': 'cash', 'amount': '30.00'}, {'method': 'card', 'amount': '10.00'}],
+        }
+        data.update(overrides)
+        return data
+
+    def sync(self, *sales):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/sales/sales/sync/', {'sales': list(sales)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_synced_sale_matches_regular_checkout(self):
+        data = self.sync(self.payload('pos-1'))
+        self.assertEqual(data['created'], 1)
+        synced = Sale.objects.get(id=data['results'][0]['sale_id'])
+
+        payload = self.payload('unused')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/sales/sales/', {
+                'customer_phone': payload['customer_phone'],
+                'subtotal': '0.00', 'tax': '0.00', 'discount': payload['discount'], 'total': '0.00',
+                'payment_method': 'split',
+                'items': payload['items'],
+                'payment_data': [{'method': p['method'], 'amount': p['amount']} for p in payload['payments']],
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        regular = Sale.objects.get(id=response.data['id'])
+
+        for field in ['subtotal', 'total', 'total_profit', 'total_loss', 'amount_paid', 'amount_due',
+                      'status', 'payment_method', 'customer_id', 'business_date']:
+            self.assertEqual(getattr(synced, field), getattr(regular, field), field)
+        self.assertEqual(synced.items.count(), 2)
+        self.assertEqual(SalePayment.objects.filter(sale=synced).count(), 2)
+        self.assertEqual(DuePayment.objects.get(sale=synced).amount_due, synced.amount_due)
+
+        self.blue.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual(self.blue.stock, 1)
+        self.assertEqual(self.product.stock_quantity, 4)
+        self.assertEqual(StockMovement.objects.filter(reference_number=synced.invoice_number).count(), 2)
+
+    def test_resend_is_idempotent(self):
+        first = self.sync(self.payload('pos-1'), self.payload('pos-2'))
+        again = self.sync(self.payload('pos-2'), self.payload('pos-3'), self.payload('pos-3'))
+        self.assertEqual(first['created'], 2)
+        self.assertEqual(again['created'], 1)
+        self.assertEqual(again['duplicates'], 2)
+        self.assertEqual(again['results'][0]['sale_id'], first['results'][1]['sale_id'])
+        self.assertEqual(again['results'][2]['sale_id'], again['results'][1]['sale_id'])
+        self.assertEqual(Sale.objects.count(), 3)
+        self.blue.refresh_from_db()
+        self.assertEqual(self.blue.stock, -1)
+
+    def test_invalid_sales_do_not_block_the_batch(self):
+        data = self.sync(
+            self.payload('pos-1', items=[]),
+            self.payload('pos-2', items=[{'product_id': 999, 'size': 'M', 'color': 'Blue', 'quantity': 1,
+                                          'unit_price': '20.00'}]),
+            self.payload('pos-3', payments=[{'method': 'gift', 'amount': '53.00'}]),
+        )
+        self.assertEqual([r['status'] for r in data['results']], ['invalid', 'invalid', 'created'])
+        gifted = Sale.objects.get(idempotency_key='pos-3')
+        self.assertEqual(gifted.status, 'gifted')
+        self.assertEqual(gifted.gift_amount, Decimal('53.00'))
+        self.assertTrue(StockMovement.objects.filter(reference_number=gifted.invoice_number, movement_type='GIFT').exists())
+
+    def test_customer_without_e164_is_reused(self):
+        # As written by bulk_create() or update()
+        Customer.objects.update(phone_e164=None)
+        data = self.sync(self.payload('pos-1', customer_name="Rina"))
+        self.assertEqual(data['results'][0]['status'], 'created')
+        self.assertEqual(Customer.objects.count(), 1)
+        self.assertEqual(Sale.objects.get(idempotency_key='pos-1').customer.first_name, "Rina")
+
+    def test_customer_that_cannot_be_created_only_fails_its_sale(self):
+        Customer.objects.create(first_name="Tanim", phone="01800000002", email="01800000009@temp.com")
+        data = self.sync(
+            self.payload('pos-1', customer_phone='01800000009', customer_name="Karim"),
+            self.payload('pos-2', customer_phone='01800000003', customer_name="Sadia"),
+        )
+        self.assertEqual([r['status'] for r in data['results']], ['invalid', 'created'])
+        self.assertIn('customer_phone', data['results'][0]['errors'])
+        self.assertFalse(Sale.objects.filter(idempotency_key='pos-1').exists())
+        self.assertEqual(Sale.objects.get(idempotency_key='pos-2').customer.first_name, "Sadia")
@@ -2,26 +2,33 @@ from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
-from django.db.models import Sum, F, Q, Count, Avg
+from django.db.models import Sum, F, Q, Count, Avg, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from datetime import datetime, timedelta
 from django.db import transaction
 from .models import Sale, SaleItem, Payment, Return, ReturnItem, SalePayment, DuePayment
 from .serializers import (
-    SaleSerializer, SaleItemSerializer, PaymentSerializer,
+    SaleSerializer, SaleListSerializer, SaleItemSerializer, PaymentSerializer,
     ReturnSerializer, ReturnItemSerializer, SalePaymentSerializer,
-    DuePaymentSerializer, CompletePaymentSerializer, DuePaymentCompletionSerializer
+    DuePaymentSerializer, CompletePaymentSerializer, DuePaymentCompletionSerializer,
+    SaleSyncBatchSerializer
 )
 from apps.inventory.models import Product, ProductVariation, StockMovement, InventoryAlert, Category
 from apps.customer.models import Customer
 from decimal import Decimal
+from apps.reports.queries import ReportQuery
+from apps.utils import business_today, business_datetime_range
+from apps.purge import purge, purge_response
+from apps.db_routing import ReplicaReadMixin
+from .sync import sync_sales
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-class SaleViewSet(viewsets.ModelViewSet):
+class SaleViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Sale.objects.all()
     serializer_class = SaleSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -29,6 +36,7 @@ class SaleViewSet(viewsets.ModelViewSet):
     ordering_fields = ['date', 'total', 'status']
     ordering = ['-date']
     pagination_class = StandardResultsSetPagination
+    replica_actions = {'dashboard_stats', 'payment_analytics'}
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -38,7 +46,7 @@ class SaleViewSet(viewsets.ModelViewSet):
         end_date = self.request.query_params.get('end_date')
         if start_date and end_date:
             queryset = queryset.filter(
-                date__range=[start_date, end_date]
+                business_date__range=[start_date, end_date]
             )
         
         # Filter by status
@@ -66,7 +74,25 @@ class SaleViewSet(viewsets.ModelViewSet):
             elif payment_status == 'unpaid':
                 queryset = queryset.filter(amount_paid=0)
         
-        return queryset
+        return self.optimize_queryset(queryset)
+
+    def get_serializer_class(self):
+        if self.action in ['list', 'due_sales']:
+            return SaleListSerializer
+        return SaleSerializer
+
+    def optimize_queryset(self, queryset):
+        """Load what the serializer will render (see apps.dynamic_fields) in a fixed number of queries"""
+        if self.action not in ['list', 'retrieve', 'due_sales']:
+            return queryset
+        serializer_class = self.get_serializer_class()
+        if 'items_count' in serializer_class.selected_fields(self.request):
+            queryset = queryset.annotate(items_count=Coalesce(Subquery(
+                SaleItem.objects.filter(sale=OuterRef('pk')).order_by()
+                .values('sale').annotate(count=Count('id')).values('count'),
+                output_field=IntegerField(),
+            ), 0))
+        return serializer_class.optimize_queryset(queryset, self.request)
 
     @transaction.atomic
     def create(self, request, *args, **kwargs):
@@ -207,7 +233,7 @@ class SaleViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def due_sales(self, request):
         """Get all sales with pending due amounts"""
-        due_sales = Sale.objects.filter(amount_due__gt=0).order_by('-date')
+        due_sales = self.optimize_queryset(Sale.objects.filter(amount_due__gt=0).order_by('-date'))
         
         # Apply pagination
         page = self.paginate_queryset(due_sales)
@@ -218,6 +244,26 @@ class SaleViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(due_sales, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'])
+    def sync(self, request):
+        """
+        Book sales queued by the POS while offline: {"sales": [...]}, each with
+        an idempotency_key. Resending a batch is safe; see apps.sales.sync.
+        """
+        serializer = SaleSyncBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = sync_sales(serializer.validated_data['sales'])
+        counts = {}
+        for result in results:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+        return Response({
+            'created': counts.get('created', 0),
+            'duplicates': counts.get('duplicate', 0),
+            'invalid': counts.get('invalid', 0),
+            'failed': counts.get('failed', 0),
+            'results': results,
+        })
+
     @action(detail=True, methods=['post'])
     def create_return(self, request, pk=None):
         sale = self.get_object()
@@ -239,12 +285,12 @@ class SaleViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            customer = Customer.objects.get(phone=phone)
+            customer = Customer.objects.get_by_phone(phone)
             return Response({
                 'exists': True,
                 'customer': {
                     'id': customer.id,
-                    'name': customer.name,
+                    'name': f"{customer.first_name} {customer.last_name}".strip(),
                     'phone': customer.phone,
                     'email': customer.email
                 }
@@ -258,12 +304,12 @@ class SaleViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def payment_analytics(self, request):
         """Get payment method analytics and due amounts summary"""
-        today = timezone.now().date()
+        today = business_today()
         start_of_month = today.replace(day=1)
         
         # Payment method distribution
         payment_methods = Sale.objects.filter(
-            date__date__gte=start_of_month,
+            business_date__gte=start_of_month,
             status__in=['completed', 'partially_paid']
         ).values('payment_method').annotate(
             count=Count('id'),
@@ -280,7 +326,7 @@ class SaleViewSet(viewsets.ModelViewSet):
         gift_payments = SalePayment.objects.filter(
             payment_method='gift',
             status='completed',
-            payment_date__date__gte=start_of_month
+            payment_date__gte=business_datetime_range(start_of_month, today)[0]
         ).aggregate(
             total_gift_amount=Sum('amount'),
             gift_transactions=Count('id')
@@ -305,7 +351,7 @@ class SaleViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def dashboard_stats(self, request):
-        today = timezone.now().date()
+        today = business_today()
         start_of_month = today.replace(day=1)
 
         # Get filters from query params
@@ -329,43 +375,37 @@ class SaleViewSet(viewsets.ModelViewSet):
             if customer_phone:
                 qs = qs.filter(customer_phone=customer_phone)
             if date_from and date_to:
-                qs = qs.filter(date__date__range=[date_from, date_to])
+                qs = qs.filter(business_date__range=[date_from, date_to])
             return qs
 
-        # Today's sales
+        # Today's and monthly sales in a single scan of this month's sales
         today_sales_qs = filtered_sales(date_from=today, date_to=today)
-        today_sales = today_sales_qs.aggregate(
-            total_sales=Sum('total'),
-            total_transactions=Count('id'),
-            total_profit=Sum('total_profit'),
-            total_loss=Sum('total_loss'),
-            total_discount=Sum('discount'),
-            average_transaction_value=Avg('total')
-        )
-        
-        # Count unique customers for today
-        today_customers = today_sales_qs.values('customer').distinct().count()
-        today_sales['total_customers'] = today_customers
-
-        # Monthly sales
         monthly_sales_qs = filtered_sales(date_from=start_of_month, date_to=today)
-        monthly_sales = monthly_sales_qs.aggregate(
-            total_sales=Sum('total'),
-            total_transactions=Count('id'),
-            total_profit=Sum('total_profit'),
-            total_loss=Sum('total_loss'),
-            total_discount=Sum('discount'),
-            average_transaction_value=Avg('total')
-        )
-        
-        # Count unique customers for month
-        monthly_customers = monthly_sales_qs.values('customer').distinct().count()
-        monthly_sales['total_customers'] = monthly_customers
+        period_metrics = ReportQuery(monthly_sales_qs)
+        for prefix, condition in (('today', Q(business_date=today)), ('monthly', None)):
+            (
+                period_metrics
+                .sum(f'{prefix}_total_sales', 'total', condition)
+                .count(f'{prefix}_total_transactions', 'id', condition)
+                .sum(f'{prefix}_total_profit', 'total_profit', condition)
+                .sum(f'{prefix}_total_loss', 'total_loss', condition)
+                .sum(f'{prefix}_total_discount', 'discount', condition)
+                .avg(f'{prefix}_average_transaction_value', 'total', condition)
+                .count(f'{prefix}_total_customers', 'customer', condition, distinct=True)
+            )
+        period_metrics = period_metrics.run()
+        today_sales = {
+            key[len('today_'):]: value for key, value in period_metrics.items() if key.startswith('today_')
+        }
+        monthly_sales = {
+            key[len('monthly_'):]: value for key, value in period_metrics.items() if key.startswith('monthly_')
+        }
+        today_customers = today_sales['total_customers']
 
         # Customer analytics
         customer_analytics = {
             'new_customers_today': Customer.objects.filter(
-                created_at__date=today
+                created_at__range=business_datetime_range(today, today)
             ).count(),
             'active_customers_today': today_customers,
             'customer_retention_rate': self._calculate_customer_retention_rate(),
@@ -393,17 +433,21 @@ class SaleViewSet(viewsets.ModelViewSet):
             total=Sum('total')
         ).order_by('-total')
 
-        # Sales by hour distribution for today
-        sales_by_hour = []
-        for hour in range(24):
-            hour_sales = today_sales_qs.filter(date__hour=hour).aggregate(
+        # Sales by hour distribution for today, grouped in one query
+        hourly = {
+            row['business_hour']: row
+            for row in today_sales_qs.values('business_hour').annotate(
                 count=Count('id'),
                 total=Sum('total')
-            )
+            ).order_by()
+        }
+        sales_by_hour = []
+        for hour in range(24):
+            hour_sales = hourly.get(hour, {})
             sales_by_hour.append({
                 'hour': hour,
-                'count': hour_sales['count'] or 0,
-                'total': float(hour_sales['total'] or 0)
+                'count': hour_sales.get('count') or 0,
+                'total': float(hour_sales.get('total') or 0)
             })
 
         # Top selling products this month
@@ -437,36 +481,24 @@ class SaleViewSet(viewsets.ModelViewSet):
             trend_to = today
             
         sales_trend = filtered_sales(date_from=trend_from, date_to=trend_to).values(
-            'date__date'
+            'business_date'
         ).annotate(
+            date__date=F('business_date'),
             sales=Sum('total'),
             profit=Sum('total_profit'),
             orders=Count('id')
-        ).order_by('date__date')
+        ).values('date__date', 'sales', 'profit', 'orders').order_by('business_date')
 
-        # Convert Decimal values to float for JSON serialization
-        def convert_decimals(data):
-            if isinstance(data, dict):
-                return {k: convert_decimals(v) for k, v in data.items()}
-            elif isinstance(data, list):
-                return [convert_decimals(item) for item in data]
-            elif hasattr(data, '_meta') and hasattr(data._meta, 'get_field'):
-                # This is a model instance, convert to dict
-                return {field.name: convert_decimals(getattr(data, field.name)) for field in data._meta.fields}
-            elif str(type(data)) == "<class 'decimal.Decimal'>":
-                return float(data) if data is not None else 0.0
-            else:
-                return data
-
-        # Clean and return response
+        # Decimals are rendered as numbers (apps.json_codec); the querysets are
+        # read here so they run on the view's database (see apps.db_routing)
         response_data = {
-            'today': convert_decimals(today_sales),
-            'monthly': convert_decimals(monthly_sales),
-            'customer_analytics': convert_decimals(customer_analytics),
-            'payment_method_distribution': convert_decimals(list(payment_method_distribution)),
+            'today': today_sales,
+            'monthly': monthly_sales,
+            'customer_analytics': customer_analytics,
+            'payment_method_distribution': list(payment_method_distribution),
             'sales_by_hour': sales_by_hour,
-            'top_products': convert_decimals(list(top_products)),
-            'sales_trend': convert_decimals(list(sales_trend))
+            'top_products': list(top_products),
+            'sales_trend': list(sales_trend)
         }
 
         return Response(response_data)
@@ -474,21 +506,21 @@ class SaleViewSet(viewsets.ModelViewSet):
     def _calculate_customer_retention_rate(self):
         """Calculate customer retention rate (customers who made purchases in both last month and this month)"""
         try:
-            today = timezone.now().date()
+            today = business_today()
             current_month_start = today.replace(day=1)
             last_month_end = current_month_start - timedelta(days=1)
             last_month_start = last_month_end.replace(day=1)
             
             # Get customers who made purchases last month (exclude gifted sales)
             last_month_customers = set(Sale.objects.filter(
-                date__date__range=[last_month_start, last_month_end],
+                business_date__range=[last_month_start, last_month_end],
                 status='completed',
                 customer__isnull=False
             ).exclude(status='gifted').values_list('customer_id', flat=True))
             
             # Get customers who made purchases this month (exclude gifted sales)
             current_month_customers = set(Sale.objects.filter(
-                date__date__range=[current_month_start, today],
+                business_date__range=[current_month_start, today],
                 status='completed',
                 customer__isnull=False
             ).exclude(status='gifted').values_list('customer_id', flat=True))
@@ -528,26 +560,21 @@ class SaleViewSet(viewsets.ModelViewSet):
             )
 
     @action(detail=False, methods=['post'])
-    @transaction.atomic
-    def delete_all_sales(self, request):
-        """Delete all sales data"""
+    def bulk_delete(self, request):
+        """Delete the given sales (in batches; see apps.purge)"""
+        sale_ids = request.data.get('sale_ids')
+        if not isinstance(sale_ids, list) or not sale_ids:
+            return Response({'error': 'sale_ids must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            # Get count before deletion
-            total_count = Sale.objects.count()
-            
-            # Simple direct deletion of all sales
-            Sale.objects.all().delete()
-            
-            return Response({
-                'message': f'Successfully deleted all {total_count} sales',
-                'deleted_count': total_count
-            }, status=status.HTTP_200_OK)
-            
-        except Exception as e:
-            return Response(
-                {'error': str(e)},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+            sale_ids = [int(sale_id) for sale_id in sale_ids]
+        except (TypeError, ValueError):
+            return Response({'error': 'sale_ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        return purge_response(purge(['sales'], ids=sale_ids), 'Successfully deleted {count} sales')
+
+    @action(detail=False, methods=['post'])
+    def delete_all_sales(self, request):
+        """Delete all sales data (in batches; large purges continue in the background)"""
+        return purge_response(purge(['sales']), 'Successfully deleted all {count} sales')
 
 class PaymentViewSet(viewsets.ModelViewSet):
     queryset = Payment.objects.all()
@@ -807,29 +834,16 @@ class ReturnViewSet(viewsets.ModelViewSet):
             orders=Count('id')
         ).order_by('date__date')
 
-        # Convert Decimal values to float for JSON serialization
-        def convert_decimals(data):
-            if isinstance(data, dict):
-                return {k: convert_decimals(v) for k, v in data.items()}
-            elif isinstance(data, list):
-                return [convert_decimals(item) for item in data]
-            elif hasattr(data, '_meta') and hasattr(data._meta, 'get_field'):
-                # This is a model instance, convert to dict
-                return {field.name: convert_decimals(getattr(data, field.name)) for field in data._meta.fields}
-            elif str(type(data)) == "<class 'decimal.Decimal'>":
-                return float(data) if data is not None else 0.0
-            else:
-                return data
-
-        # Clean and return response
+        # Decimals are rendered as numbers (apps.json_codec); the querysets are
+        # read here so they run on the view's database (see apps.db_routing)
         response_data = {
-            'today': convert_decimals(today_sales),
-            'monthly': convert_decimals(monthly_sales),
-            'customer_analytics': convert_decimals(customer_analytics),
-            'payment_method_distribution': convert_decimals(list(payment_method_distribution)),
+            'today': today_sales,
+            'monthly': monthly_sales,
+            'customer_analytics': customer_analytics,
+            'payment_method_distribution': list(payment_method_distribution),
             'sales_by_hour': sales_by_hour,
-            'top_products': convert_decimals(list(top_products)),
-            'sales_trend': convert_decimals(list(sales_trend))
+            'top_products': list(top_products),
+            'sales_trend': list(sales_trend)
         }
 
         return Response(response_data)
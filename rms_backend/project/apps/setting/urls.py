@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import FlushDatabaseView
+from .views import FlushDatabaseView, PurgeJobView
 
 urlpatterns = [
     path('flush-database/', FlushDatabaseView.as_view(), name='flush-database'),
-] 
\ No newline at end of file
+    path('purge-jobs/<str:job_id>/', PurgeJobView.as_view(), name='purge-job'),
+]
@@ -1,8 +1,53 @@
+import hashlib
 import os
 import sys
+from datetime import datetime, time
+from zoneinfo import ZoneInfo
 from PIL import Image
 from io import BytesIO
+from django.conf import settings
 from django.core.files.uploadedfile import InMemoryUploadedFile, UploadedFile
+from django.utils import timezone
+
+
+def business_timezone():
+    """Time zone the shop trades in (settings.BUSINESS_TIME_ZONE)."""
+    return ZoneInfo(getattr(settings, 'BUSINESS_TIME_ZONE', settings.TIME_ZONE))
+
+
+def business_localtime(value=None):
+    """Convert a datetime (default: now) to the business time zone."""
+    if value is None:
+        value = timezone.now()
+    elif timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return timezone.localtime(value, business_timezone())
+
+
+def business_today():
+    """Current business day."""
+    return business_localtime().date()
+
+
+def business_datetime_range(date_from, date_to):
+    """
+    Aware datetimes covering the business days ``date_from`` to ``date_to``
+    inclusive, for filtering plain DateTimeFields (e.g. ``created_at__range``).
+    """
+    tz = business_timezone()
+    return (
+        datetime.combine(date_from, time.min, tzinfo=tz),
+        datetime.combine(date_to, time.max, tzinfo=tz),
+    )
+
+
+def business_date_range(start, end):
+    """
+    Business days of the datetimes ``start`` and ``end``, for filtering
+    ``business_date__range`` instead of ``created_at__range``.
+    """
+    return business_localtime(start).date(), business_localtime(end).date()
+
 
 def optimize_image(image_field, max_width=1920, max_height=1920):
     """
@@ -10,6 +55,7 @@ def optimize_image(image_field, max_width=1920, max_height=1920):
     1. Resizes it if it exceeds max dimensions (maintaining aspect ratio).
     2. Converts it to WebP format.
     3. Reduces file size.
+    4. Names it after its content (name.<hash>.webp), so its URL can be cached forever.
     """
     # Only process if it's a new upload (UploadedFile)
     # Existing files are FieldFile and shouldn't be re-processed
@@ -34,8 +80,9 @@ def optimize_image(image_field, max_width=1920, max_height=1920):
     img.save(output, format='WEBP', quality=85, optimize=True)
     output.seek(0)
     
-    # Change the file extension
-    new_name = os.path.splitext(image_field.name)[0] + '.webp'
+    # Change the file extension and add a hash of the bytes (apps.media serves these as immutable)
+    digest = hashlib.sha256(output.getbuffer()).hexdigest()[:12]
+    new_name = f'{os.path.splitext(image_field.name)[0]}.{digest}.webp'
     
     # Create a new Django File object
     image_field.file = InMemoryUploadedFile(
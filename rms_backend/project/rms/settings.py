@@ -72,6 +72,17 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
+    # orjson both ways (apps.json_codec); decimals are JSON numbers everywhere
+    'DEFAULT_RENDERER_CLASSES': (
+        'apps.json_codec.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'apps.json_codec.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'COERCE_DECIMAL_TO_STRING': False,
 }
 
 # JWT Settings
@@ -93,11 +104,16 @@ SIMPLE_JWT = {
 }
 
 MIDDLEWARE = [
+    # First, so its timings cover the whole middleware stack
+    'apps.instrumentation.RequestMetricsMiddleware',
+    # Before anything that reads or changes the body on the way out
+    'apps.compression.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.db_routing.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -141,7 +157,7 @@ WSGI_APPLICATION = 'rms.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.mysql'),
         'NAME': os.getenv('DB_NAME'),
         'USER': os.getenv('DB_USER' ),
         'PASSWORD': os.getenv('DB_PASSWORD'),
@@ -150,7 +166,45 @@ DATABASES = {
     }
 }
 
-print(os.getenv('DB_HOST'))
+# Read replica for reports and dashboards (apps.db_routing), with the primary's engine: set
+# DB_REPLICA_HOST, plus any of DB_REPLICA_NAME/USER/PASSWORD/PORT that differ from the primary.
+# With DB_ENGINE=django.db.backends.sqlite3, DB_REPLICA_NAME alone names a second SQLite file
+# (e.g. a copy of the primary's). Any other alias can be named by REPLICA_DATABASE instead.
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'USER': os.getenv('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.getenv('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'HOST': os.getenv('DB_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        # Tests read the primary's test database through this alias
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['apps.db_routing.ReplicaRouter']
+REPLICA_DATABASE = os.getenv('REPLICA_DATABASE', 'replica' if 'replica' in DATABASES else '')
+# Seconds a user's analytics reads stay on the primary after one of their writes
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '10'))
+
+# Cache
+# Shared by all gunicorn workers so cached responses and their data versions
+# (apps.response_cache) stay consistent: Redis when REDIS_URL is set,
+# otherwise a file-based cache on the local disk.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR', os.path.join(BASE_DIR, 'cache')),
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -178,6 +232,10 @@ LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE = 'UTC'
 
+# Local time zone the shop trades in. Sales, expenses and stock movements are
+# bucketed into business days/hours in this zone (see apps.utils).
+BUSINESS_TIME_ZONE = os.getenv('BUSINESS_TIME_ZONE', 'Asia/Dhaka')
+
 USE_I18N = True
 
 USE_TZ = True
@@ -197,6 +255,15 @@ else:
     # Development settings
     MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Media delivery (apps.media): MEDIA_SERVE=False when the web server serves MEDIA_URL from MEDIA_ROOT
+# itself. Otherwise Django resolves the file and MEDIA_SENDFILE hands the bytes to the web server:
+# 'nginx' (X-Accel-Redirect to the internal MEDIA_ACCEL_PREFIX location) or 'apache' (X-Sendfile);
+# empty streams the file from Django. Files without a content hash are cached for MEDIA_MAX_AGE seconds.
+MEDIA_SERVE = os.getenv('MEDIA_SERVE', 'True') == 'True'
+MEDIA_SENDFILE = os.getenv('MEDIA_SENDFILE', '')
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media/')
+MEDIA_MAX_AGE = int(os.getenv('MEDIA_MAX_AGE', str(24 * 60 * 60)))
+
 # File upload settings
 
 
@@ -240,3 +307,70 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+
+# Purges (apps.purge): seconds a flush/bulk delete runs inside the request before continuing in the background
+PURGE_SYNC_SECONDS = int(os.getenv('PURGE_SYNC_SECONDS', '20'))
+
+# POS sale sync (apps.sales.sync): sales booked per transaction, and the most accepted per request
+SALE_SYNC_CHUNK_SIZE = int(os.getenv('SALE_SYNC_CHUNK_SIZE', '50'))
+SALE_SYNC_MAX_BATCH = int(os.getenv('SALE_SYNC_MAX_BATCH', '500'))
+
+# Customer phones (apps.customer.phones): country code of numbers entered without one
+PHONE_COUNTRY_CODE = os.getenv('PHONE_COUNTRY_CODE', '880')
+
+# Product search (apps.inventory.search): 'fulltext' (MySQL), 'memory', or 'auto' to pick by database;
+# and the most hits a search returns
+PRODUCT_SEARCH_BACKEND = os.getenv('PRODUCT_SEARCH_BACKEND', 'auto')
+PRODUCT_SEARCH_LIMIT = int(os.getenv('PRODUCT_SEARCH_LIMIT', '100'))
+
+# Response compression (apps.compression): smallest JSON/text body worth compressing, and the
+# brotli quality (0-11; higher is smaller but slower)
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '4096'))
+COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', '5'))
+
+# Stock alerts (apps.inventory.alerts): a variation at or under this many units raises a LOW alert
+VARIATION_LOW_STOCK_THRESHOLD = int(os.getenv('VARIATION_LOW_STOCK_THRESHOLD', '2'))
+
+# Request instrumentation (apps.instrumentation)
+# Requests slower than this are logged with their SQL to logs/slow_requests.log
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', '500'))
+# Recent requests kept per endpoint for the percentiles on /api/dashboard/metrics/
+REQUEST_METRICS_SAMPLES = 1000
+
+# Created by the handler once there is something to log
+LOG_DIR = os.getenv('LOG_DIR', os.path.join(BASE_DIR, 'logs'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'verbose': {
+            'format': '{asctime} {levelname} {name} {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'verbose',
+        },
+        'slow_requests': {
+            'class': 'apps.instrumentation.SlowRequestLogHandler',
+            'filename': os.path.join(LOG_DIR, 'slow_requests.log'),
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'formatter': 'verbose',
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': os.getenv('LOG_LEVEL', 'INFO'),
+    },
+    'loggers': {
+        'rms.slow_requests': {
+            'handlers': ['slow_requests'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
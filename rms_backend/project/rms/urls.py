@@ -14,10 +14,11 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+from apps.media import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -35,5 +36,8 @@ urlpatterns = [
     path('api/online-preorder/', include('apps.online_preorder.urls')),
 ]
 
-# Add media URL patterns for both development and production
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Media, unless the web server serves MEDIA_ROOT itself (see apps.media)
+if settings.MEDIA_SERVE:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media, name='media'),
+    ]
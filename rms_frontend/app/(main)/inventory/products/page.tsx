@@ -112,6 +112,7 @@ export default function ProductsPage() {
   } = useInfiniteProducts({
     ...filterParams,
     page_size: 20,
+    expand: "galleries,material_composition_string",
   });
 
   // Fetch product statistics from backend
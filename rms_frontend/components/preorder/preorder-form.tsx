@@ -24,13 +24,15 @@ import {
   CardTitle,
 } from "@/components/ui/card";
 import { Badge } from "@/components/ui/badge";
-import { useProducts } from "@/hooks/queries/useInventory";
+import { useProduct, useProductPicker } from "@/hooks/queries/useInventory";
+import { useDebounce } from "@/hooks/use-debounce";
 import { toast } from "sonner";
 import {
   useCreatePreorder,
   useUpdatePreorder,
 } from "@/hooks/queries/use-preorder";
 import type { Preorder } from "@/types/preorder";
+import type { PickerProduct } from "@/types/inventory";
 import {
   ShoppingCart,
   Package,
@@ -69,7 +71,21 @@ export function PreorderForm({
   const [isSubmitting, setIsSubmitting] = useState(false);
   const createPreorder = useCreatePreorder();
   const updatePreorder = useUpdatePreorder();
-  const { data: products, isLoading } = useProducts();
+  // Searched on the server, a page at a time (/inventory/products/picker/)
+  const [productSearch, setProductSearch] = useState("");
+  const debouncedProductSearch = useDebounce(productSearch, 300);
+  const { data: productPage, isLoading } = useProductPicker({
+    search: debouncedProductSearch || undefined,
+    page_size: 50,
+  });
+  const products = productPage?.results;
+  const [pickedProduct, setPickedProduct] = useState<PickerProduct | null>(
+    null
+  );
+  // The product of the preorder being edited, which may not be on the page
+  const { data: editedProduct } = useProduct(
+    preorder?.items?.[0]?.product_id ?? 0
+  );
   const [amountError, setAmountError] = useState("");
   const [selectedVariants, setSelectedVariants] = useState<string[]>(
     preorder && preorder.items
@@ -121,16 +137,44 @@ export function PreorderForm({
   const selectedProductId = form.watch("preorder_product_id");
 
   // Memoize the current product to prevent unnecessary re-renders
-  const currentProduct = useMemo(() => {
-    return products?.find((p: any) => p.id.toString() === selectedProductId);
-  }, [products, selectedProductId]);
+  const currentProduct = useMemo((): PickerProduct | undefined => {
+    if (pickedProduct?.id.toString() === selectedProductId) {
+      return pickedProduct;
+    }
+    const listed = products?.find((p) => p.id.toString() === selectedProductId);
+    if (listed) return listed;
+    if (editedProduct && editedProduct.id.toString() === selectedProductId) {
+      return {
+        id: editedProduct.id,
+        name: editedProduct.name,
+        sku: editedProduct.sku,
+        barcode: editedProduct.barcode ?? null,
+        price: Number(editedProduct.selling_price),
+        category: null,
+        category_id: null,
+        stock: editedProduct.stock_quantity,
+        variations: (editedProduct.variations || []).filter(
+          (v) => v.is_active
+        ),
+      };
+    }
+    return undefined;
+  }, [pickedProduct, products, editedProduct, selectedProductId]);
+
+  const productOptions = useMemo(() => {
+    const options = products ? [...products] : [];
+    // Keep the selected product listed whatever the search shows
+    if (currentProduct && !options.some((p) => p.id === currentProduct.id)) {
+      options.unshift(currentProduct);
+    }
+    return options;
+  }, [products, currentProduct]);
 
   // Memoize product variants and filter out those with no stock
   const productVariants = useMemo(() => {
     if (!currentProduct?.variations) return [];
-    return currentProduct.variations.filter(
-      (v: any) => v.is_active && v.stock > 0
-    );
+    // The picker lists active variations only
+    return currentProduct.variations.filter((v) => v.stock > 0);
   }, [currentProduct]);
 
   // Memoize total amount calculation
@@ -145,7 +189,7 @@ export function PreorderForm({
 
     return variantsToCalculate.reduce((sum: number, variant: any) => {
       const qty = variantQuantities[`${variant.size}-${variant.color}`] || 0;
-      return sum + currentProduct.selling_price * qty;
+      return sum + currentProduct.price * qty;
     }, 0);
   }, [
     currentProduct,
@@ -230,12 +274,15 @@ export function PreorderForm({
   const handleProductChange = useCallback(
     (value: string) => {
       form.setValue("preorder_product_id", value);
+      setPickedProduct(
+        productOptions.find((p) => p.id.toString() === value) ?? null
+      );
       // Reset variant selections when product changes
       setSelectedVariants([]);
       setSelectAllVariants(false);
       setVariantQuantities({});
     },
-    [form]
+    [form, productOptions]
   );
 
   async function onSubmit(values: z.infer<typeof formSchema>) {
@@ -333,7 +380,7 @@ export function PreorderForm({
             size: variant.size,
             color: variant.color,
             quantity: qty,
-            unit_price: currentProduct.selling_price,
+            unit_price: currentProduct.price,
             discount: 0,
           };
         })
@@ -506,14 +553,15 @@ export function PreorderForm({
                         <FormControl>
                           <ComboBox
                             options={
-                              products?.map((product: any) => ({
+                              productOptions.map((product) => ({
                                 value: product.id.toString(),
                                 label: product.name,
                                 product: product,
-                              })) || []
+                              }))
                             }
                             value={field.value}
                             onValueChange={handleProductChange}
+                            onSearchChange={setProductSearch}
                             placeholder="Select a product"
                             searchPlaceholder="Search products..."
                             emptyMessage="No products found."
@@ -521,7 +569,7 @@ export function PreorderForm({
                               <div className="flex items-center justify-between w-full">
                                 <span>{option.label}</span>
                                 <Badge variant="secondary" className="ml-2">
-                                  ${option.product.selling_price}
+                                  ${option.product.price}
                                 </Badge>
                               </div>
                             )}
@@ -35,6 +35,8 @@ interface ComboBoxProps {
   disabled?: boolean;
   className?: string;
   renderOption?: (option: ComboBoxOption) => React.ReactNode;
+  // Searches on the server instead: options are shown as given
+  onSearchChange?: (search: string) => void;
 }
 
 export function ComboBox({
@@ -47,6 +49,7 @@ export function ComboBox({
   disabled = false,
   className,
   renderOption,
+  onSearchChange,
 }: ComboBoxProps) {
   const [open, setOpen] = React.useState(false);
   const [searchValue, setSearchValue] = React.useState("");
@@ -54,9 +57,16 @@ export function ComboBox({
   const selectedOption = options.find((option) => option.value === value);
 
   // Filter options based on search value
-  const filteredOptions = options.filter((option) =>
-    option.label.toLowerCase().includes(searchValue.toLowerCase())
-  );
+  const filteredOptions = onSearchChange
+    ? options
+    : options.filter((option) =>
+        option.label.toLowerCase().includes(searchValue.toLowerCase())
+      );
+
+  const changeSearch = (search: string) => {
+    setSearchValue(search);
+    onSearchChange?.(search);
+  };
 
   return (
     <Popover
@@ -64,7 +74,7 @@ export function ComboBox({
       onOpenChange={(newOpen) => {
         setOpen(newOpen);
         if (!newOpen) {
-          setSearchValue("");
+          changeSearch("");
         }
       }}
     >
@@ -92,11 +102,11 @@ export function ComboBox({
         className="w-[var(--radix-popover-trigger-width)] p-0"
         align="start"
       >
-        <Command>
+        <Command shouldFilter={!onSearchChange}>
           <CommandInput
             placeholder={searchPlaceholder}
             value={searchValue}
-            onValueChange={setSearchValue}
+            onValueChange={changeSearch}
           />
           <CommandList>
             <CommandEmpty>{emptyMessage}</CommandEmpty>
@@ -109,7 +119,7 @@ export function ComboBox({
                     const selectedValue = option.value;
                     onValueChange(selectedValue === value ? "" : selectedValue);
                     setOpen(false);
-                    setSearchValue("");
+                    changeSearch("");
                   }}
                 >
                   <Check
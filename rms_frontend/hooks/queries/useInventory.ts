@@ -1,5 +1,5 @@
 'use client'
-import { useQuery, useMutation, useQueryClient, useInfiniteQuery } from '@tanstack/react-query';
+import { useQuery, useMutation, useQueryClient, useInfiniteQuery, keepPreviousData } from '@tanstack/react-query';
 import {
     categoriesApi,
     onlineCategoriesApi,
@@ -245,6 +245,15 @@ export const useInfiniteProducts = (params?: any) => {
     });
 };
 
+export const useProductPicker = (params?: Parameters<typeof productsApi.getPicker>[0]) => {
+    return useQuery({
+        queryKey: [...inventoryKeys.products.lists(), 'picker', { params }],
+        queryFn: () => productsApi.getPicker(params),
+        // Keep the current options on screen while the next search loads
+        placeholderData: keepPreviousData,
+    });
+};
+
 export const useProduct = (id: number) => {
     return useQuery({
         queryKey: inventoryKeys.products.detail(id),
@@ -138,14 +138,28 @@ export const searchCustomers = async (query: string, page: number = 1, pageSize:
     return response.data;
 };
 
+export interface CustomerPhoneMatch {
+    id: number;
+    name: string;
+    phone: string;
+    phone_e164: string;
+    customer_type: string;
+}
+
+// Type-ahead by phone prefix, in any format (01..., +880..., 880...)
+export const searchCustomersByPhone = async (query: string, limit: number = 10): Promise<CustomerPhoneMatch[]> => {
+    const response = await axiosInstance.get('/customer/customers/phone_search/', {
+        params: { q: query, limit }
+    });
+    return response.data;
+};
+
 // Lookup customer by phone
 export const lookupCustomerByPhone = async (phone: string): Promise<Customer | null> => {
     try {
-        const response = await axiosInstance.get('/customer/customers/', {
-            params: { search: phone }
-        });
-        const customers = response.data.results || response.data;
-        return customers.find((customer: Customer) => customer.phone === phone) || null;
+        // A complete number only prefixes itself, whatever format it was saved in
+        const [match] = await searchCustomersByPhone(phone, 1);
+        return match ? await getCustomer(match.id) : null;
     } catch (error) {
         console.error('Error looking up customer:', error);
         return null;
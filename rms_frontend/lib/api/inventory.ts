@@ -18,7 +18,8 @@ import {
     DashboardOverview,
     CategoryMetrics,
     StockMovementAnalysis,
-    PaginatedResponse
+    PaginatedResponse,
+    PickerProduct
 } from '@/types/inventory';
 
 // Product Analytics Types
@@ -206,7 +207,8 @@ export const productsApi = {
         const { data } = await axiosInstance.get('/inventory/products/', {
             params: {
                 ...params,
-                expand: params?.expand || 'category,online_categories,ecommerce_statuses'
+                // The list leaves out nested collections unless expanded
+                expand: params?.expand || 'variations,galleries'
             }
         });
         return data;
@@ -217,6 +219,20 @@ export const productsApi = {
         return data;
     },
 
+    // Searchable, paginated product list for the POS, preorder and return forms
+    getPicker: async (params?: {
+        search?: string;
+        page?: number;
+        page_size?: number;
+        category?: number;
+        in_stock?: boolean;
+    }): Promise<PaginatedResponse<PickerProduct>> => {
+        const { data } = await axiosInstance.get('/inventory/products/picker/', {
+            params: { ...params, in_stock: params?.in_stock ? 1 : undefined }
+        });
+        return data;
+    },
+
     create: async (product: CreateProductDTO): Promise<Product> => {
         console.log('Creating product with data:', product);
         const { data } = await axiosInstance.post('/inventory/products/', product);
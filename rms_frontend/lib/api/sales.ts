@@ -30,7 +30,10 @@ export const getSales = async (params?: {
     page?: number;
     page_size?: number;
 }) => {
-    const response = await axios.get<PaginatedResponse<Sale>>('/sales/sales/', { params });
+    // List rows are slim; the history table also shows items and split payments
+    const response = await axios.get<PaginatedResponse<Sale>>('/sales/sales/', {
+        params: { expand: 'items,sale_payments', ...params }
+    });
     return response.data;
 };
 
@@ -40,7 +43,9 @@ export const getDueSales = async (params?: {
     page?: number;
     page_size?: number;
 }) => {
-    const response = await axios.get<PaginatedResponse<Sale>>('/sales/sales/due_sales/', { params });
+    const response = await axios.get<PaginatedResponse<Sale>>('/sales/sales/due_sales/', {
+        params: { expand: 'items,sale_payments,due_payments', ...params }
+    });
     return response.data;
 };
 
@@ -86,6 +86,24 @@ export interface ProductVariation {
     updated_at: string;
 }
 
+// Compact product from /inventory/products/picker/ (active variations only)
+export interface PickerProduct {
+    id: number;
+    name: string;
+    sku: string;
+    barcode: string | null;
+    price: number;
+    category: string | null;
+    category_id: number | null;
+    stock: number;
+    variations: {
+        id: number;
+        size: string;
+        color: string;
+        stock: number;
+    }[];
+}
+
 // Gallery groups images by color (up to 4 images per color)
 export interface Gallery {
     id: number;